@@ -0,0 +1,92 @@
+import os
+import json
+
+import logsink
+from plugin_bundle import PluginBundler, PluginIndex, build_single_bundle
+
+class ScopedBundle:
+    """Per-URL single scripts holding only the bundles whose @match/@exclude accept the URL.
+
+    The WebView has no user scripts to filter for us, so the URL index picks
+    the bundles and each distinct selection is folded into a script once.
+    """
+    def __init__(self, bundles):
+        self.index = PluginIndex(bundles)
+        self.sources = {}  # tuple of bundle indexes -> single script
+
+    def source_for(self, url):
+        """Script to inject on url, None when no plugin matches it"""
+        selected = tuple(self.index.match(url))
+        if not selected:
+            return None
+        source = self.sources.get(selected)
+        if source is None:
+            source = build_single_bundle([self.index.bundles[i] for i in selected])
+            self.sources[selected] = source
+        return source
+
+def load_android_bundle(plugin_dir, cache_dir):
+    """Build (or reuse) the plugin bundles for the WebView; None when there are no plugins"""
+    bundles = PluginBundler(plugin_dir, cache_dir).build()
+    if not bundles:
+        return None
+    return ScopedBundle(bundles)
+
+def find_plugin_dir(storage_path):
+    """plugins/ next to zerkalo.txt wins over the plugins packaged with the app"""
+    for path in (os.path.join(storage_path, "plugins"),
+                 os.path.join(os.path.dirname(os.path.abspath(__file__)), "plugins")):
+        if os.path.isdir(path):
+            return path
+    return None
+
+class PluginInjector:
+    """Injects the single plugin bundle into a WebView once per navigation.
+
+    The bundle is sent from onPageStarted so early plugins run as soon as
+    possible. That evaluation can still reach the previous document, so the
+    bundle reports the URL it ran in and onPageFinished only sends it again
+    when the early injection did not land (the bundle guards itself as well).
+    evaluate(source, callback) wraps WebView.evaluateJavascript.
+    """
+    def __init__(self, bundle, evaluate):
+        self.bundle = bundle
+        self.evaluate = evaluate
+        self.navigation = None  # URL of the navigation in progress
+        self.source = None  # Script selected for the navigation, None when no plugin matches
+        self.landed = False  # The bundle reported running in this navigation's document
+        self.injections = 0
+
+    def select(self, url):
+        self.navigation = url
+        self.landed = False
+        self.source = self.bundle.source_for(url)
+        run, skipped = self.bundle.index.split(url)
+        logsink.info("plugins", f"Plugins on {url}: {len(run)} run, {len(skipped)} skipped")
+
+    def page_started(self, url):
+        self.select(url)
+        self.inject()
+
+    def page_finished(self, url):
+        if url != self.navigation:
+            # Redirected, or finished without a matching onPageStarted
+            self.select(url)
+        if not self.landed:
+            self.inject()
+
+    def inject(self):
+        if self.source is None:
+            return
+        navigation = self.navigation
+        self.injections += 1
+        self.evaluate(self.source, lambda value: self.on_result(navigation, value))
+
+    def on_result(self, navigation, value):
+        # evaluateJavascript hands back the JSON encoding of the return value
+        try:
+            href = json.loads(value) if value else None
+        except ValueError:
+            href = None
+        if navigation == self.navigation and href == navigation:
+            self.landed = True
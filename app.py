@@ -1,50 +1,143 @@
 import sys
 import os
-import glob
-from PyQt6.QtCore import QUrl, Qt
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QEvent, QUrl, Qt, QTimer, QFileSystemWatcher, pyqtSignal
 from PyQt6.QtGui import QFont, QPalette, QColor, QGuiApplication
+from PyQt6.QtGui import QKeySequence, QShortcut
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QFrame, QSizePolicy
+    QPushButton, QLabel, QFrame, QSizePolicy, QTabBar, QStackedWidget
 )
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEngineSettings, QWebEnginePage
 
-# Set Google DNS for QtWebEngine
-os.environ["QTWEBENGINE_DNS_SERVER_ADDRESS"] = "8.8.8.8"
+from plugin_bundle import PluginBundler, PluginIndex, wrap_plugin
+from mirrors import MirrorList
+from telemetry import TelemetryWriter, COLLECT_SCRIPT, make_record
+from blocklist import load_blocklist
+from asset_store import AssetStore
+from settings import load_settings
+from prewarm import read_manifest, learn_manifest, prewarm_html, prewarm_summary, PREWARM_RESULT_SCRIPT
+from procstats import rss_kb, total_rss_kb
+from watchdog import RendererWatchdog
+from page_pool import SparePagePool
+from snapshot_cache import SnapshotCache, stale_banner, SNAPSHOT_FRAGMENT
+from plugin_profile import PluginBudget
+from lite_mode import LitePolicy, ByteLedger, format_bytes
+from nav_predictor import NavPredictor, LINKS_SCRIPT, HINTS_SCRIPT
+import logsink
+from logsink import start_logging, parse_level
+from dns_cache import (
+    host_port, url_origin, frequent_origins, warmup_html, resolve_hosts, resolver_rules, host_resolver_flag,
+    WARMUP_FRAGMENT
+)
+from bridge import builtin_bridge_handlers
+from render_worker import run_render_worker
+from launch_protocol import server_name
+from single_instance import InstanceServer, forward_launch
 
-class WebEnginePage(QWebEnginePage):
-    """Custom WebEnginePage to handle JavaScript console messages"""
-    def __init__(self, profile, parent):
-        super().__init__(profile, parent)
-        self.injected_plugins = set()  # Track injected plugins per page instance
-    
-    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
-        print(f"JS [{level.name}]: {message} (Line: {line_number}, Source: {source_id})")
-    
-    def inject_plugins(self, plugins):
-        """Inject all plugins into the current page"""
-        if not plugins:
-            return
-            
-        print(f"→ Injecting {len(plugins)} plugins...")
-        for name, script in plugins.items():
-            # Only inject if not already injected
-            if name not in self.injected_plugins:
-                self.runJavaScript(script)
-                self.injected_plugins.add(name)
-                print(f"  ✓ Injected: {name}")
-            else:
-                print(f"  ✓ Already injected: {name}")
+class StartupTrace:
+    """Timestamps of startup phases, printed with --startup-trace"""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.phases = []
+        self.reported = False
+    
+    def mark(self, phase):
+        self.phases.append((phase, time.perf_counter()))
+        if phase == "first page loaded":
+            self.report()
     
-    def reset_injection_state(self):
-        """Reset injection state for new page"""
-        self.injected_plugins = set()
-        print("↻ Plugin injection state reset for new page")
+    def report(self):
+        """Print the phases once: after the first load, or when it failed or the window closed first"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        print("Startup trace:")
+        previous = self.start
+        for phase, at in self.phases:
+            print(f"  {(at - self.start) * 1000:8.1f} ms  (+{(at - previous) * 1000:7.1f} ms)  {phase}")
+            previous = at
+
+# Longest init_engine waits for the window's first paint
+FIRST_PAINT_TIMEOUT_MS = 1000
+# How long the hidden DNS warm-up page outlives its load
+DNS_WARMUP_PAGE_MS = 10000
+# Longest the hidden pre-warm page may take to preload its assets
+PREWARM_TIMEOUT_MS = 60000
+
+class BrowserTab:
+    """A page and its view plus the bookkeeping the tab lifecycle policy needs"""
+    def __init__(self, page, view):
+        self.page = page
+        self.view = view
+        self.title = ""
+        self.last_url = ""  # Reloaded after a renderer crash or page recreation
+        self.loading = False
+        self.load_started = None  # perf_counter() of the navigation in progress
+        self.prefetched = False  # The last navigation was served from a predicted prefetch
+        self.last_active = time.monotonic()
+    
+    def state(self):
+        return self.page.lifecycleState().name
+    
+    def memory_kb(self):
+        # Discarded pages have no renderer process
+        return rss_kb(self.page.renderProcessPid()) or 0
+
+# Phases are timed from the moment app.py finished its imports
+startup_trace = StartupTrace()
 
 class ModernBrowser(QMainWindow):
-    def __init__(self):
+    # Emitted once the profile, page and view exist (started after the window's first paint)
+    engine_ready = pyqtSignal()
+    # Result of the mirror probe, emitted from the probe thread and delivered on the GUI thread
+    mirror_probed = pyqtSignal(object)
+    # (tab, url, entry) of a snapshot read on a worker thread, delivered on the GUI thread
+    snapshot_read = pyqtSignal(object, str, object)
+    
+    def __init__(self, trace=startup_trace):
         super().__init__()
+        self.trace = trace
+        self.trace.mark("window construction")
+        
+        # Start probing mirrors and compiling the blocklist right away,
+        # the results are needed once WebEngine is up
+        self.cache_dir = os.path.join(os.getcwd(), "browser_data")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # One set of workers for the blocklist, telemetry reads, OS host resolution and snapshot writes
+        self.background = ThreadPoolExecutor(max_workers=4, thread_name_prefix="background")
+        self.settings = load_settings()
+        self.start_logging()
+        self.first_load_done = False
+        self.instance_server = None
+        self.pending_launches = []  # Forwarded before WebEngine was up
+        # Created once WebEngine is up; the window may close before that
+        self.asset_store = None
+        self.byte_ledger = None
+        self.predictor = None
+        self.bridge_executor = None
+        self.page_pool = None
+        self.snapshots = None
+        self.configure_dns()
+        self.mirror_probed.connect(self.on_mirror_probed)
+        self.start_mirror_probe()
+        # Origins of recent navigations for the DNS warm-up, read from telemetry off the GUI thread
+        self.recent_origins = self.background.submit(
+            frequent_origins,
+            os.path.join(self.cache_dir, "telemetry", "navigations.jsonl"),
+            self.settings["prewarm_learn_navigations"],
+            self.settings["dns_warmup_hosts"],
+        )
+        self.start_host_resolution()
+        blocklist_dir = os.path.join(os.getcwd(), "blocklists")
+        os.makedirs(blocklist_dir, exist_ok=True)
+        self.blocklist_load = self.background.submit(
+            load_blocklist, blocklist_dir, os.path.join(self.cache_dir, "blocklist_cache")
+        )
+        
         self.setWindowTitle("Ответы@Live")
         self.setMinimumSize(1280, 720)  # Widescreen format
         
@@ -91,6 +184,7 @@ class ModernBrowser(QMainWindow):
         self.back_btn = self.create_button("←", "Navigate back")
         self.forward_btn = self.create_button("→", "Navigate forward")
         self.reload_btn = self.create_button("↻", "Reload page")
+        self.new_tab_btn = self.create_button("+", "New tab (Ctrl+T)")
         
         # URL display
         self.url_label = QLabel()
@@ -117,70 +211,336 @@ class ModernBrowser(QMainWindow):
         nav_bar_layout.addWidget(self.forward_btn)
         nav_bar_layout.addWidget(self.reload_btn)
         nav_bar_layout.addWidget(self.url_label, 1)
+        nav_bar_layout.addWidget(self.new_tab_btn)
         
-        # Configure browser profile FIRST
-        self.cache_dir = os.path.join(os.getcwd(), "browser_data")
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # Requests blocked by the ad/tracker blocklist on the current page
+        self.blocked_label = QLabel("🛡 0")
+        self.blocked_label.setToolTip("Blocked ads and trackers on this page")
+        self.blocked_label.setStyleSheet(f"color: {self.text_color.name()}; font-size: 12px; padding: 0 4px;")
+        nav_bar_layout.addWidget(self.blocked_label)
         
-        # Create persistent profile with unique name
-        self.profile = QWebEngineProfile("ZerkaloPersistentProfile", self)
-        self.profile.setPersistentStoragePath(self.cache_dir)
-        self.profile.setCachePath(self.cache_dir)
-        self.profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies)
-        self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
-        self.profile.setHttpCacheMaximumSize(100 * 1024 * 1024)  # 100 MB cache
-        
-        # Set modern user agent
-        user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-        self.profile.setHttpUserAgent(user_agent)
-        
-        # Create web page with our custom profile
-        self.web_page = WebEnginePage(self.profile, self)  # Use custom page
-        
-        # Now create web view with our custom page
-        self.web_view = QWebEngineView()
-        self.web_view.setPage(self.web_page)
-        self.web_view.setStyleSheet("background-color: white; border: none;")
-        self.web_view.urlChanged.connect(self.update_url_display)
-        self.web_view.titleChanged.connect(self.update_window_title)
-        
-        # Configure web view settings
-        settings = self.web_view.settings()
-        settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptCanAccessClipboard, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalStorageEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.FullScreenSupportEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.ScrollAnimatorEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.PluginsEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.DnsPrefetchEnabled, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.AutoLoadImages, True)
-        settings.setAttribute(QWebEngineSettings.WebAttribute.Accelerated2dCanvasEnabled, True)
+        # Bytes the current page pulled in (and lite mode saved), lite mode switch
+        self.data_label = QLabel("⇣ 0 B")
+        self.data_label.setToolTip("Data used by this page")
+        self.data_label.setStyleSheet(f"color: {self.text_color.name()}; font-size: 12px; padding: 0 4px;")
+        nav_bar_layout.addWidget(self.data_label)
+        self.lite_btn = self.create_button("L", "Lite data mode (Ctrl+Shift+D)")
+        self.lite_btn.setCheckable(True)
+        self.lite_btn.setStyleSheet(self.lite_btn.styleSheet() + f"""
+            QPushButton:checked {{
+                background-color: {self.highlight_color.name()};
+                color: #ffffff;
+            }}
+        """)
+        nav_bar_layout.addWidget(self.lite_btn)
+        
+        # Blank page area shown until WebEngine is initialised
+        self.web_placeholder = QWidget()
+        self.web_placeholder.setStyleSheet("background-color: white;")
+        
+        # Tabs share one profile; every tab keeps its own page and view
+        self.tabs = []
+        self.active_tab = None
+        self.tab_bar = QTabBar()
+        self.tab_bar.setTabsClosable(True)
+        self.tab_bar.setExpanding(False)
+        self.tab_bar.setDocumentMode(True)
+        self.tab_bar.setElideMode(Qt.TextElideMode.ElideRight)
+        self.tab_bar.setStyleSheet(f"""
+            QTabBar::tab {{
+                background-color: {self.bg_color.name()};
+                color: {self.text_color.name()};
+                border: 1px solid {self.border_color.name()};
+                padding: 4px 12px;
+                max-width: 220px;
+                font-size: 12px;
+            }}
+            QTabBar::tab:selected {{
+                background-color: {self.widget_color.name()};
+                border-bottom-color: {self.widget_color.name()};
+            }}
+        """)
         
         # Add widgets to main layout
+        self.main_layout = main_layout
+        main_layout.addWidget(self.tab_bar)
         main_layout.addWidget(nav_bar)
-        main_layout.addWidget(self.web_view, 1)
+        main_layout.addWidget(self.web_placeholder, 1)
+        
+        self.url_label.mousePressEvent = self.copy_url_to_clipboard
+        QShortcut(QKeySequence("Ctrl+Shift+L"), self, self.dump_log)
+        self.trace.mark("window shell built")
+        
+        # Heavy WebEngine setup runs once the window shell has painted
+        self.engine_started = False
+        self.web_placeholder.installEventFilter(self)
+        # A window that never gets painted (started minimized) must not wait forever
+        QTimer.singleShot(FIRST_PAINT_TIMEOUT_MS, self.start_engine)
+    
+    def eventFilter(self, watched, event):
+        if watched is self.web_placeholder and event.type() == QEvent.Type.Paint and not self.engine_started:
+            watched.removeEventFilter(self)
+            self.trace.mark("first paint")
+            # Queued, so the paint in progress reaches the screen before WebEngine loads
+            QTimer.singleShot(0, self.start_engine)
+        return super().eventFilter(watched, event)
+    
+    def start_engine(self):
+        """Run init_engine once, after the first paint or the fallback timeout"""
+        if self.engine_started:
+            return
+        self.engine_started = True
+        self.web_placeholder.removeEventFilter(self)
+        self.init_engine()
+    
+    def init_engine(self):
+        """Create profile, page and view, load plugins and start the first navigation"""
+        # Chromium reads its flags when QtWebEngine starts up
+        self.pin_resolved_hosts()
+        from webpage import (
+            RequestInterceptor, AssetSchemeHandler, ASSET_SCHEME,
+            register_asset_scheme, create_profile, create_telemetry_script, create_bridge_script, world_id
+        )
+        self.trace.mark("QtWebEngine imported")
+        
+        # Custom schemes have to be known before Chromium sets up the first profile
+        register_asset_scheme()
+        
+        # Create persistent profile with unique name
+        self.profile = create_profile(self.cache_dir, self)
+        
+        # Offline store for the mirror's static assets
+        asset_handler = None
+        if self.settings["asset_store_enabled"] and self.mirrors is not None:
+            self.asset_store = AssetStore(
+                os.path.join(self.cache_dir, "assets"),
+                self.settings["asset_store_budget_mb"] * 1024 * 1024,
+                self.settings["asset_store_max_age_hours"] * 3600,
+            )
+            mirror_urls = [QUrl(url) for url in self.mirrors.urls]
+            mirror_origins = {
+                f"{url.host()}:{url.port(443 if url.scheme() == 'https' else 80)}": url.scheme() for url in mirror_urls
+            }
+            asset_handler = AssetSchemeHandler(
+                self.asset_store,
+                list(mirror_origins),
+                self,
+                cookie_store=self.profile.cookieStore(),
+            )
+            # Known upfront, so asset URLs from earlier sessions map back to the right scheme
+            asset_handler.origins.update(mirror_origins)
+            self.profile.installUrlSchemeHandler(ASSET_SCHEME, asset_handler)
+        
+        # Filter ads and trackers for every page of the profile
+        try:
+            blocklist = self.blocklist_load.result()
+        except Exception as e:
+            logsink.error("app", f"✗ Error loading blocklist: {str(e)}")
+            blocklist = None
+        self.byte_ledger = ByteLedger()
+        self.lite_policy = LitePolicy(
+            self.settings["lite_block"],
+            self.settings["lite_max_resource_kb"] * 1024,
+            self.settings["lite_mode_enabled"],
+        )
+        self.lite_btn.setChecked(self.lite_policy.enabled)
+        self.lite_btn.toggled.connect(self.set_lite_mode)
+        QShortcut(QKeySequence("Ctrl+Shift+D"), self, self.lite_btn.toggle)
+        self.interceptor = RequestInterceptor(blocklist, self, asset_handler, self.lite_policy, self.byte_ledger)
+        
+        # Learned URL-pattern transitions drive prefetch/preconnect of the likely next page
+        if self.settings["prefetch_enabled"]:
+            self.predictor = NavPredictor(
+                os.path.join(self.cache_dir, "nav_predictor.json"),
+                self.settings["prefetch_max_per_page"],
+                self.settings["prefetch_budget_kb_per_min"] * 1024,
+                self.settings["prefetch_min_probability"],
+                self.settings["preconnect_min_probability"],
+                size_estimate=self.byte_ledger.known_size,
+            )
+        self.interceptor.request_blocked.connect(self.update_blocked_count)
+        self.profile.setUrlRequestInterceptor(self.interceptor)
+        self.warm_up_dns()
+        
+        # Python side of the plugin bridge (zerkalo.call() in plugins)
+        self.bridge_handlers = builtin_bridge_handlers()
+        self.bridge_executor = ThreadPoolExecutor(
+            max_workers=self.settings["bridge_workers"], thread_name_prefix="bridge"
+        )
+        if world_id(self.settings["bridge_world"]) == world_id("main"):
+            logsink.warning("bridge", "! zerkalo bridge is exposed in the main world, page scripts can call it")
+        self.profile.scripts().insert(create_bridge_script(self.settings["bridge_world"]))
+        self.trace.mark("profile created")
+        
+        # Views of all tabs live in one stack, only the current one is visible
+        self.tab_stack = QStackedWidget()
+        self.main_layout.replaceWidget(self.web_placeholder, self.tab_stack)
+        self.web_placeholder.deleteLater()
+        self.tab_bar.currentChanged.connect(self.on_tab_changed)
+        self.tab_bar.tabCloseRequested.connect(self.close_tab)
+        self.init_snapshots()
+        
+        # First tab; later tabs come from the + button, Ctrl+T and target=_blank links
+        self.new_tab()
+        self.trace.mark("page and view created")
+        
+        # Performance telemetry for every navigation
+        self.telemetry = TelemetryWriter(os.path.join(self.cache_dir, "telemetry", "navigations.jsonl"))
+        self.profile.scripts().insert(create_telemetry_script())
         
         # Load plugins
-        self.plugin_scripts = {}
+        self.plugin_bundles = []
+        self.plugin_index = PluginIndex([])
         self.load_plugins()
-        
-        # Connect all page change signals
-        self.connect_page_change_signals()
+        self.watch_plugins()
+        self.trace.mark("plugins installed")
         
         # Load initial URL
         self.load_url_from_file()
+        self.trace.mark("initial navigation started")
         
-        # Connect signals
-        self.back_btn.clicked.connect(self.web_view.back)
-        self.forward_btn.clicked.connect(self.web_view.forward)
-        self.reload_btn.clicked.connect(self.web_view.reload)
-        self.url_label.mousePressEvent = self.copy_url_to_clipboard
+        # Warm the HTTP cache (and the asset store) with the mirror's critical assets while the first page loads
+        self.prewarm = None
+        if self.settings["prewarm_enabled"]:
+            self.start_prewarm(asset_handler.origins if asset_handler is not None else None)
+        
+        # Connect signals (always act on the current tab)
+        self.back_btn.clicked.connect(lambda: self.web_view.back())
+        self.forward_btn.clicked.connect(lambda: self.web_view.forward())
+        self.reload_btn.clicked.connect(lambda: self.web_view.reload())
+        self.new_tab_btn.clicked.connect(lambda: self.new_tab(self.start_url()))
+        QShortcut(QKeySequence("Ctrl+T"), self, lambda: self.new_tab(self.start_url()))
+        QShortcut(QKeySequence("Ctrl+W"), self, lambda: self.close_tab(self.tab_bar.currentIndex()))
+        
+        # Freeze and discard background tabs according to idle time and memory use
+        self.tab_policy_timer = QTimer(self)
+        self.tab_policy_timer.setInterval(self.settings["tab_policy_interval_s"] * 1000)
+        self.tab_policy_timer.timeout.connect(self.apply_tab_policy)
+        self.tab_policy_timer.start()
+        
+        # Watch renderer memory and CPU (crashed renderers are recovered either way)
+        self.watchdog = RendererWatchdog(
+            self.settings["watchdog_freeze_mb"],
+            self.settings["watchdog_reload_mb"],
+            self.settings["watchdog_recreate_mb"],
+            self.settings["watchdog_cpu_percent"],
+            self.settings["watchdog_cpu_samples"],
+            self.settings["watchdog_cooldown_s"],
+            os.path.join(self.cache_dir, "logs", "watchdog.jsonl"),
+        )
+        # Spare pages for new tabs, filled while nothing is loading
+        self.page_pool = SparePagePool(self.create_spare_page, self.settings["page_pool_size"], self.dispose_spare_page)
+        self.page_pool_timer = QTimer(self)
+        self.page_pool_timer.setSingleShot(True)
+        self.page_pool_timer.setInterval(self.settings["page_pool_refill_delay_ms"])
+        self.page_pool_timer.timeout.connect(self.refill_page_pool)
+        
+        if self.settings["watchdog_enabled"]:
+            self.watchdog_timer = QTimer(self)
+            self.watchdog_timer.setInterval(self.settings["watchdog_interval_s"] * 1000)
+            self.watchdog_timer.timeout.connect(self.check_renderers)
+            self.watchdog_timer.start()
         
         # Print cookie storage path for verification
-        print(f"Cookie storage path: {self.profile.persistentStoragePath()}")
-        print(f"Cache path: {self.profile.cachePath()}")
+        logsink.debug("app", f"Cookie storage path: {self.profile.persistentStoragePath()}")
+        logsink.debug("app", f"Cache path: {self.profile.cachePath()}")
+        launches, self.pending_launches = self.pending_launches, None
+        for message in launches:
+            self.open_launch(message)
+        self.engine_ready.emit()
+    
+    def listen_for_launches(self):
+        """Become the instance that later launches of app.py hand their URL to"""
+        self.instance_server = InstanceServer(server_name(self.cache_dir), self)
+        self.instance_server.launch_received.connect(self.open_launch)
+        if self.instance_server.listen():
+            logsink.debug("app", f"Listening for other launches on {self.instance_server.name}")
+        elif self.instance_server.taken:
+            logsink.warning("app", "! Another instance started at the same time and receives later launches")
+        else:
+            logsink.warning("app", f"✗ Could not listen for other launches: {self.instance_server.server.errorString()}")
+    
+    def open_launch(self, message):
+        """Open the URL of a forwarded launch in a new tab on the warm profile"""
+        if self.pending_launches is not None:
+            self.pending_launches.append(message)
+            return
+        url = message.get("url")
+        if url:
+            url = QUrl.fromUserInput(
+                url, message.get("cwd") or os.getcwd(), QUrl.UserInputResolutionOption.AssumeLocalFile
+            ).toString()
+        else:
+            url = self.start_url()
+        self.new_tab(url)
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+        if "sent_at" in message:
+            logsink.info("app", f"→ Opened launch from another process "
+                                f"({(time.time() - message['sent_at']) * 1000:.0f} ms after it was sent): {url}")
+    
+    def start_logging(self):
+        """Route app and page console output through the buffered log sink"""
+        settings = self.settings
+        self.log = start_logging(
+            os.path.join(self.cache_dir, "logs", "zerkalo.log"),
+            max_bytes=settings["log_max_mb"] * 1024 * 1024,
+            backups=settings["log_backups"],
+            ring_size=settings["log_ring_size"],
+            rate=settings["log_rate_per_s"],
+            burst=settings["log_burst"],
+            file_level=parse_level(settings["log_file_level"]),
+            echo_level=parse_level(settings["log_echo_level"]),
+        )
+    
+    def dump_log(self):
+        """Write the in-memory log (including lines below the echo level) to a file"""
+        try:
+            path = self.log.dump()
+        except OSError as e:
+            logsink.error("app", f"✗ Could not dump log: {str(e)}")
+            return
+        logsink.info("app", f"✓ Log dumped to {path}")
+        self.url_label.setText(f"✓ Log: {path}")
+    
+    def closeEvent(self, event):
+        # Startups that never loaded a page are the ones worth tracing
+        self.trace.mark("window closed")
+        self.trace.report()
+        # Queued snapshot writes are dropped; the stores are closed below
+        self.background.shutdown(wait=False, cancel_futures=True)
+        if self.instance_server is not None:
+            self.instance_server.close()
+        if self.asset_store is not None:
+            stats = self.asset_store.stats()
+            logsink.info("assets", f"Asset store: {stats['hits']} hits, {stats['stale_hits']} stale, "
+                                   f"{stats['misses']} misses, {stats['evictions']} evictions, {stats['bytes'] / 1024 / 1024:.1f} MB stored")
+            self.asset_store.close()
+        if self.snapshots is not None:
+            stats = self.snapshots.stats()
+            logsink.info("snapshots", f"Snapshots: {stats['hits']} shown, {stats['misses']} misses, "
+                                      f"{stats['entries']} stored ({stats['bytes'] / 1024 / 1024:.1f} MB)")
+            self.snapshots.close()
+        if self.page_pool is not None:
+            stats = self.page_pool.stats()
+            logsink.info("pool", f"Spare pages: {stats['hits']} hits, {stats['misses']} misses, "
+                                 f"{stats['saved_ms']:.0f} ms saved")
+            self.page_pool.clear()
+        if self.predictor is not None:
+            stats = self.predictor.stats()
+            logsink.info("predictor", f"Prefetch: {stats['prefetches']} prefetched, {stats['preconnects']} preconnected, "
+                                      f"{stats['hit_rate']:.0%} of loads hit, {stats['saved_ms']:.0f} ms saved")
+            self.predictor.save()
+        if self.byte_ledger is not None:
+            session = self.byte_ledger.session
+            logsink.info("app", f"Data: {format_bytes(session['bytes'])} transferred, "
+                                f"~{format_bytes(session['saved'])} saved by lite mode")
+        if self.bridge_executor is not None:
+            self.bridge_executor.shutdown(wait=False, cancel_futures=True)
+        self.log.close()
+        super().closeEvent(event)
     
     def create_button(self, text, tooltip):
         button = QPushButton(text)
@@ -206,95 +566,821 @@ class ModernBrowser(QMainWindow):
         """)
         return button
     
-    def connect_page_change_signals(self):
+    @property
+    def current_tab(self):
+        index = self.tab_bar.currentIndex()
+        return self.tabs[index] if 0 <= index < len(self.tabs) else None
+    
+    @property
+    def web_page(self):
+        """Page of the current tab"""
+        tab = self.current_tab
+        return tab.page if tab else None
+    
+    @property
+    def web_view(self):
+        """View of the current tab"""
+        tab = self.current_tab
+        return tab.view if tab else None
+    
+    def new_tab(self, url=None, background=False):
+        """Open a tab on the shared profile, optionally loading url"""
+        spare = self.page_pool.take() if self.page_pool is not None else None
+        if spare is not None:
+            page, view = spare
+            self.schedule_page_pool_refill()
+        else:
+            page, view = self.create_page()
+        tab = BrowserTab(page, view)
+        self.connect_page_signals(tab)
+        self.connect_page_change_signals(tab)
+        
+        self.tabs.append(tab)
+        self.tab_stack.addWidget(view)
+        index = self.tab_bar.addTab("Новая вкладка")
+        if not background:
+            self.tab_bar.setCurrentIndex(index)
+        if url:
+            view.load(QUrl(url))
+        return tab
+    
+    def create_page(self, view=None):
+        """New page with the app's settings and lite state, in a new view or in the given one"""
+        from webpage import WebEnginePage, create_view, configure_page
+        page = WebEnginePage(self.profile, self)
+        if view is None:
+            return page, create_view(page, self.lite_policy.enabled)
+        configure_page(page, self.lite_policy.enabled)
+        view.setPage(page)
+        return page, view
+    
+    def create_spare_page(self):
+        """Page and view for the pool, with the renderer started on a blank document"""
+        page, view = self.create_page()
+        started = time.perf_counter()
+        def on_warm(ok):
+            page.loadFinished.disconnect(on_warm)
+            self.page_pool.record_warm((time.perf_counter() - started) * 1000)
+        page.loadFinished.connect(on_warm)
+        page.load(QUrl("about:blank"))
+        return page, view
+    
+    def dispose_spare_page(self, spare):
+        page, view = spare
+        view.deleteLater()
+        page.deleteLater()
+    
+    def schedule_page_pool_refill(self):
+        if self.page_pool.needs_refill():
+            self.page_pool_timer.start()
+    
+    def refill_page_pool(self):
+        """Build one spare page per idle period so refilling never competes with a navigation"""
+        if any(tab.loading for tab in self.tabs):
+            self.page_pool_timer.start()
+            return
+        if self.page_pool.refill_one():
+            logsink.debug("pool", f"↻ Spare page ready ({len(self.page_pool.spares)}/{self.page_pool.size})")
+        self.schedule_page_pool_refill()
+    
+    def init_snapshots(self):
+        """Cache of recent pages' DOM, shown while the live page of the same URL loads"""
+        self.snapshot_tab = None  # Tab the snapshot view currently stands in for
+        self.snapshot_pending = None  # (tab, url) of the snapshot being read
+        if not self.settings["snapshot_enabled"]:
+            return
+        self.snapshot_read.connect(self.on_snapshot_read)
+        from webpage import QWebEnginePage
+        self.snapshots = SnapshotCache(
+            os.path.join(self.cache_dir, "snapshots.sqlite"),
+            self.settings["snapshot_max_entries"],
+            self.settings["snapshot_max_mb"] * 1024 * 1024,
+        )
+        self.snapshot_page, self.snapshot_view = self.create_page()
+        self.snapshot_page.loadFinished.connect(self.on_snapshot_loaded)
+        # The snapshot page only ever shows what show_snapshot() hands it (a typed load);
+        # clicks and form submits on the stale copy go to the live page, anything else is dropped
+        forwarded = (
+            QWebEnginePage.NavigationType.NavigationTypeLinkClicked,
+            QWebEnginePage.NavigationType.NavigationTypeFormSubmitted,
+        )
+        def follow_links(url, navigation_type, is_main_frame):
+            if not is_main_frame or navigation_type == QWebEnginePage.NavigationType.NavigationTypeTyped:
+                return True
+            if navigation_type in forwarded and self.snapshot_tab is not None:
+                self.snapshot_tab.view.load(url)
+            return False
+        self.snapshot_page.navigation_handler = follow_links
+        self.tab_stack.addWidget(self.snapshot_view)
+    
+    def on_navigation_requested(self, tab, url, navigation_type, is_main_frame):
+        """Remember where the old page was scrolled and put up the new URL's snapshot"""
+        if not is_main_frame or self.snapshots is None:
+            return True
+        from webpage import QWebEnginePage
+        fragment = QUrl.UrlFormattingOption.RemoveFragment
+        if (url.adjusted(fragment) == tab.page.url().adjusted(fragment)
+                and navigation_type != QWebEnginePage.NavigationType.NavigationTypeReload):
+            return True  # Same-document navigation, no load to cover
+        self.remember_scroll(tab)
+        if tab is self.current_tab:
+            self.show_snapshot(tab, url.toString())
+        return True
+    
+    def remember_scroll(self, tab):
+        # The old document is still alive until the new one commits
+        url = tab.last_url
+        if url:
+            tab.page.runJavaScript(
+                "[window.scrollX, window.scrollY]",
+                lambda scroll: scroll and self.background.submit(self.snapshots.set_scroll, url, *scroll),
+            )
+    
+    def show_snapshot(self, tab, url):
+        """Read url's snapshot on a worker thread, on_snapshot_read() puts it up"""
+        if not self.snapshots.cached(url):
+            self.hide_snapshot()
+            return
+        self.snapshot_pending = (tab, url)
+        self.background.submit(lambda: self.snapshot_read.emit(tab, url, self.snapshots.get(url)))
+    
+    def on_snapshot_read(self, tab, url, entry):
+        pending, self.snapshot_pending = self.snapshot_pending, None
+        # The live page may have won, or the user moved on, while the snapshot was read
+        if pending is None or pending[0] is not tab or pending[1] != url or tab is not self.current_tab:
+            return
+        if entry is None:
+            self.hide_snapshot()
+            return
+        html, scroll, captured = entry
+        self.snapshot_tab = tab
+        self.snapshot_scroll = scroll
+        self.snapshot_started = time.perf_counter()
+        # The fragment keeps the plugins from running a second time on their own output
+        base_url = QUrl(url)
+        base_url.setFragment(SNAPSHOT_FRAGMENT)
+        self.snapshot_page.setHtml(html + stale_banner(captured), base_url)
+        self.tab_stack.setCurrentWidget(self.snapshot_view)
+        self.url_label.setText(f"⟳ {url}")
+    
+    def on_snapshot_loaded(self, ok):
+        if self.snapshot_tab is None:
+            return
+        if not ok:
+            logsink.debug("snapshots", "✗ Snapshot could not be shown")
+            self.hide_snapshot()
+            return
+        x, y = self.snapshot_scroll
+        self.snapshot_page.runJavaScript(f"window.scrollTo({x}, {y});")
+        shown_ms = (time.perf_counter() - self.snapshot_started) * 1000
+        if not self.first_load_done:
+            self.trace.mark("snapshot shown")
+        logsink.debug("snapshots", f"✓ Snapshot shown in {shown_ms:.0f} ms")
+    
+    def hide_snapshot(self, tab=None):
+        """Swap the stale copy for the live page (only if it stands in for tab, when given)"""
+        if self.snapshot_pending is not None and (tab is None or self.snapshot_pending[0] is tab):
+            self.snapshot_pending = None
+        if self.snapshot_tab is None or (tab is not None and tab is not self.snapshot_tab):
+            return
+        replaced_ms = (time.perf_counter() - self.snapshot_started) * 1000
+        logsink.debug("snapshots", f"↻ Live page replaced the snapshot after {replaced_ms:.0f} ms")
+        self.snapshot_tab = None
+        if self.current_tab is not None:
+            self.tab_stack.setCurrentWidget(self.current_tab.view)
+            self.url_label.setText(self.current_tab.page.url().toString())
+    
+    def capture_snapshot(self, tab, url):
+        """Store the loaded page's DOM (compressed and written on a worker thread)"""
+        if self.snapshots is None or tab not in self.tabs or tab.page.url().toString() != url:
+            return
+        tab.page.toHtml(lambda html: self.background.submit(self.snapshots.put, url, html))
+    
+    def create_window(self, window_type):
+        """Pages opened by target=_blank links and window.open() become tabs"""
+        from webpage import QWebEnginePage
+        background = window_type == QWebEnginePage.WebWindowType.WebBrowserBackgroundTab
+        return self.new_tab(background=background).page
+    
+    def close_tab(self, index):
+        if len(self.tabs) <= 1 or not 0 <= index < len(self.tabs):
+            return
+        tab = self.tabs.pop(index)
+        self.watchdog.forget(id(tab))
+        self.hide_snapshot(tab)
+        if tab is self.active_tab:
+            self.active_tab = None
+        self.tab_stack.removeWidget(tab.view)
+        self.tab_bar.removeTab(index)
+        tab.view.deleteLater()
+        tab.page.deleteLater()
+    
+    def on_tab_changed(self, index):
+        """Bring the selected tab back to Active (discarded tabs reload by themselves)"""
+        if not 0 <= index < len(self.tabs):
+            return
+        from webpage import QWebEnginePage
+        now = time.monotonic()
+        if self.active_tab is not None:
+            self.active_tab.last_active = now
+        tab = self.tabs[index]
+        tab.last_active = now
+        self.active_tab = tab
+        self.snapshot_tab = None
+        self.snapshot_pending = None
+        
+        # The page must be Active before it becomes visible
+        if tab.page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+            logsink.info("tabs", f"↻ Tab '{tab.title}': {tab.state()} → Active")
+            tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        self.tab_stack.setCurrentWidget(tab.view)
+        
+        self.url_label.setText(tab.page.url().toString())
+        self.update_window_title(tab.title)
+        self.update_blocked_count()
+    
+    def apply_tab_policy(self):
+        """Freeze idle background tabs, discard long-idle ones and enforce the memory budget"""
+        from webpage import QWebEnginePage
+        Active = QWebEnginePage.LifecycleState.Active
+        Frozen = QWebEnginePage.LifecycleState.Frozen
+        Discarded = QWebEnginePage.LifecycleState.Discarded
+        
+        now = time.monotonic()
+        background = [tab for tab in self.tabs if tab is not self.current_tab]
+        for tab in background:
+            idle = now - tab.last_active
+            state = tab.page.lifecycleState()
+            if state != Discarded and idle > self.settings["tab_discard_after_s"]:
+                self.set_tab_state(tab, Discarded, f"idle {idle:.0f} s")
+            elif state == Active and idle > self.settings["tab_freeze_after_s"]:
+                self.set_tab_state(tab, Frozen, f"idle {idle:.0f} s")
+        
+        # Over budget: discard least recently used background tabs first
+        budget_kb = self.settings["tab_memory_budget_mb"] * 1024
+        usage_kb = total_rss_kb(tab.page.renderProcessPid() for tab in self.tabs)
+        for tab in sorted(background, key=lambda t: t.last_active):
+            if usage_kb <= budget_kb:
+                break
+            if tab.page.lifecycleState() == Discarded:
+                continue
+            usage_kb -= tab.memory_kb()
+            self.set_tab_state(tab, Discarded, f"renderers over {budget_kb // 1024} MB budget")
+        
+        self.update_tab_tooltips()
+    
+    def set_tab_state(self, tab, state, reason):
+        memory_mb = tab.memory_kb() / 1024
+        logsink.info("tabs", f"→ Tab '{tab.title}': {tab.state()} → {state.name} ({reason}, {memory_mb:.0f} MB)")
+        tab.page.setLifecycleState(state)
+    
+    def tab_report(self):
+        """[(title, lifecycle state, renderer MB, idle seconds)] for every tab"""
+        now = time.monotonic()
+        return [
+            (tab.title, tab.state(), tab.memory_kb() / 1024, 0 if tab is self.current_tab else now - tab.last_active)
+            for tab in self.tabs
+        ]
+    
+    def update_tab_tooltips(self):
+        for index, (title, state, memory_mb, idle) in enumerate(self.tab_report()):
+            self.tab_bar.setTabToolTip(index, f"{title}\n{state} · {memory_mb:.0f} MB · idle {idle:.0f} s")
+    
+    def register_bridge_handler(self, name, function, heavy=False):
+        """Make function callable from plugins as zerkalo.call(name, [args]).
+        
+        Heavy (CPU-bound) handlers run on the bridge thread pool instead of the GUI thread.
+        """
+        self.bridge_handlers[name] = (function, heavy)
+    
+    def check_renderers(self):
+        """Sample every live renderer and apply the watchdog's verdict"""
+        from webpage import QWebEnginePage
+        Active = QWebEnginePage.LifecycleState.Active
+        for tab in list(self.tabs):
+            state = tab.page.lifecycleState()
+            if state == QWebEnginePage.LifecycleState.Discarded:
+                continue
+            background = tab is not self.current_tab
+            rss, cpu = self.watchdog.sample(id(tab), tab.page.renderProcessPid())
+            verdict = self.watchdog.decide(id(tab), rss, cpu, background)
+            if verdict is None:
+                continue
+            action, reason = verdict
+            if action == "freeze" and state != Active:
+                continue
+            if background and action in ("reload", "recreate"):
+                # Nobody is looking at the page, it can come back when selected
+                action = "discard"
+            self.watchdog.record(id(tab), action, reason, tab.title, tab.last_url, rss, cpu)
+            if action == "freeze":
+                tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Frozen)
+            elif action == "discard":
+                tab.page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+            elif action == "reload":
+                tab.view.reload()
+            else:
+                self.recreate_page(tab)
+    
+    def recreate_page(self, tab):
+        """Replace the tab's page with a fresh one and load its last URL again"""
+        old_page = tab.page
+        url = tab.last_url or old_page.url().toString()
+        tab.page, _ = self.create_page(tab.view)
+        self.connect_page_signals(tab)
+        old_page.deleteLater()
+        if url:
+            tab.view.load(QUrl(url))
+    
+    def on_render_process_terminated(self, tab, page, status, exit_code):
+        """Reload the last URL of a page whose renderer crashed or was killed"""
+        from webpage import QWebEnginePage
+        if page is not tab.page or tab not in self.tabs:
+            return  # Replaced or closed page
+        if (status == QWebEnginePage.RenderProcessTerminationStatus.NormalTerminationStatus
+                or page.lifecycleState() == QWebEnginePage.LifecycleState.Discarded):
+            return
+        reason = f"renderer {status.name}, exit code {exit_code}"
+        last = self.watchdog.last_action.get(id(tab))
+        if last is not None and last[0] == "crash-reload" and time.monotonic() - last[1] < self.watchdog.cooldown:
+            # Crashing again right after recovery, don't loop
+            self.watchdog.record(id(tab), "crash", reason, tab.title, tab.last_url)
+            return
+        self.watchdog.record(id(tab), "crash-reload", reason, tab.title, tab.last_url)
+        # Make sure the reloaded page gets the current plugin bundles
+        self.install_plugins()
+        if tab.last_url:
+            QTimer.singleShot(0, lambda: tab.view.load(QUrl(tab.last_url)))
+    
+    def connect_page_signals(self, tab):
+        """Connect the signals of the tab's current page (pages are replaced on recreation)"""
+        from webpage import attach_bridge
+        page = tab.page
+        page.create_window_handler = self.create_window
+        page.navigation_handler = lambda url, navigation_type, is_main_frame: self.on_navigation_requested(
+            tab, url, navigation_type, is_main_frame
+        )
+        attach_bridge(page, self.bridge_handlers, self.bridge_executor, self.settings["bridge_world"])
+        page.loadingChanged.connect(lambda info: self.on_loading_changed(tab, info))
+        page.renderProcessTerminated.connect(
+            lambda status, exit_code: self.on_render_process_terminated(tab, page, status, exit_code)
+        )
+    
+    def connect_page_change_signals(self, tab):
         """Connect to all signals that indicate page content has changed"""
         # Connect to load finished signal
-        self.web_view.loadFinished.connect(self.on_page_loaded)
+        tab.view.loadFinished.connect(lambda success: self.on_page_loaded(tab, success))
         
         # Connect to navigation signals
-        self.web_view.urlChanged.connect(self.on_url_changed)
-        
-        # Connect to page reload signals
-        self.reload_btn.clicked.connect(self.on_reload_triggered)
+        tab.view.urlChanged.connect(lambda url: self.on_url_changed(tab, url))
+        tab.view.titleChanged.connect(lambda title: self.on_title_changed(tab, title))
+        tab.view.loadStarted.connect(lambda: self.on_load_started(tab))
+    
+    def on_load_started(self, tab):
+        """Stop background work that would compete with a user navigation"""
+        tab.loading = True
+        tab.load_started = time.perf_counter()
+        if self.first_load_done and self.prewarm is not None:
+            self.stop_prewarm("foreground navigation")
     
-    def on_page_loaded(self, success):
+    def on_page_loaded(self, tab, success):
         """Handle page load completion"""
+        tab.loading = False
+        self.schedule_page_pool_refill()
+        if tab.page.url().toString() == "about:blank":
+            return  # Blank document of a spare page
+        self.hide_snapshot(tab)
         if success:
-            print("✓ Page loaded successfully")
-            # Reset injection state for new page
-            self.web_page.reset_injection_state()
-            self.inject_plugins()
+            logsink.info("app", "✓ Page loaded successfully")
+            if not self.first_load_done:
+                self.first_load_done = True
+                self.trace.mark("first page loaded")
+            # Give late long tasks and paints a moment to land before reading them
+            url = tab.page.url().toString()
+            if self.predictor is not None and tab.load_started is not None:
+                tab.prefetched = self.predictor.record_load(url, (time.perf_counter() - tab.load_started) * 1000)
+                if tab.prefetched:
+                    logsink.debug("predictor", f"✓ Prefetch hit: {url}")
+                if tab is self.current_tab:
+                    self.prefetch_next(tab, url)
+            run, skipped = self.plugin_index.split(url)
+            logsink.info("plugins", f"Plugins on {url}: {len(run)} run, {len(skipped)} skipped")
+            QTimer.singleShot(1000, lambda: self.collect_telemetry(tab, url))
+            QTimer.singleShot(500, lambda: self.capture_snapshot(tab, url))
         else:
-            print("✗ Page load failed")
+            logsink.warning("app", "✗ Page load failed")
+            if not self.first_load_done:
+                self.trace.mark("first page failed")
+                self.trace.report()
+    
+    def prefetch_next(self, tab, url):
+        """Hint Chromium to prefetch (or preconnect to) the links the user most likely follows next"""
+        from webpage import PLUGIN_WORLDS
+        
+        def on_links(links):
+            if not links or tab not in self.tabs or tab.page.url().toString() != url:
+                return
+            # Lite mode blocks prefetches anyway, a preconnect costs next to nothing
+            hints = self.predictor.plan(url, links, allow_prefetch=not self.lite_policy.enabled)
+            if hints:
+                tab.page.runJavaScript(HINTS_SCRIPT % json.dumps(hints), PLUGIN_WORLDS["application"])
+                logsink.debug("predictor", "→ " + ", ".join(f"{hint['rel']} {hint['href']}" for hint in hints))
+        
+        tab.page.runJavaScript(LINKS_SCRIPT, PLUGIN_WORLDS["application"], on_links)
+    
+    def on_title_changed(self, tab, title):
+        tab.title = title
+        if tab in self.tabs:
+            self.tab_bar.setTabText(self.tabs.index(tab), title or "Новая вкладка")
+        if tab is self.current_tab:
+            self.update_window_title(title)
+    
+    def start_prewarm(self, origins=None):
+        """Preload critical assets from prewarm.txt, or the ones recent sessions used, in a hidden page.
+        
+        The page is on the browser's profile and has the mirror's origin, so the requests carry
+        the profile's cookies and the responses land in the HTTP cache partition the mirror's
+        pages use; with the asset store on, the mirror's own assets also land in the store.
+        """
+        mirror = self.mirrors.current if self.mirrors else None
+        if mirror is None:
+            return
+        urls = read_manifest("prewarm.txt")
+        if not urls:
+            urls = learn_manifest(
+                self.telemetry.path,
+                self.settings["prewarm_learn_navigations"],
+                self.settings["prewarm_max_urls"],
+                origins,
+            )
+        urls = urls[:self.settings["prewarm_max_urls"]]
+        if not urls:
+            return
+        from webpage import WebEnginePage, configure_page
+        page = WebEnginePage(self.profile, self)
+        configure_page(page, self.lite_policy.enabled)
+        base_url = QUrl(url_origin(mirror) + "/")
+        base_url.setFragment(WARMUP_FRAGMENT)
+        started = time.perf_counter()
+        page.loadFinished.connect(lambda ok: self.on_prewarm_loaded(page, started))
+        QTimer.singleShot(PREWARM_TIMEOUT_MS, lambda: self.prewarm is page and self.stop_prewarm("timed out"))
+        self.prewarm = page
+        page.setHtml(prewarm_html(urls), base_url)
+        logsink.info("prewarm", f"→ Pre-warming {len(urls)} assets")
+    
+    def on_prewarm_loaded(self, page, started):
+        """Log what the preloads fetched and drop the page"""
+        if page is not self.prewarm:
+            return  # Stopped already
+        self.prewarm = None
+        def report(result):
+            summary = prewarm_summary(json.loads(result) if result else [])
+            logsink.info("prewarm", f"✓ Pre-warm finished in {(time.perf_counter() - started) * 1000:.0f} ms: "
+                                    f"{summary['fetched']}/{summary['requested']} assets fetched, "
+                                    f"{summary['bytes'] / 1024:.0f} KB")
+            page.deleteLater()
+        page.runJavaScript(PREWARM_RESULT_SCRIPT, report)
+    
+    def stop_prewarm(self, reason):
+        """Drop the pre-warm page, which cancels its preloads (the foreground needs the bandwidth)"""
+        page, self.prewarm = self.prewarm, None
+        page.deleteLater()
+        logsink.info("prewarm", f"! Pre-warm stopped: {reason}")
+    
+    def update_blocked_count(self, first_party_url=None):
+        """Show how many requests the blocklist stopped on the current page"""
+        page_url = self.web_page.url().toString()
+        if first_party_url is None or first_party_url == page_url:
+            self.blocked_label.setText(f"🛡 {self.interceptor.blocked_count(page_url)}")
+            self.update_data_usage()
     
-    def on_url_changed(self, url):
+    def update_data_usage(self):
+        """Show what the current page transferred and what lite mode kept off the network"""
+        page_url = self.web_page.url().toString()
+        transferred, saved, blocked = self.byte_ledger.totals(page_url)
+        unmeasured = self.byte_ledger.unmeasured(page_url)
+        # Cross-origin sizes Resource Timing hides are not in the total, say so instead of guessing
+        text = f"⇣ {format_bytes(transferred)}{'+' if unmeasured else ''}"
+        if blocked:
+            text += f" (−{format_bytes(saved)})"
+        self.data_label.setText(text)
+        lines = ["Data used by this page"] + self.byte_ledger.breakdown(page_url)
+        if unmeasured:
+            lines.append(f"+ {unmeasured} cross-origin requests of unknown size "
+                         f"(their servers send no Timing-Allow-Origin)")
+        session = self.byte_ledger.session
+        lines.append(f"Session: {format_bytes(session['bytes'])} used, ~{format_bytes(session['saved'])} saved by lite mode"
+                     + (f", {session['unmeasured']} requests unmeasured" if session["unmeasured"] else ""))
+        self.data_label.setToolTip("\n".join(lines))
+    
+    def set_lite_mode(self, enabled):
+        """Switch lite mode; applies to requests from now on, reload to re-fetch a page"""
+        from webpage import apply_lite_settings
+        self.lite_policy.enabled = enabled
+        for tab in self.tabs:
+            apply_lite_settings(tab.view, enabled)
+        for _, view in self.page_pool.spares:
+            apply_lite_settings(view, enabled)
+        logsink.info("app", f"{'✓ Lite mode on' if enabled else '✗ Lite mode off'} "
+                            f"(blocking {', '.join(sorted(self.lite_policy.rules))}, "
+                            f"resources over {format_bytes(self.lite_policy.max_bytes)})")
+        self.url_label.setText("Lite mode on" if enabled else "Lite mode off")
+    
+    def collect_telemetry(self, tab, url):
+        """Read Navigation/Resource/Paint timings of the loaded page into the telemetry file"""
+        from webpage import PLUGIN_WORLDS
+        if tab not in self.tabs or tab.page.url().toString() != url:
+            return  # Navigated away or closed already
+        
+        # The mirror that served this page, which is not the current one after a failover
+        mirror = self.mirrors.mirror_for(url) if self.mirrors else None
+        plugins, skipped = self.plugin_index.split(url)
+        
+        def store(collected):
+            if collected:
+                record = make_record(url, mirror, plugins, collected)
+                record["pluginsSkipped"] = sorted(skipped)
+                record["prefetchHit"] = tab.prefetched
+                page = self.byte_ledger.account(url, record)
+                record["bytes"] = page["bytes"]
+                if page["unmeasured"]:
+                    record["bytesUnmeasured"] = page["unmeasured"]
+                if page["blocked"]:
+                    record["lite"] = {"blocked": page["blocked"], "saved": page["saved"]}
+                if tab is self.current_tab:
+                    self.update_data_usage()
+                if self.asset_store is not None:
+                    record["asset_store"] = self.asset_store.stats()
+                self.telemetry.write(record)
+                if self.settings["plugin_budget_enabled"]:
+                    disabled = self.plugin_budget.observe(record)
+                    if disabled:
+                        self.disable_plugins(disabled)
+                        self.url_label.setText(f"! Disabled slow plugin(s): {', '.join(disabled)}")
+        
+        tab.page.runJavaScript(COLLECT_SCRIPT, PLUGIN_WORLDS["application"], store)
+    
+    def on_loading_changed(self, tab, info):
+        """Fail over when a load failed on the network, not when it was stopped or aborted"""
+        from webpage import is_mirror_failure
+        if is_mirror_failure(info):
+            logsink.warning("mirrors", f"✗ {info.url().toString()}: {info.errorString()} "
+                                       f"({info.errorDomain().name} {info.errorCode()})")
+            self.fail_over_mirror(tab, info.url().toString())
+    
+    def fail_over_mirror(self, tab, failed_url):
+        """Move the failed navigation to the next best mirror"""
+        if self.mirrors is None or not self.mirrors.owns(failed_url):
+            return
+        
+        mirror = self.mirrors.next_mirror()
+        if mirror is None:
+            logsink.error("mirrors", "✗ All mirrors failed")
+            self.url_label.setText("Error: no mirror is reachable")
+            self.setWindowTitle("Ответы@Live - Ошибка сети")
+            return
+        
+        url = self.mirrors.rebase(failed_url, mirror)
+        logsink.warning("mirrors", f"↻ Switching to mirror: {mirror}")
+        tab.view.load(QUrl(url))
+    
+    def on_url_changed(self, tab, url):
         """Handle URL changes (navigation)"""
-        print(f"→ Navigating to: {url.toString()}")
-        # Reset injection state for new page
-        self.web_page.reset_injection_state()
-        # Inject plugins after a short delay to ensure DOM is ready
-        from PyQt6.QtCore import QTimer
-        QTimer.singleShot(500, self.inject_plugins)
-    
-    def on_reload_triggered(self):
-        """Handle explicit reloads"""
-        print("↻ Reloading page...")
-        # Reset injection state for reloaded page
-        self.web_page.reset_injection_state()
-        # Inject plugins after reload completes
-        self.web_view.loadFinished.connect(self.inject_plugins_once)
-    
-    def inject_plugins_once(self, success):
-        """Inject plugins and disconnect from the signal"""
-        if success:
-            self.inject_plugins()
-        self.web_view.loadFinished.disconnect(self.inject_plugins_once)
+        # Plugins are user scripts now, Chromium runs them for every navigation
+        logsink.info("app", f"→ Navigating to: {url.toString()}")
+        fragment = QUrl.UrlFormattingOption.RemoveFragment
+        if (self.predictor is not None and tab.last_url.startswith(("http://", "https://"))
+                and url.scheme() in ("http", "https")
+                and QUrl(tab.last_url).adjusted(fragment) != url.adjusted(fragment)):
+            self.predictor.observe(tab.last_url, url.toString())
+        if not url.isEmpty():
+            tab.last_url = url.toString()
+        if tab is self.current_tab:
+            self.update_url_display(url)
+            self.update_blocked_count()
     
     def load_plugins(self):
-        """Load all JavaScript plugins from the plugins directory"""
+        """Bundle JavaScript plugins from the plugins directory (cached under browser_data)"""
         plugin_dir = os.path.join(os.getcwd(), "plugins")
         os.makedirs(plugin_dir, exist_ok=True)
-        print(f"Loading plugins from: {plugin_dir}")
+        logsink.debug("plugins", f"Loading plugins from: {plugin_dir}")
+        
+        self.plugin_budget = PluginBudget(
+            os.path.join(self.cache_dir, "plugins_disabled.json"),
+            self.settings["plugin_budget_ms"],
+            self.settings["plugin_budget_strikes"],
+            self.settings["plugin_budget_window"],
+        )
+        if self.plugin_budget.disabled:
+            logsink.warning("plugins", f"! Plugins disabled for going over budget: "
+                                       f"{', '.join(sorted(self.plugin_budget.disabled))}")
+        self.plugin_bundler = PluginBundler(plugin_dir, os.path.join(self.cache_dir, "plugin_cache"))
+        self.plugin_bundles = self.plugin_bundler.build(self.plugin_disabled())
+        self.install_plugins()
+    
+    def watch_plugins(self):
+        """Reload plugins when files in the plugins directory change"""
+        self.plugin_reload_timer = QTimer(self)
+        self.plugin_reload_timer.setSingleShot(True)
+        self.plugin_reload_timer.setInterval(300)  # Editors write in bursts, wait for them to settle
+        self.plugin_reload_timer.timeout.connect(self.reload_plugins)
+        
+        self.plugin_watcher = QFileSystemWatcher(self)
+        self.plugin_watcher.directoryChanged.connect(self.plugin_reload_timer.start)
+        self.plugin_watcher.fileChanged.connect(self.plugin_reload_timer.start)
+        self.update_plugin_watch_list()
+    
+    def update_plugin_watch_list(self):
+        """Watch the directory plus every plugin file (atomic saves replace the file)"""
+        paths = [self.plugin_bundler.plugin_dir]
+        paths += [os.path.join(self.plugin_bundler.plugin_dir, name) for name in self.plugin_bundler.hashes]
+        watched = set(self.plugin_watcher.files() + self.plugin_watcher.directories())
+        missing = [path for path in paths if path not in watched]
+        if missing:
+            self.plugin_watcher.addPaths(missing)
+    
+    def reload_plugins(self):
+        """Re-install bundles and re-run only the plugins whose content changed"""
+        from webpage import world_id
+        self.plugin_bundles, changed, removed = self.plugin_bundler.rebuild(self.plugin_disabled())
+        self.update_plugin_watch_list()
+        if not changed and not removed:
+            return
         
-        # Clear existing plugins
-        self.plugin_scripts = {}
+        # The user scripts take effect on the next navigation
+        self.install_plugins()
         
-        for file_path in glob.glob(os.path.join(plugin_dir, "*.js")):
-            plugin_name = os.path.basename(file_path)
+        # Bring open pages up to date without reloading them
+        # (frozen and discarded tabs pick up the new bundle when they wake up)
+        from webpage import QWebEnginePage
+        live_pages = [tab.page for tab in self.tabs
+                      if tab.page.lifecycleState() == QWebEnginePage.LifecycleState.Active]
+        for name in changed:
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    self.plugin_scripts[plugin_name] = f.read()
-                    print(f"✓ Loaded plugin: {plugin_name}")
+                plugin = self.plugin_bundler.get_plugin(name)
             except Exception as e:
-                print(f"✗ Error loading plugin {plugin_name}: {str(e)}")
+                logsink.error("plugins", f"✗ Error reloading plugin {name}: {str(e)}")
+                continue
+            for page in live_pages:
+                # Only pages the plugin's @match/@exclude patterns accept
+                if name in self.plugin_index.split(page.url().toString())[0]:
+                    page.runJavaScript(wrap_plugin(plugin), world_id(plugin.world))
+            logsink.info("plugins", f"↻ Re-injected plugin: {name}")
+        for name in removed:
+            # Code that already ran cannot be undone, let plugins clean up after themselves
+            for page in live_pages:
+                page.runJavaScript(
+                    f"window.dispatchEvent(new CustomEvent('zerkalo:plugin-unload', {{detail: {json.dumps(name)}}}));"
+                )
+            logsink.info("plugins", f"✗ Unregistered plugin: {name}")
+    
+    def plugin_disabled(self):
+        """Plugins left out of the bundles (auto-disabled for going over budget)"""
+        return self.plugin_budget.disabled if self.settings["plugin_budget_enabled"] else set()
+    
+    def disable_plugins(self, names):
+        """Drop plugins from the bundles; open pages are asked to unload them"""
+        self.plugin_bundles = self.plugin_bundler.build(self.plugin_disabled())
+        self.install_plugins()
+        from webpage import QWebEnginePage
+        for tab in self.tabs:
+            if tab.page.lifecycleState() != QWebEnginePage.LifecycleState.Active:
+                continue
+            for name in names:
+                tab.page.runJavaScript(
+                    f"window.dispatchEvent(new CustomEvent('zerkalo:plugin-unload', {{detail: {json.dumps(name)}}}));"
+                )
+    
+    def install_plugins(self):
+        """Register plugin bundles as user scripts on the profile (once, not per navigation)"""
+        from webpage import install_bundle_scripts
+        install_bundle_scripts(self.profile, self.plugin_bundles)
+        self.plugin_index = PluginIndex(self.plugin_bundles)
+        if not self.plugin_bundles:
+            logsink.info("plugins", "! No plugins to install")
+            return
         
-        # Inject immediately if page is already loaded
-        if self.web_view.url().isValid():
-            self.web_page.reset_injection_state()
-            self.inject_plugins()
+        plugin_count = sum(len(bundle["plugins"]) for bundle in self.plugin_bundles)
+        scoped = sum(len(bundle["plugins"]) for bundle in self.plugin_bundles
+                     if bundle.get("match") or bundle.get("include"))
+        logsink.info("plugins", f"✓ Installed {plugin_count} plugins as {len(self.plugin_bundles)} bundled user script(s)"
+                                f" ({scoped} URL-scoped)")
+    
+    def configure_dns(self):
+        """Pick the resolver QtWebEngine uses (read when WebEngine starts, so before init_engine)"""
+        dns_server = self.settings["dns_server"]
+        if dns_server:
+            os.environ["QTWEBENGINE_DNS_SERVER_ADDRESS"] = dns_server
+    
+    def warmup_origins(self):
+        """Mirrors first, then the origins recent navigations used most"""
+        origins = [url_origin(url) for url in self.mirrors.urls] if self.mirrors else []
+        origins += self.recent_origins.result()
+        return list(dict.fromkeys(origin for origin in origins if origin))
     
-    def inject_plugins(self):
-        """Inject all loaded plugins into the current page"""
-        if not self.plugin_scripts:
-            print("! No plugins to inject")
+    def warm_up_dns(self):
+        """Have Chromium resolve (and preconnect to) the likely hosts while the first page loads.
+        
+        A hidden page carries the dns-prefetch/preconnect hints, so the lookups go through
+        the resolver WebEngine uses (dns_server) and the connections stay in its pool.
+        """
+        if not self.settings["dns_warmup_enabled"]:
+            return
+        origins = self.warmup_origins()
+        if not origins:
             return
-            
-        print(f"→ Injecting {len(self.plugin_scripts)} plugins...")
-        self.web_page.inject_plugins(self.plugin_scripts)
+        from webpage import WebEnginePage, configure_page
+        page = WebEnginePage(self.profile, self)
+        configure_page(page, self.lite_policy.enabled)
+        # The first mirror's origin, as for the pages that use the connections; the fragment keeps plugins off
+        base_url = QUrl(origins[0] + "/")
+        base_url.setFragment(WARMUP_FRAGMENT)
+        # Keep the page until Chromium has acted on the hints
+        page.loadFinished.connect(lambda ok: QTimer.singleShot(DNS_WARMUP_PAGE_MS, page.deleteLater))
+        page.setHtml(warmup_html(origins, self.settings["dns_warmup_connect"]), base_url)
+        logsink.info("dns", f"→ Warming up DNS{' and connections' if self.settings['dns_warmup_connect'] else ''} "
+                            f"for {len(origins)} origins")
+    
+    def start_host_resolution(self):
+        """With dns_pin_hosts, resolve the warm-up hosts with the OS resolver while the window is built"""
+        self.host_resolution = None
+        if not self.settings["dns_pin_hosts"]:
+            return
+        def resolve():
+            targets = [host_port(origin) for origin in self.warmup_origins()]
+            return resolve_hosts([target for target in targets if target], 8,
+                                 os.path.join(self.cache_dir, "telemetry", "dns.jsonl"))
+        self.host_resolution = self.background.submit(resolve)
+    
+    def pin_resolved_hosts(self):
+        """Hand addresses the OS resolver found so far to Chromium (flags are read once, at WebEngine start)"""
+        if self.host_resolution is None:
+            return
+        if not self.host_resolution.done():
+            logsink.debug("dns", "Host resolution not finished when WebEngine started, nothing pinned")
+            return
+        try:
+            rules = resolver_rules(self.host_resolution.result())
+        except Exception as e:
+            logsink.error("dns", f"✗ Host pre-resolution failed: {str(e)}")
+            return
+        if rules:
+            flags = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "")
+            os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = f"{flags} {host_resolver_flag(rules)}".strip()
+            # Pinned hosts skip DNS in Chromium altogether, dns_server included
+            logsink.info("dns", f"→ Pinned hosts resolved by the OS resolver (dns_server is bypassed for them): {rules}")
+    
+    def start_mirror_probe(self):
+        """Probe the mirrors from zerkalo.txt on a worker thread while the UI is built"""
+        self.mirrors = None
+        self.probed_mirror = None
+        try:
+            self.mirrors = MirrorList.from_file("zerkalo.txt", os.path.join(self.cache_dir, "mirrors.json"))
+        except Exception as e:
+            self.mirror_error = e
+            return
+        self.mirrors.probe_async(self.mirror_probed.emit)
+    
+    def on_mirror_probed(self, mirror):
+        """Switch the first page to the probe's pick if the saved ranking guessed another mirror"""
+        self.probed_mirror = mirror
+        if mirror is None or self.mirrors is None or self.mirrors.current in (None, mirror):
+            return  # Nothing loaded yet (load_url_from_file uses the pick) or the guess was right
+        tab = self.current_tab
+        if self.first_load_done or tab is None:
+            logsink.debug("mirrors", f"Probe prefers {mirror}, keeping {self.mirrors.current} for this session")
+            return
+        url = tab.page.requestedUrl().toString()
+        if not self.mirrors.owns(url):
+            return
+        self.mirrors.choose(mirror)
+        logsink.info("mirrors", f"↻ Probe prefers {mirror}, switching")
+        tab.view.load(QUrl(self.mirrors.rebase(url, mirror)))
+        self.url_label.setText(mirror)
+    
+    def start_url(self):
+        """Start page for new tabs: the mirror currently in use"""
+        return self.mirrors.current if self.mirrors else None
     
     def load_url_from_file(self):
         try:
-            with open("zerkalo.txt", "r") as file:
-                url = file.read().strip()
-                if url:
-                    self.web_view.load(QUrl(url))
-                    self.url_label.setText(url)
+            if self.mirrors is None:
+                raise self.mirror_error
+            # The probe result may still be out, the saved ranking decides until it arrives
+            url = self.mirrors.choose(self.probed_mirror)
+            if url:
+                self.web_view.load(QUrl(url))
+                self.url_label.setText(url)
         except FileNotFoundError:
             self.url_label.setText("Error: zerkalo.txt not found")
             self.setWindowTitle("Ответы@Live - Ошибка файла")
+            self.trace.mark("no mirror list")
+            self.trace.report()
         except Exception as e:
             self.url_label.setText(f"Error: {str(e)}")
             self.setWindowTitle("Ответы@Live - Ошибка")
+            self.trace.mark("no start page")
+            self.trace.report()
     
     def update_url_display(self, url):
         self.url_label.setText(url.toString())
@@ -324,24 +1410,64 @@ class ModernBrowser(QMainWindow):
             }}
         """)
         
-        from PyQt6.QtCore import QTimer
         QTimer.singleShot(1500, lambda: [
             self.url_label.setStyleSheet(original_style),
             self.url_label.setText(original_text)
         ])
 
+def parse_arguments(argv=None):
+    """(app arguments, arguments left for Qt such as -platform offscreen)"""
+    parser = argparse.ArgumentParser(description="Ответы@Live desktop browser")
+    parser.add_argument("--startup-trace", action="store_true", help="print a timestamped breakdown of startup phases")
+    render = parser.add_argument_group("headless rendering")
+    render.add_argument("--render", nargs="+", metavar="URL", help="render these URLs headlessly and exit")
+    render.add_argument("--render-list", metavar="FILE", help="file with URLs to render, one per line")
+    render.add_argument("--render-output", default="render_output", help="directory for HTML, captures and timings")
+    render.add_argument("--render-pool", type=int, default=4, help="pages rendered in parallel")
+    render.add_argument("--render-capture", choices=("pdf", "png", "none"), default="pdf", help="capture format")
+    render.add_argument("--render-timeout", type=int, default=30, help="seconds per page")
+    # An option, not a positional: parse_known_args would take the value of a Qt option for it
+    parser.add_argument("--open", dest="url", metavar="URL",
+                        help="URL or file to open (in the running instance if there is one)")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="start a separate instance instead of handing the launch to the running one")
+    return parser.parse_known_args(argv)
+
 if __name__ == "__main__":
+    args, qt_args = parse_arguments()
+    startup_trace.enabled = args.startup_trace
+    
     # For Linux systems: Disable sandbox if needed
     if sys.platform.startswith('linux'):
         os.environ['QTWEBENGINE_DISABLE_SANDBOX'] = "1"
     
-    app = QApplication(sys.argv)
+    if args.render or args.render_list:
+        sys.exit(run_render_worker(args, qt_args))
+    
+    # A running instance already owns the profile: hand it the URL instead of starting another Chromium
+    if not args.new_instance:
+        started = time.perf_counter()
+        message = {"url": args.url, "cwd": os.getcwd(), "argv": sys.argv[1:], "sent_at": time.time()}
+        if forward_launch(server_name(os.path.join(os.getcwd(), "browser_data")), message):
+            print(f"✓ Opened in the running instance ({(time.perf_counter() - started) * 1000:.1f} ms)")
+            sys.exit(0)
+    
+    # Required when QtWebEngine is imported after the application is created
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication([sys.argv[0]] + qt_args)
     app.setStyle("Fusion")
     
     # Set optimized font
     font = QFont("Segoe UI", 9)
     app.setFont(font)
     
+    startup_trace.mark("QApplication created")
+    
     browser = ModernBrowser()
+    if not args.new_instance:
+        browser.listen_for_launches()
+    if args.url:
+        browser.open_launch({"url": args.url, "cwd": os.getcwd()})
     browser.show()
+    startup_trace.mark("window shown")
     sys.exit(app.exec())
@@ -12,9 +12,12 @@ import sys
 import json
 import time
 
+from mirrors import MirrorList
+from android_plugins import PluginInjector, load_android_bundle, find_plugin_dir
+
 # Android-specific imports
 if platform == 'android':
-    from jnius import autoclass, cast
+    from jnius import autoclass, cast, PythonJavaClass, java_method
     from android.permissions import request_permissions, Permission
     from android.storage import app_storage_path
 
@@ -47,6 +50,22 @@ if platform == 'android':
     Handler = autoclass('android.os.Handler')
     Runnable = autoclass('java.lang.Runnable')
 
+    class JavaValueCallback(PythonJavaClass):
+        """ValueCallback for evaluateJavascript; kept referenced until Java calls it back"""
+        __javainterfaces__ = ['android/webkit/ValueCallback']
+        __javacontext__ = 'app'
+
+        def __init__(self, callback, pending):
+            super().__init__()
+            self.callback = callback
+            self.pending = pending
+            pending.add(self)
+
+        @java_method('(Ljava/lang/Object;)V')
+        def onReceiveValue(self, value):
+            self.pending.discard(self)
+            self.callback(value)
+
 class BrowserApp(App):
     def build(self):
         self.layout = FloatLayout()
@@ -126,17 +145,28 @@ class BrowserApp(App):
                 self.app = app
             
             def shouldOverrideUrlLoading(self, view, url):
-                view.loadUrl(url)
-                return True
+                # Let the WebView follow the link itself instead of starting a second navigation
+                return False
             
             def onPageStarted(self, view, url, favicon):
                 self.app.update_url(url)
+                if self.app.plugin_injector is not None:
+                    self.app.plugin_injector.page_started(url)
                 return super().onPageStarted(view, url, favicon)
             
             def onPageFinished(self, view, url):
+                self.app.page_finished = True
                 self.app.update_title(view.getTitle())
+                if self.app.plugin_injector is not None:
+                    self.app.plugin_injector.page_finished(url)
                 return super().onPageFinished(view, url)
+            
+            def onReceivedError(self, view, error_code, description, failing_url):
+                # Only reported for the main frame
+                self.app.on_load_failed(failing_url)
+                return super().onReceivedError(view, error_code, description, failing_url)
         
+        self.load_plugins()
         self.webview.setWebViewClient(CustomWebViewClient(self))
         
         # Add WebView to activity
@@ -181,27 +211,76 @@ class BrowserApp(App):
             )
         )
     
+    def storage_path(self):
+        if platform == 'android':
+            return app_storage_path()
+        return os.getcwd()
+    
+    def load_plugins(self):
+        """Build the plugin set of the desktop app into one bundle before the first page loads"""
+        self.plugin_injector = None
+        self.pending_callbacks = set()
+        try:
+            storage_path = self.storage_path()
+            plugin_dir = find_plugin_dir(storage_path)
+            if plugin_dir is None:
+                print("No plugins directory found")
+                return
+            bundle = load_android_bundle(plugin_dir, os.path.join(storage_path, 'plugin_cache'))
+            if bundle is None:
+                print("No plugins to install")
+                return
+            self.plugin_injector = PluginInjector(bundle, self.evaluate_javascript)
+            print(f"Loaded plugin bundle from: {plugin_dir}")
+        except Exception as e:
+            print(f"Error loading plugins: {str(e)}")
+    
+    def evaluate_javascript(self, source, callback):
+        self.webview.evaluateJavascript(source, JavaValueCallback(callback, self.pending_callbacks))
+    
     def load_url_from_file(self):
+        self.mirrors = None
         try:
             # Get path for Android storage
-            if platform == 'android':
-                storage_path = app_storage_path()
-                file_path = os.path.join(storage_path, 'zerkalo.txt')
-            else:
-                file_path = 'zerkalo.txt'
+            storage_path = self.storage_path()
+            file_path = os.path.join(storage_path, 'zerkalo.txt')
             
-            if os.path.exists(file_path):
-                with open(file_path, 'r') as f:
-                    url = f.read().strip()
-                    if url:
-                        self.load_url(url)
-                        return
+            if not os.path.exists(file_path):
+                self.update_url("Error: zerkalo.txt not found")
+                return
             
-            # Fallback URL if file not found
-            self.load_url("https://example.com")
+            self.mirrors = MirrorList.from_file(file_path, os.path.join(storage_path, 'mirrors.json'))
+            # Start on the best mirror of the saved ranking, the probe runs off the main thread
+            self.page_finished = False
+            url = self.mirrors.choose()
+            if url:
+                self.load_url(url)
+                self.mirrors.probe_async(self.on_mirror_probed)
+            else:
+                self.update_url("Error: zerkalo.txt has no mirrors")
         except Exception as e:
             print(f"Error loading URL: {str(e)}")
-            self.load_url("https://example.com")
+            self.update_url(f"Error: {str(e)}")
+    
+    @mainthread
+    def on_mirror_probed(self, mirror):
+        """Switch the first page to the probe's pick if the saved ranking guessed another mirror"""
+        if mirror is None or self.mirrors is None or mirror == self.mirrors.current or self.page_finished:
+            return
+        print(f"Probe prefers mirror: {mirror}")
+        self.load_url(self.mirrors.choose(mirror))
+    
+    @mainthread
+    def on_load_failed(self, failing_url):
+        """Retry a failed mirror page on the next best mirror"""
+        if self.mirrors is None or not self.mirrors.owns(failing_url):
+            return
+        mirror = self.mirrors.next_mirror()
+        if mirror is None:
+            self.update_url("Error: no mirror is reachable")
+            return
+        print(f"Switching to mirror: {mirror}")
+        self.load_url(self.mirrors.rebase(failing_url, mirror))
     
     def load_url(self, url):
         if hasattr(self, 'webview') and self.webview:
@@ -0,0 +1,234 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+
+def parse_http_date(value):
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def freshness(headers, now, max_age):
+    """Time until which a response may be served without revalidation, None if it must not be stored.
+
+    headers maps lower-case header names to values. Cache-Control max-age and
+    Expires are honoured; without them a response with Last-Modified stays
+    fresh for a tenth of its age (capped at max_age, as browsers do) and one
+    without has to be revalidated every time. no-cache stores but always
+    revalidates, no-store is not stored at all.
+    """
+    directives = {}
+    for directive in headers.get("cache-control", "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return now
+    age = int(headers.get("age", "0")) if headers.get("age", "").isdigit() else 0
+    if directives.get("max-age", "").isdigit():
+        return now + int(directives["max-age"]) - age
+    if "expires" in headers:
+        expires = parse_http_date(headers["expires"])
+        date = parse_http_date(headers.get("date", "")) or now
+        return now + expires - date if expires is not None else now
+    last_modified = parse_http_date(headers.get("last-modified", ""))
+    if last_modified is not None:
+        return now + min(max(0.0, now - last_modified) / 10, max_age)
+    return now
+
+class AssetStore:
+    """Content-addressed store for the mirror's static assets with LRU eviction.
+
+    Bodies live in objects/<aa>/<sha256> and are shared by every URL with the
+    same content; index.sqlite maps URLs to hashes and tracks last access,
+    freshness (see freshness()) and the ETag/Last-Modified validators.
+    """
+    def __init__(self, root, budget_bytes, max_age=24 * 3600):
+        self.root = root
+        self.budget_bytes = budget_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS assets (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                mime TEXT NOT NULL,
+                stored REAL NOT NULL,
+                accessed REAL NOT NULL,
+                expires REAL NOT NULL DEFAULT 0,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+        # Stores written before freshness was tracked: their entries are revalidated on next use
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(assets)")}
+        for column, declaration in (("expires", "REAL NOT NULL DEFAULT 0"), ("etag", "TEXT"), ("last_modified", "TEXT")):
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE assets ADD COLUMN {column} {declaration}")
+        self.db.execute("CREATE TABLE IF NOT EXISTS objects (hash TEXT PRIMARY KEY, size INTEGER NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS assets_accessed ON assets (accessed)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS assets_hash ON assets (hash)")
+        self.db.commit()
+        self.stored_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def get(self, url, allow_stale=False):
+        """Return (body, mime, fresh) for url, or None on a miss"""
+        with self.lock:
+            row = self.db.execute("SELECT hash, mime, expires FROM assets WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            digest, mime, expires = row
+            fresh = time.time() < expires
+            if not fresh and not allow_stale:
+                self.misses += 1
+                return None
+            try:
+                with open(self.object_path(digest), "rb") as f:
+                    body = f.read()
+            except OSError:
+                # Body vanished from disk, forget the entry
+                self.db.execute("DELETE FROM assets WHERE url = ?", (url,))
+                self.release(digest)
+                self.db.commit()
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE assets SET accessed = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            return body, mime, fresh
+
+    def contains(self, url):
+        """True if a fresh copy of url is stored (does not count as a hit)"""
+        with self.lock:
+            row = self.db.execute("SELECT expires FROM assets WHERE url = ?", (url,)).fetchone()
+        return row is not None and time.time() < row[0]
+
+    def validators(self, url):
+        """Request headers that revalidate the stored copy of url ({} if there is none)"""
+        with self.lock:
+            row = self.db.execute("SELECT etag, last_modified FROM assets WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row and row[0]:
+            headers["If-None-Match"] = row[0]
+        if row and row[1]:
+            headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def store_response(self, url, body, mime, headers):
+        """Store a 200 response according to its cache headers; False if it must not be stored"""
+        expires = freshness(headers, time.time(), self.max_age)
+        if expires is None:
+            return False
+        self.put(url, body, mime, expires, headers.get("etag"), headers.get("last-modified"))
+        return True
+
+    def refresh(self, url, headers):
+        """The upstream answered 304 Not Modified: the stored copy is fresh again"""
+        expires = freshness(headers, time.time(), self.max_age)
+        with self.lock:
+            if expires is None:
+                row = self.db.execute("SELECT hash FROM assets WHERE url = ?", (url,)).fetchone()
+                self.db.execute("DELETE FROM assets WHERE url = ?", (url,))
+                if row:
+                    self.release(row[0])
+            else:
+                self.db.execute("UPDATE assets SET expires = ?, accessed = ? WHERE url = ?", (expires, time.time(), url))
+            self.db.commit()
+            self.revalidated += 1
+
+    def put(self, url, body, mime, expires=None, etag=None, last_modified=None):
+        """Store body for url and evict least recently used assets over the budget.
+
+        Without an expiry time the copy stays fresh for max_age seconds.
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            now = time.time()
+            if expires is None:
+                expires = now + self.max_age
+            previous = self.db.execute("SELECT hash FROM assets WHERE url = ?", (url,)).fetchone()
+            if self.db.execute("INSERT OR IGNORE INTO objects (hash, size) VALUES (?, ?)", (digest, len(body))).rowcount:
+                self.stored_bytes += len(body)
+            self.db.execute(
+                "INSERT OR REPLACE INTO assets (url, hash, mime, stored, accessed, expires, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, mime, now, now, expires, etag, last_modified)
+            )
+            if previous and previous[0] != digest:
+                self.release(previous[0])
+            self.evict()
+            self.db.commit()
+
+    def release(self, digest):
+        """Delete a body once no URL points to it any more"""
+        if self.db.execute("SELECT 1 FROM assets WHERE hash = ? LIMIT 1", (digest,)).fetchone():
+            return
+        row = self.db.execute("SELECT size FROM objects WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            return
+        try:
+            os.remove(self.object_path(digest))
+        except OSError:
+            pass
+        self.db.execute("DELETE FROM objects WHERE hash = ?", (digest,))
+        self.stored_bytes -= row[0]
+
+    def evict(self):
+        """Drop least recently used URLs until the stored bodies fit the budget"""
+        while self.stored_bytes > self.budget_bytes:
+            row = self.db.execute("SELECT url, hash FROM assets ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                break
+            self.db.execute("DELETE FROM assets WHERE url = ?", (row[0],))
+            self.evictions += 1
+            self.release(row[1])
+
+    def stats(self):
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+            total = self.stored_bytes
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total,
+            "budget_bytes": self.budget_bytes,
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,562 @@
+"""Headless benchmark for ModernBrowser against a local fixture server.
+
+Examples:
+    python benchmark.py                              # synthetic fixture pages
+    python benchmark.py --fixtures recorded/ --latency 80 --bandwidth 512
+    python benchmark.py --record http://185.158.155.9/ --fixtures recorded/
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import mimetypes
+import tempfile
+import threading
+import subprocess
+import statistics
+import urllib.parse
+import urllib.request
+import http.server
+
+from procstats import rss_kb
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs at document creation and leaves a timestamp in the DOM, which every world can read
+BENCH_PLUGIN = """// ==UserScript==
+// @run-at document-start
+// ==/UserScript==
+document.documentElement.setAttribute("data-bench-plugin", String(performance.now()));
+"""
+
+SYNTHETIC_PAGES = {
+    "index.html": "<h1>Questions</h1>" + "".join(
+        f'<p><a href="/question/{n}.html">Question {n}</a></p>' for n in range(1, 6)
+    ),
+    **{
+        f"question/{n}.html": f'<h1>Question {n}</h1><p>{"Answer text. " * 400}</p>'
+                              f'<a href="/question/{n % 5 + 1}.html">Next</a> <a href="/index.html">Back</a>'
+        for n in range(1, 6)
+    },
+    # Keeps allocating and never frees, for trying out the renderer watchdog (--click-path /leak.html)
+    "leak.html": "<h1>Leak</h1><p id='size'></p><script>"
+                 "window.leak = []; setInterval(() => {"
+                 " window.leak.push(new Array(1310720).fill(window.leak.length));"
+                 " document.getElementById('size').textContent = `${window.leak.length * 10} MB`;"
+                 "}, 1000);</script>",
+    # Known payload sizes for the lite mode measurement (--lite-page /lite.html); the widget is
+    # loaded from localhost so it counts as a third-party script next to the 127.0.0.1 page
+    "lite.html": "<style>@font-face { font-family: bench; src: url(/lite/font.woff2); }"
+                 " body { font-family: bench, sans-serif; }</style>"
+                 "<h1>Lite</h1><img src='/lite/photo-1.png'><img src='/lite/photo-2.png'>"
+                 "<video src='/lite/clip.mp4' preload='auto' muted></video>"
+                 "<script src='/lite/app.js'></script>"
+                 "<script>document.write('<script src=\"http://localhost:' + location.port +"
+                 " '/lite/widget.js\"><' + '/script>');</script>",
+}
+
+# path -> size in bytes, written by write_synthetic_fixtures
+SYNTHETIC_PAYLOADS = {
+    "lite/photo-1.png": 150 * 1024,
+    "lite/photo-2.png": 150 * 1024,
+    "lite/clip.mp4": 1024 * 1024,
+    "lite/font.woff2": 60 * 1024,
+    "lite/app.js": 300 * 1024,
+    "lite/widget.js": 40 * 1024,
+}
+
+# Plugin side of the bridge benchmark: sequential round trips, one burst of calls
+# (batched per frame) and a burst of CPU-heavy calls that run on the bridge thread pool
+BRIDGE_BENCH_SCRIPT = """(function () {
+    window.__benchBridge = null;
+    if (typeof zerkalo === "undefined") {
+        window.__benchBridge = JSON.stringify({error: "zerkalo bridge not available"});
+        return;
+    }
+    function burst(method, count) {
+        return Promise.all(Array.from({length: count}, function (_, i) { return zerkalo.call(method, [i]); }));
+    }
+    (async function () {
+        var t0 = performance.now();
+        for (var i = 0; i < %(sequential)d; i++) await zerkalo.call("ping", [i]);
+        var t1 = performance.now();
+        await burst("ping", %(calls)d);
+        var t2 = performance.now();
+        await burst("bench.heavy", %(heavy)d);
+        var t3 = performance.now();
+        window.__benchBridge = JSON.stringify({
+            round_trip_ms: (t1 - t0) / %(sequential)d,
+            burst_ms: t2 - t1,
+            calls_per_s: %(calls)d / ((t2 - t1) / 1000),
+            heavy_burst_ms: t3 - t2
+        });
+    })();
+})()"""
+
+def heavy_handler(n):
+    """Stand-in for a CPU-bound bridge handler"""
+    return sum(i * i for i in range(200000 + n))
+
+DEFAULT_CLICK_PATH = ["/question/1.html", "/question/2.html", "/index.html", "/question/3.html"]
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serves files from the fixture directory with injected latency and bandwidth limits"""
+    root = "."
+    latency = 0.0  # seconds before the first byte
+    bandwidth = 0  # bytes per second, 0 for unlimited
+
+    def do_GET(self):
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path).lstrip("/")
+        file_path = os.path.normpath(os.path.join(self.root, path))
+        if os.path.isdir(file_path):
+            file_path = os.path.join(file_path, "index.html")
+        if not file_path.startswith(os.path.abspath(self.root)) or not os.path.isfile(file_path):
+            self.send_error(404)
+            return
+
+        with open(file_path, "rb") as f:
+            body = f.read()
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", guess_type(file_path))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=3600")
+        self.end_headers()
+
+        chunk = 16 * 1024
+        for offset in range(0, len(body), chunk):
+            self.wfile.write(body[offset:offset + chunk])
+            if self.bandwidth:
+                time.sleep(min(chunk, len(body) - offset) / self.bandwidth)
+
+    def log_message(self, format, *args):
+        pass
+
+def guess_type(path):
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+class FixtureServer:
+    """Local stand-in for the mirror"""
+    def __init__(self, root, latency_ms=0, bandwidth_kbps=0):
+        handler = type("Handler", (FixtureHandler,), {
+            "root": os.path.abspath(root),
+            "latency": latency_ms / 1000.0,
+            "bandwidth": bandwidth_kbps * 1024,
+        })
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+def write_synthetic_fixtures(root):
+    for path, html in SYNTHETIC_PAGES.items():
+        file_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(f"<!doctype html><html><head><meta charset='utf-8'></head><body>{html}</body></html>")
+    for path, size in SYNTHETIC_PAYLOADS.items():
+        file_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # Scripts have to parse, everything else only has to have the right size
+        body = b"/*" + b"x" * (size - 4) + b"*/" if path.endswith(".js") else b"\0" * size
+        with open(file_path, "wb") as f:
+            f.write(body)
+
+def record_fixtures(urls, root):
+    """Save copies of mirror pages so they can be replayed offline"""
+    for url in urls:
+        path = urllib.parse.urlsplit(url).path.lstrip("/") or "index.html"
+        if path.endswith("/"):
+            path += "index.html"
+        file_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(file_path) or root, exist_ok=True)
+        request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
+        with urllib.request.urlopen(request, timeout=30) as response, open(file_path, "wb") as f:
+            f.write(response.read())
+        print(f"✓ Recorded {url} → {file_path}")
+
+def run_worker(args):
+    """Runs inside the child process: drive ModernBrowser and dump measurements"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if sys.platform.startswith("linux"):
+        os.environ["QTWEBENGINE_DISABLE_SANDBOX"] = "1"
+    sys.path.insert(0, APP_DIR)
+
+    from PyQt6.QtCore import Qt, QEventLoop, QTimer, QUrl
+    from PyQt6.QtWidgets import QApplication
+    import app as browser_app
+
+    # Record every loadFinished so a fast load is not missed between two waits
+    loads = []
+    waiting = []
+    def on_load(ok):
+        loads.append((time.perf_counter(), ok))
+        for loop in waiting:
+            loop.quit()
+
+    def wait_for_load(count, timeout_ms):
+        """Wait until loadFinished has fired count times; returns (time, ok) or None"""
+        if len(loads) < count:
+            loop = QEventLoop()
+            waiting.append(loop)
+            timer = QTimer()
+            timer.setSingleShot(True)
+            timer.timeout.connect(loop.quit)
+            timer.start(timeout_ms)
+            while len(loads) < count and timer.isActive():
+                loop.exec()
+            waiting.remove(loop)
+        return loads[count - 1] if len(loads) >= count else None
+
+    def run_js(page, source, world=0):
+        loop = QEventLoop()
+        result = []
+        def on_result(value):
+            result.append(value)
+            loop.quit()
+        page.runJavaScript(source, world, on_result)
+        QTimer.singleShot(5000, loop.quit)
+        loop.exec()
+        return result[0] if result else None
+
+    def poll_js(page, source, timeout_ms, world=0):
+        """Evaluate source every 20 ms until it returns something other than null"""
+        deadline = time.perf_counter() + timeout_ms / 1000
+        while time.perf_counter() < deadline:
+            value = run_js(page, source, world)
+            if value is not None:
+                return value
+            pause = QEventLoop()
+            QTimer.singleShot(20, pause.quit)
+            pause.exec()
+        return None
+
+    def measure_new_tabs(url, count):
+        """Open tabs the way a user would (after an idle pause) and time each until loaded"""
+        timings = []
+        for _ in range(count):
+            # Give the spare page pool its idle window to refill
+            idle = QEventLoop()
+            QTimer.singleShot(browser.settings["page_pool_refill_delay_ms"] + 1500, idle.quit)
+            idle.exec()
+            pooled = bool(browser.page_pool.spares)
+            loop = QEventLoop()
+            start = time.perf_counter()
+            tab = browser.new_tab(url)
+            created = time.perf_counter()
+            tab.view.loadFinished.connect(lambda ok: loop.quit())
+            QTimer.singleShot(args.timeout * 1000, loop.quit)
+            loop.exec()
+            timings.append({
+                "pooled": pooled,
+                "create_ms": (created - start) * 1000,
+                "load_ms": (time.perf_counter() - start) * 1000,
+            })
+        return {"tabs": timings, "pool": browser.page_pool.stats()}
+
+    def measure_lite(page, url):
+        """Load url with an empty HTTP cache with lite mode off, then on, and read the byte ledger"""
+        report = {}
+        for lite in (False, True):
+            browser.lite_btn.setChecked(lite)
+            browser.profile.clearHttpCache()
+            expected = len(loads) + 1
+            browser.web_view.load(QUrl(url))
+            loaded = wait_for_load(expected, args.timeout * 1000)
+            # collect_telemetry reads the Resource Timing entries a second after loadFinished
+            pause = QEventLoop()
+            QTimer.singleShot(2000, pause.quit)
+            pause.exec()
+            transferred, saved, blocked = browser.byte_ledger.totals(url)
+            entry = browser.byte_ledger.pages.get(url, {})
+            report["lite" if lite else "full"] = {
+                "ok": bool(loaded and loaded[1]),
+                "bytes": transferred,
+                "saved_bytes": saved,
+                "blocked": blocked,
+                # Cross-origin fixtures (the localhost widget) have no Timing-Allow-Origin, like most
+                # third parties, so their bytes are not in "bytes"
+                "unmeasured": browser.byte_ledger.unmeasured(url),
+                "unmeasured_by_type": entry.get("unmeasured", {}),
+                "by_type": entry.get("bytes", {}),
+                "blocked_by_type": entry.get("blocked", {}),
+            }
+        browser.lite_btn.setChecked(False)
+        report["payload_bytes"] = sum(SYNTHETIC_PAYLOADS.values())
+        return report
+
+    def measure_second_launch(url):
+        """Start app.py again while this instance runs: time until it exits and until its URL loaded here"""
+        tabs_before = len(browser.tabs)
+        start = time.perf_counter()
+        # Popen, not run: this event loop has to stay responsive to accept the forwarded launch
+        process = subprocess.Popen([sys.executable, os.path.join(APP_DIR, "app.py"), "--open", url],
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        exited = loaded = None
+        deadline = start + args.timeout
+        while time.perf_counter() < deadline and (exited is None or loaded is None):
+            if exited is None and process.poll() is not None:
+                exited = time.perf_counter()
+            if loaded is None and len(browser.tabs) > tabs_before:
+                tab = browser.tabs[-1]
+                if tab.load_started is not None and not tab.loading:
+                    loaded = time.perf_counter()
+            pause = QEventLoop()
+            QTimer.singleShot(2, pause.quit)
+            pause.exec()
+        if process.poll() is None:
+            process.kill()
+        output = process.communicate()[0]
+        return {
+            "forwarded": process.returncode == 0 and len(browser.tabs) > tabs_before,
+            "exit_ms": (exited - start) * 1000 if exited else None,
+            "loaded_ms": (loaded - start) * 1000 if loaded else None,
+            "output": output.strip()[-500:],
+        }
+
+    def measure_bridge(page, calls):
+        """Per-call runJavaScript round trips against batched zerkalo.call() round trips"""
+        start = time.perf_counter()
+        for index in range(calls):
+            run_js(page, f"window.__benchValue = {index}")
+        elapsed = time.perf_counter() - start
+        report = {"run_javascript": {"round_trip_ms": elapsed * 1000 / calls, "calls_per_s": calls / elapsed}}
+        # zerkalo is only defined in the bridge's world
+        from webpage import world_id
+        world = world_id(browser.settings["bridge_world"])
+        run_js(page, BRIDGE_BENCH_SCRIPT % {"sequential": min(calls, 50), "calls": calls, "heavy": 8}, world)
+        measured = poll_js(page, "window.__benchBridge", args.timeout * 1000, world)
+        bridge = json.loads(measured) if measured else {"error": "timed out"}
+        bridge["batches"] = page.bridge.batches
+        bridge["calls"] = page.bridge.calls
+        report["bridge"] = bridge
+        return report
+
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    qt_app = QApplication([sys.argv[0]])
+    browser = browser_app.ModernBrowser()
+    browser.show()
+
+    # WebEngine is initialised once the shown window has painted
+    ready = QEventLoop()
+    browser.engine_ready.connect(ready.quit)
+    ready.exec()
+    browser.register_bridge_handler("bench.heavy", heavy_handler, heavy=True)
+    browser.listen_for_launches()
+
+    browser.web_view.loadFinished.connect(on_load)
+
+    results = {"launched_at": args.launched_at}
+    loaded = wait_for_load(1, args.timeout * 1000)
+    results["first_load_at"] = time.time()
+    results["first_load_ok"] = bool(loaded and loaded[1])
+
+    page = browser.web_page
+    stamp = run_js(page, "document.documentElement.getAttribute('data-bench-plugin')")
+    results["plugin_injection_ms"] = float(stamp) if stamp else None
+
+    navigations = []
+    base = browser.mirrors.current if browser.mirrors else args.base_url
+    for path in args.click_path:
+        url = urllib.parse.urljoin(base, path)
+        expected = len(loads) + 1
+        start = time.perf_counter()
+        # Click the link when the page has one, otherwise navigate directly
+        clicked = run_js(page, f"""(function () {{
+            var link = document.querySelector('a[href="{path}"]');
+            if (!link) return false;
+            link.click();
+            return true;
+        }})()""")
+        if not clicked:
+            browser.web_view.load(QUrl(url))
+        loaded = wait_for_load(expected, args.timeout * 1000)
+        navigations.append({
+            "url": url,
+            "clicked": bool(clicked),
+            "ok": bool(loaded and loaded[1]),
+            "ms": ((loaded[0] if loaded else time.perf_counter()) - start) * 1000,
+        })
+    results["navigations"] = navigations
+    # Warm runs reuse the profile, so they see the transitions the earlier runs taught the predictor
+    if browser.predictor is not None:
+        results["predictor"] = browser.predictor.stats()
+    results["renderer_rss_kb"] = rss_kb(page.renderProcessPid())
+    if args.lite_page:
+        results["lite"] = measure_lite(page, urllib.parse.urljoin(base, args.lite_page))
+    if args.bridge_calls:
+        results["bridge"] = measure_bridge(page, args.bridge_calls)
+    if args.new_tabs:
+        results["new_tabs"] = measure_new_tabs(base, args.new_tabs)
+    if args.second_launch:
+        results["second_launch"] = measure_second_launch(urllib.parse.urljoin(base, args.click_path[0]))
+
+    with open(args.result_file, "w", encoding="utf-8") as f:
+        json.dump(results, f)
+    browser.close()
+    qt_app.quit()
+
+def prepare_profile_dir(workdir, server_url):
+    """Working directory with zerkalo.txt pointing at the fixture server and the plugins"""
+    with open(os.path.join(workdir, "zerkalo.txt"), "w") as f:
+        f.write(server_url + "\n")
+    plugin_dir = os.path.join(workdir, "plugins")
+    shutil.copytree(os.path.join(APP_DIR, "plugins"), plugin_dir, dirs_exist_ok=True)
+    with open(os.path.join(plugin_dir, "zz_benchmark_probe.js"), "w", encoding="utf-8") as f:
+        f.write(BENCH_PLUGIN)
+
+def launch_worker(workdir, args, server_url):
+    result_file = os.path.join(workdir, "result.json")
+    command = [
+        sys.executable, os.path.join(APP_DIR, "benchmark.py"), "--worker",
+        "--result-file", result_file, "--base-url", server_url,
+        "--timeout", str(args.timeout), "--launched-at", repr(time.time()),
+        "--bridge-calls", str(args.bridge_calls), "--new-tabs", str(args.new_tabs),
+        "--lite-page", args.lite_page, "--click-path", *args.click_path,
+        *(["--second-launch"] if args.second_launch else []),
+    ]
+    subprocess.run(command, cwd=workdir, timeout=args.timeout * (len(args.click_path) + args.new_tabs + 6))
+    with open(result_file, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    result["startup_ms"] = (result["first_load_at"] - result["launched_at"]) * 1000
+    return result
+
+def median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+def summarize(cold, warm):
+    steps = {}
+    for run in [cold] + warm:
+        for navigation in run["navigations"]:
+            steps.setdefault(navigation["url"], []).append(navigation["ms"])
+    return {
+        "cold_startup_ms": cold["startup_ms"],
+        "warm_startup_ms": median([run["startup_ms"] for run in warm]),
+        "plugin_injection_ms": median([run["plugin_injection_ms"] for run in [cold] + warm]),
+        "navigation_ms": {url: median(values) for url, values in steps.items()},
+        "renderer_rss_kb": median([run["renderer_rss_kb"] for run in [cold] + warm]),
+        "run_javascript_round_trip_ms": median(
+            [run["bridge"]["run_javascript"]["round_trip_ms"] for run in [cold] + warm if "bridge" in run]
+        ),
+        "bridge_round_trip_ms": median(
+            [run["bridge"]["bridge"].get("round_trip_ms") for run in [cold] + warm if "bridge" in run]
+        ),
+        "new_tab_pool_hit_rate": median(
+            [run["new_tabs"]["pool"]["hit_rate"] for run in [cold] + warm if "new_tabs" in run]
+        ),
+        "new_tab_saved_ms": median(
+            [run["new_tabs"]["pool"]["saved_ms"] for run in [cold] + warm if "new_tabs" in run]
+        ),
+        "bridge_calls_per_s": median(
+            [run["bridge"]["bridge"].get("calls_per_s") for run in [cold] + warm if "bridge" in run]
+        ),
+        "prefetch_hit_rate": median(
+            [run["predictor"]["hit_rate"] for run in [cold] + warm if "predictor" in run]
+        ),
+        "prefetch_saved_ms": median(
+            [run["predictor"]["saved_ms"] for run in [cold] + warm if "predictor" in run]
+        ),
+        "second_launch_exit_ms": median(
+            [run["second_launch"]["exit_ms"] for run in [cold] + warm if "second_launch" in run]
+        ),
+        "second_launch_loaded_ms": median(
+            [run["second_launch"]["loaded_ms"] for run in [cold] + warm if "second_launch" in run]
+        ),
+        "full_page_bytes": median([run["lite"]["full"]["bytes"] for run in [cold] + warm if "lite" in run]),
+        "lite_page_bytes": median([run["lite"]["lite"]["bytes"] for run in [cold] + warm if "lite" in run]),
+        "lite_saved_bytes": median([run["lite"]["lite"]["saved_bytes"] for run in [cold] + warm if "lite" in run]),
+    }
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=APP_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ModernBrowser against a local fixture server")
+    parser.add_argument("--fixtures", help="directory with recorded mirror pages (synthetic pages if omitted)")
+    parser.add_argument("--record", nargs="+", metavar="URL", help="record these pages into --fixtures and exit")
+    parser.add_argument("--latency", type=float, default=0, help="server latency per request in ms")
+    parser.add_argument("--bandwidth", type=float, default=0, help="server bandwidth in KB/s (0 = unlimited)")
+    parser.add_argument("--warm-runs", type=int, default=3, help="warm starts measured after the cold start")
+    parser.add_argument("--click-path", nargs="+", default=DEFAULT_CLICK_PATH, help="paths visited in order")
+    parser.add_argument("--timeout", type=int, default=30, help="seconds to wait for each load")
+    parser.add_argument("--bridge-calls", type=int, default=200,
+                        help="calls per bridge/runJavaScript round-trip measurement (0 to skip)")
+    parser.add_argument("--new-tabs", type=int, default=3, help="tabs opened to measure the spare page pool")
+    parser.add_argument("--lite-page", default="/lite.html",
+                        help="page loaded with lite mode off and on to compare bytes (\"\" to skip)")
+    parser.add_argument("--second-launch", action=argparse.BooleanOptionalAction, default=True,
+                        help="launch app.py again with a URL and time the hand-over to the running instance")
+    parser.add_argument("--output", default="bench_results.json", help="machine-readable results file")
+    # Internal: used when benchmark.py re-launches itself as the measured process
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--launched-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args)
+        return 0
+
+    if args.record:
+        if not args.fixtures:
+            parser.error("--record needs --fixtures")
+        record_fixtures(args.record, args.fixtures)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix="zerkalo-bench-") as tmp:
+        fixtures = args.fixtures
+        if not fixtures:
+            fixtures = os.path.join(tmp, "fixtures")
+            write_synthetic_fixtures(fixtures)
+        server = FixtureServer(fixtures, args.latency, args.bandwidth).start()
+        print(f"Serving fixtures from {fixtures} at {server.url}")
+
+        workdir = os.path.join(tmp, "profile")
+        os.makedirs(workdir)
+        prepare_profile_dir(workdir, server.url)
+        try:
+            cold = launch_worker(workdir, args, server.url)
+            print(f"✓ Cold start: {cold['startup_ms']:.0f} ms")
+            warm = []
+            for index in range(args.warm_runs):
+                warm.append(launch_worker(workdir, args, server.url))
+                print(f"✓ Warm start {index + 1}: {warm[-1]['startup_ms']:.0f} ms")
+        finally:
+            server.stop()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.time(),
+        "config": {
+            "latency_ms": args.latency,
+            "bandwidth_kbps": args.bandwidth,
+            "fixtures": args.fixtures or "synthetic",
+            "click_path": args.click_path,
+            "bridge_calls": args.bridge_calls,
+            "new_tabs": args.new_tabs,
+            "lite_page": args.lite_page,
+            "second_launch": args.second_launch,
+        },
+        "summary": summarize(cold, warm),
+        "runs": {"cold": cold, "warm": warm},
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+import os
+import re
+import glob
+import pickle
+import hashlib
+from collections import deque
+
+import logsink
+
+# Bump when the compiled index layout changes so cached indexes are rebuilt
+INDEX_FORMAT = 2
+
+HOSTS_PREFIXES = ("0.0.0.0", "127.0.0.1", "::1", "::")
+
+# Rule options that change nothing about which requests a rule applies to
+IGNORED_OPTIONS = {"important"}
+# Exception options that only switch off cosmetic filtering, not requests
+COSMETIC_OPTIONS = {"elemhide", "generichide", "specifichide"}
+
+class DomainTrie:
+    """Domains stored label by label from the TLD, so a lookup matches any parent domain"""
+    END = ""
+
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def add(self, domain):
+        node = self.root
+        for label in reversed(domain.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        if self.END not in node:
+            node[self.END] = True
+            self.size += 1
+
+    def matches(self, host):
+        """True if host or one of its parent domains was added"""
+        node = self.root
+        for label in reversed(host.lower().split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if self.END in node:
+                return True
+        return False
+
+class AhoCorasick:
+    """Multi-pattern substring matcher; one pass over the text finds every pattern"""
+    def __init__(self, patterns):
+        # goto[state] maps a character to the next state, out[state] lists pattern ids
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = next_state
+            self.out[state].append(pattern_id)
+
+        # Breadth-first so every failure link points to an already finished state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.out[next_state] = self.out[next_state] + self.out[self.fail[next_state]]
+
+    def search(self, text):
+        """Yield ids of all patterns occurring in text"""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                yield from out[state]
+
+def rule_to_regex(rule):
+    """Translate an EasyList URL pattern (*, ^, | anchors) into a regex"""
+    prefix = ""
+    if rule.startswith("||"):
+        prefix, rule = r"^[a-z][a-z0-9+.-]*://([^/]*\.)?", rule[2:]
+    elif rule.startswith("|"):
+        prefix, rule = "^", rule[1:]
+    suffix = ""
+    if rule.endswith("|"):
+        suffix, rule = "$", rule[:-1]
+    body = re.escape(rule).replace(r"\*", ".*").replace(r"\^", r"(?:[^a-z0-9_.%-]|$)")
+    return re.compile(prefix + body + suffix)
+
+def literal_key(rule):
+    """Longest literal piece of a pattern, used as its Aho-Corasick key"""
+    pieces = re.split(r"[*^|]", rule)
+    return max(pieces, key=len)
+
+class RuleSet:
+    """Path/URL patterns matched with Aho-Corasick and verified by regex when needed"""
+    def __init__(self):
+        self.keys = []
+        self.regexes = []
+        self.matcher = None
+
+    def add(self, rule):
+        key = literal_key(rule)
+        if len(key) < 3:
+            return False  # Too generic to index, would match nearly every URL
+        plain = not any(char in rule for char in "*^|")
+        self.keys.append(key)
+        self.regexes.append(None if plain else rule_to_regex(rule))
+        return True
+
+    def compile(self):
+        self.matcher = AhoCorasick(self.keys)
+
+    def matches(self, url):
+        if self.matcher is None:
+            return False
+        for rule_id in self.matcher.search(url):
+            regex = self.regexes[rule_id]
+            if regex is None or regex.search(url):
+                return True
+        return False
+
+class Blocklist:
+    """Compiled host and path rules from EasyList-style and hosts-file lists"""
+    def __init__(self):
+        self.blocked_domains = DomainTrie()
+        self.allowed_domains = DomainTrie()
+        self.blocked_patterns = RuleSet()
+        self.allowed_patterns = RuleSet()
+        self.rule_count = 0
+        self.skipped_count = 0
+
+    def add_line(self, line):
+        line = line.strip()
+        if not line or line.startswith(("!", "[", "#")) or "##" in line or "#@#" in line or "#?#" in line:
+            return
+
+        # hosts-file format: "0.0.0.0 ads.example.com"
+        parts = line.split()
+        if len(parts) >= 2 and parts[0] in HOSTS_PREFIXES:
+            if parts[1] not in ("localhost", "0.0.0.0"):
+                self.blocked_domains.add(parts[1])
+                self.rule_count += 1
+            return
+
+        allow = line.startswith("@@")
+        if allow:
+            line = line[2:]
+        line, _, options = line.partition("$")
+        options = {option.split("=", 1)[0].strip().lower() for option in options.split(",") if option.strip()}
+        # Options ($third-party, $script, $domain=, $popup, ...) are not evaluated. A block
+        # rule that has them would block far more than its author meant, so it is dropped;
+        # an exception without its options only allows more, which is kept (unless it is
+        # a cosmetic-only one).
+        if options - IGNORED_OPTIONS and (not allow or options <= COSMETIC_OPTIONS):
+            self.skipped_count += 1
+            return
+        line = line.lower()
+        if not line:
+            return
+
+        domain_rule = re.fullmatch(r"\|\|([a-z0-9.-]+)\^?\|?", line)
+        if domain_rule:
+            (self.allowed_domains if allow else self.blocked_domains).add(domain_rule.group(1))
+            self.rule_count += 1
+        elif (self.allowed_patterns if allow else self.blocked_patterns).add(line):
+            self.rule_count += 1
+
+    def compile(self):
+        self.blocked_patterns.compile()
+        self.allowed_patterns.compile()
+
+    def blocks(self, host, url):
+        """True if a request for url (on host) should be blocked"""
+        url = url.lower()
+        if self.allowed_domains.matches(host) or self.allowed_patterns.matches(url):
+            return False
+        return self.blocked_domains.matches(host) or self.blocked_patterns.matches(url)
+
+def load_blocklist(list_dir, cache_dir):
+    """Compile every *.txt list in list_dir, reusing the cached index when lists are unchanged"""
+    list_paths = sorted(glob.glob(os.path.join(list_dir, "*.txt")))
+    if not list_paths:
+        return None
+
+    digest = hashlib.sha256(str(INDEX_FORMAT).encode("utf-8"))
+    for path in list_paths:
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode("utf-8"))
+            digest.update(f.read())
+    key = digest.hexdigest()[:16]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"blocklist-{key}.pickle")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                blocklist = pickle.load(f)
+            logsink.info("blocklist", f"✓ Loaded compiled blocklist ({blocklist.rule_count} rules)")
+            return blocklist
+        except Exception:
+            pass
+
+    blocklist = Blocklist()
+    for path in list_paths:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                blocklist.add_line(line)
+    blocklist.compile()
+    logsink.info("blocklist", f"✓ Compiled blocklist from {len(list_paths)} lists ({blocklist.rule_count} rules, "
+                              f"{blocklist.skipped_count} skipped for unsupported options)")
+
+    for stale in glob.glob(os.path.join(cache_dir, "blocklist-*.pickle")):
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+    with open(cache_path, "wb") as f:
+        pickle.dump(blocklist, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return blocklist
@@ -0,0 +1,98 @@
+import json
+import traceback
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+import logsink
+
+def builtin_bridge_handlers():
+    """zerkalo.call() handlers every page gets, in the browser and the render worker"""
+    return {
+        "ping": (lambda *args: list(args), False),
+        "log": (lambda message, level="info": logsink.log(
+            logsink.parse_level(level), "plugin", f"Plugin: {message}"
+        ), False),
+    }
+
+class PluginBridge(QObject):
+    """Per-page QWebChannel object: takes batches of plugin calls and answers them in batches.
+
+    handlers maps a method name to (function, heavy); heavy handlers run on
+    executor so CPU-bound work does not stall the GUI thread.
+    """
+    # JSON list of {id, result} / {id, error}, delivered to the page
+    results = pyqtSignal(str)
+    # Reply of a heavy handler, emitted from a worker thread (queued to the GUI thread)
+    heavy_done = pyqtSignal(str)
+
+    def __init__(self, handlers, executor, parent=None):
+        super().__init__(parent)
+        self.handlers = handlers
+        self.executor = executor
+        self.outgoing = []
+        self.calls = 0
+        self.batches = 0
+        self.heavy_done.connect(self.on_heavy_done)
+
+    @pyqtSlot(str)
+    def dispatch(self, payload):
+        # Nothing may escape this slot: PyQt aborts the process on an exception from a slot
+        try:
+            batch = json.loads(payload)
+        except ValueError:
+            batch = None
+        if not isinstance(batch, list):
+            logsink.warning("bridge", "✗ Malformed bridge batch")
+            return
+        self.batches += 1
+        self.calls += len(batch)
+        for call in batch:
+            if not isinstance(call, dict):
+                logsink.warning("bridge", "✗ Malformed bridge call")
+                continue
+            call_id = call.get("id", 0)
+            method = call.get("method")
+            args = call.get("args") or []
+            if not isinstance(args, list):
+                self.reply(call_id, error=f"Arguments of {method} must be a list")
+                continue
+            handler = self.handlers.get(method) if isinstance(method, str) else None
+            if handler is None:
+                self.reply(call_id, error=f"Unknown bridge method: {method}")
+                continue
+            function, heavy = handler
+            try:
+                if heavy:
+                    future = self.executor.submit(function, *args)
+                    future.add_done_callback(lambda future, call_id=call_id: self.heavy_done.emit(
+                        json.dumps(self.make_reply(call_id, future), default=str)
+                    ))
+                else:
+                    self.reply(call_id, result=function(*args))
+            except Exception as e:
+                logsink.error("bridge", f"✗ Bridge handler {method} failed: {str(e)}")
+                self.reply(call_id, error=str(e))
+
+    def make_reply(self, call_id, future):
+        try:
+            return {"id": call_id, "result": future.result()}
+        except Exception as e:
+            logsink.debug("bridge", traceback.format_exc())
+            return {"id": call_id, "error": str(e)}
+
+    def on_heavy_done(self, payload):
+        reply = json.loads(payload)
+        self.reply(reply["id"], reply.get("result"), reply.get("error"))
+
+    def reply(self, call_id, result=None, error=None):
+        if not call_id:
+            return  # zerkalo.send(), nobody waits for it
+        if not self.outgoing:
+            # Everything answered during this event-loop turn goes out together
+            QTimer.singleShot(0, self.flush)
+        self.outgoing.append({"id": call_id, "error": error} if error else {"id": call_id, "result": result})
+
+    def flush(self):
+        if self.outgoing:
+            batch, self.outgoing = self.outgoing, []
+            self.results.emit(json.dumps(batch, default=str))
@@ -0,0 +1,64 @@
+# Runs after qwebchannel.js in the bridge's world (no Qt imports here, so node can run it in tests). Plugins call
+#   zerkalo.call("method", [args...]) -> Promise
+#   zerkalo.send("method", [args...])  (no reply)
+# Calls made during one frame are sent to Python in a single transfer.
+BRIDGE_CLIENT_SCRIPT = """
+(function () {
+    if (window.zerkalo) return;
+    var queue = [], pending = {}, nextId = 1, scheduled = false, bridge = null;
+
+    function flush() {
+        scheduled = false;
+        if (!bridge || !queue.length) return;
+        var batch = queue;
+        queue = [];
+        bridge.dispatch(JSON.stringify(batch));
+    }
+
+    function schedule() {
+        if (scheduled) return;
+        scheduled = true;
+        // requestAnimationFrame does not run in hidden pages
+        if (document.visibilityState === "hidden") setTimeout(flush, 16);
+        else requestAnimationFrame(flush);
+    }
+
+    function enqueue(id, method, args) {
+        queue.push({id: id, method: method, args: args === undefined ? [] : args});
+        schedule();
+    }
+
+    // Pages without a web channel (snapshots, the DNS warm-up page, blank spare pages)
+    // have no transport; their calls fail right away instead of never settling
+    var unavailable = typeof qt === "undefined" || !qt.webChannelTransport;
+
+    window.zerkalo = {
+        call: function (method, args) {
+            if (unavailable) return Promise.reject(new Error("zerkalo is not available on this page"));
+            return new Promise(function (resolve, reject) {
+                var id = nextId++;
+                pending[id] = {resolve: resolve, reject: reject};
+                enqueue(id, method, args);
+            });
+        },
+        send: function (method, args) {
+            if (!unavailable) enqueue(0, method, args);
+        }
+    };
+    if (unavailable) return;
+
+    new QWebChannel(qt.webChannelTransport, function (channel) {
+        bridge = channel.objects.zerkalo;
+        bridge.results.connect(function (payload) {
+            JSON.parse(payload).forEach(function (reply) {
+                var call = pending[reply.id];
+                if (!call) return;
+                delete pending[reply.id];
+                if (reply.error) call.reject(new Error(reply.error));
+                else call.resolve(reply.result);
+            });
+        });
+        flush();
+    });
+})();
+"""
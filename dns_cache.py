@@ -0,0 +1,112 @@
+import html
+import time
+import socket
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import logsink
+from telemetry import read_recent_records, TelemetryWriter
+
+# Fragment of the hidden warm-up pages' URLs (DNS and asset pre-warm); plugin bundles do not run on them
+WARMUP_FRAGMENT = "zerkalo-warmup"
+
+def host_port(url):
+    """("host", port) of a URL, None for URLs without a host"""
+    parts = urllib.parse.urlsplit(url)
+    if not parts.hostname:
+        return None
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    return parts.hostname, port or (443 if parts.scheme == "https" else 80)
+
+def url_origin(url):
+    """"https://host[:port]" of an http(s) URL, None for anything else"""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    host = f"[{parts.hostname}]" if ":" in parts.hostname else parts.hostname
+    default = 443 if parts.scheme == "https" else 80
+    return f"{parts.scheme}://{host}" + (f":{port}" if port and port != default else "")
+
+def frequent_origins(telemetry_path, navigations=20, limit=10):
+    """Origins most often contacted by the last navigations recorded in telemetry"""
+    counts = Counter()
+    for record in read_recent_records(telemetry_path, navigations):
+        seen = {url_origin(record.get("url") or "")}
+        seen.update(url_origin(resource.get("name") or "") for resource in record.get("resources") or [])
+        seen.discard(None)
+        counts.update(seen)
+    return [origin for origin, _ in counts.most_common(limit)]
+
+def warmup_html(origins, preconnect=True):
+    """Document whose link hints make Chromium resolve (and connect to) origins.
+
+    Loaded in a hidden page, so the addresses land in Chromium's own host cache
+    and the connections in its socket pool, where the first navigations reuse them.
+    """
+    rels = ("dns-prefetch", "preconnect") if preconnect else ("dns-prefetch",)
+    links = "".join(f'<link rel="{rel}" href="{html.escape(origin)}">'
+                    for origin in dict.fromkeys(origins) for rel in rels)
+    return f"<!DOCTYPE html><html><head>{links}</head><body></body></html>"
+
+def resolve_host(host, port):
+    """Resolve host with the operating system's resolver (not Chromium's) and time it"""
+    result = {"host": host, "port": port, "addresses": [], "os_dns_ms": None, "error": None}
+    start = time.perf_counter()
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError as e:
+        result["error"] = str(e)
+        return result
+    result["os_dns_ms"] = (time.perf_counter() - start) * 1000
+    result["addresses"] = list(dict.fromkeys(info[4][0] for info in infos))
+    return result
+
+def resolve_hosts(targets, concurrency=8, timings_path=None):
+    """Resolve all (host, port) targets in parallel with the OS resolver and record the timings"""
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        return []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(targets)), thread_name_prefix="dns") as executor:
+        results = list(executor.map(lambda target: resolve_host(*target), targets))
+    elapsed = (time.perf_counter() - start) * 1000
+
+    resolved = [r for r in results if r["os_dns_ms"] is not None]
+    slowest = max(resolved, key=lambda r: r["os_dns_ms"], default=None)
+    message = f"✓ OS resolver: {len(resolved)}/{len(results)} hosts in {elapsed:.0f} ms"
+    if slowest is not None:
+        message += f" (slowest {slowest['host']}: {slowest['os_dns_ms']:.0f} ms)"
+    logsink.info("dns", message)
+    for result in results:
+        if result["error"]:
+            logsink.debug("dns", f"✗ {result['host']}:{result['port']}: {result['error']}")
+    if timings_path:
+        TelemetryWriter(timings_path).write({"ts": time.time(), "resolver": "os", "elapsed_ms": elapsed,
+                                             "hosts": results})
+    return results
+
+def resolver_rules(results):
+    """Chromium --host-resolver-rules value pinning every resolved host to its first address"""
+    rules = {}
+    for result in results:
+        if result["addresses"] and not result["error"] and result["host"] not in rules:
+            address = result["addresses"][0]
+            rules[result["host"]] = f"[{address}]" if ":" in address else address
+    return ", ".join(f"MAP {host} {address}" for host, address in rules.items())
+
+def host_resolver_flag(rules):
+    """QTWEBENGINE_CHROMIUM_FLAGS entry for resolver_rules().
+
+    The rules need spaces ("MAP host address"), so the value is quoted: QtWebEngine 6
+    splits the variable on spaces outside double quotes and drops the quotes. The
+    application's argv is no option, QApplication already exists when the hosts resolve.
+    """
+    return f'--host-resolver-rules="{rules}"'
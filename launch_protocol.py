@@ -0,0 +1,31 @@
+import os
+import json
+import hashlib
+
+MAX_MESSAGE_BYTES = 64 * 1024
+# Written back once a launch is taken, so a server that is shutting down does not swallow it
+ACK = b"ok\n"
+
+def server_name(profile_dir):
+    """Local socket name of the instance that owns profile_dir (one instance per profile)"""
+    digest = hashlib.sha1(os.path.abspath(profile_dir).encode("utf-8")).hexdigest()[:12]
+    return f"zerkalo-{digest}"
+
+def encode_launch(message):
+    """One forwarded launch on the wire: a line of JSON"""
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+def decode_launch(buffer):
+    """Launch dict from the bytes received so far, None while its line is incomplete.
+
+    Raises ValueError for an overlong or malformed line; anything but a JSON object is an empty launch.
+    """
+    if b"\n" not in buffer:
+        if len(buffer) > MAX_MESSAGE_BYTES:
+            raise ValueError("launch message too long")
+        return None
+    message = json.loads(bytes(buffer).split(b"\n", 1)[0].decode("utf-8"))
+    return message if isinstance(message, dict) else {}
+
+def is_ack(reply):
+    return reply.startswith(ACK.rstrip())
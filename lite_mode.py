@@ -0,0 +1,216 @@
+import os
+import urllib.parse
+from collections import OrderedDict
+
+import logsink
+
+# QWebEngineUrlRequestInfo.ResourceType names -> accounting category
+RESOURCE_CATEGORIES = {
+    "ResourceTypeMainFrame": "document",
+    "ResourceTypeSubFrame": "document",
+    "ResourceTypeImage": "image",
+    "ResourceTypeFavicon": "image",
+    "ResourceTypeMedia": "media",
+    "ResourceTypeFontResource": "font",
+    "ResourceTypeScript": "script",
+    "ResourceTypeWorker": "script",
+    "ResourceTypeSharedWorker": "script",
+    "ResourceTypeServiceWorker": "script",
+    "ResourceTypeStylesheet": "stylesheet",
+    "ResourceTypeXhr": "xhr",
+    "ResourceTypePrefetch": "prefetch",
+}
+
+# Resource Timing does not say what a resource is, the extension is the best hint
+EXTENSION_CATEGORIES = {
+    **dict.fromkeys((".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".svg", ".ico", ".bmp"), "image"),
+    **dict.fromkeys((".mp4", ".webm", ".ogg", ".mp3", ".m4a", ".wav", ".m3u8"), "media"),
+    **dict.fromkeys((".woff", ".woff2", ".ttf", ".otf", ".eot"), "font"),
+    **dict.fromkeys((".js", ".mjs"), "script"),
+    ".css": "stylesheet",
+}
+
+INITIATOR_CATEGORIES = {
+    "img": "image",
+    "image": "image",
+    "video": "media",
+    "audio": "media",
+    "track": "media",
+    "script": "script",
+    "xmlhttprequest": "xhr",
+    "fetch": "xhr",
+    "beacon": "xhr",
+    "iframe": "document",
+    "frame": "document",
+    "navigation": "document",
+}
+
+# Lite mode rules: one category each, "third-party-script" only blocks scripts from other sites
+LITE_RULES = ("image", "media", "font", "third-party-script", "prefetch")
+
+def resource_category(type_name):
+    return RESOURCE_CATEGORIES.get(type_name, "other")
+
+def timing_category(url, initiator):
+    """Category of a Resource Timing entry"""
+    extension = os.path.splitext(urllib.parse.urlsplit(url).path)[1].lower()
+    return EXTENSION_CATEGORIES.get(extension) or INITIATOR_CATEGORIES.get(initiator, "other")
+
+def site(host):
+    """Registrable part of a host, approximated by its last two labels (IPs stay whole)"""
+    host = (host or "").lower().strip(".")
+    labels = host.split(".")
+    if len(labels) <= 2 or labels[-1].isdigit() or ":" in host:
+        return host
+    return ".".join(labels[-2:])
+
+def is_unmeasured(timing):
+    """Cross-origin entry without Timing-Allow-Origin: sizes and response timings all read 0.
+
+    A cache hit also has transferSize 0 but keeps its body size and response start.
+    """
+    return (not timing.get("transferSize") and not timing.get("bodySize")
+            and not timing.get("encodedBodySize") and timing.get("ttfb") is None)
+
+def format_bytes(size):
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.0f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
+
+class LitePolicy:
+    """Decides which subresources lite mode keeps off the network.
+
+    Requests are dropped by category (LITE_RULES) and by size: anything the
+    ledger has seen to be larger than max_bytes before is not fetched again,
+    except documents, stylesheets and first-party scripts the page cannot work
+    without. Sizes are only known for resources Resource Timing measured (see
+    ByteLedger), so the size rule never applies to cross-origin resources
+    served without Timing-Allow-Origin.
+    """
+    def __init__(self, rules=LITE_RULES, max_bytes=200 * 1024, enabled=False):
+        unknown = [rule for rule in rules if rule not in LITE_RULES]
+        if unknown:
+            logsink.warning("lite", f"! Unknown lite mode rules: {', '.join(unknown)}")
+        self.rules = set(rules) - set(unknown)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+
+    def decide(self, category, url, first_party_url, known_size=None):
+        """Rule that blocks the request, None to let it through"""
+        if not self.enabled or category == "document":
+            return None
+        if category in self.rules:
+            return category
+        third_party = False
+        if category == "script":
+            request_site = site(urllib.parse.urlsplit(url).hostname)
+            page_site = site(urllib.parse.urlsplit(first_party_url).hostname)
+            third_party = bool(page_site) and request_site != page_site
+            if third_party and "third-party-script" in self.rules:
+                return "third-party-script"
+        if category == "stylesheet" or (category == "script" and not third_party):
+            return None  # Blocking these by size breaks the page
+        if self.max_bytes and known_size is not None and known_size > self.max_bytes:
+            return "size"
+        return None
+
+class ByteLedger:
+    """Bytes each page pulled in and lite mode saved, per resource category.
+
+    Transferred bytes come from the page's Resource Timing entries (cache hits
+    count as zero). Blocked requests are charged at the size the same URL had
+    when it was last fetched, so savings are an estimate that improves as the
+    ledger learns sizes.
+
+    Resource Timing hides sizes (and timings) of cross-origin resources served
+    without a Timing-Allow-Origin header, and Qt offers no other view of bytes
+    on the wire. Such entries are counted as unmeasured per category instead
+    of being taken for zero bytes, so the UI can say how much it cannot see.
+    """
+    def __init__(self, max_pages=200, max_sizes=5000):
+        self.max_pages = max_pages
+        self.max_sizes = max_sizes
+        self.pages = OrderedDict()  # first-party URL -> page entry
+        self.sizes = OrderedDict()  # resource URL -> last seen body size
+        self.session = {"bytes": 0, "saved": 0, "unmeasured": 0}
+
+    def entry(self, page_url):
+        page = self.pages.get(page_url)
+        if page is None:
+            page = self.pages[page_url] = {"bytes": {}, "requests": {}, "unmeasured": {}, "blocked": {}, "saved": {}}
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return page
+
+    def start_page(self, page_url):
+        """A new navigation of page_url counts from zero"""
+        self.pages.pop(page_url, None)
+        self.entry(page_url)
+
+    def known_size(self, url):
+        return self.sizes.get(url)
+
+    def learn(self, url, size):
+        if size:
+            self.sizes[url] = size
+            self.sizes.move_to_end(url)
+            while len(self.sizes) > self.max_sizes:
+                self.sizes.popitem(last=False)
+
+    def record_blocked(self, page_url, category, url):
+        page = self.entry(page_url)
+        saved = self.sizes.get(url, 0)
+        page["blocked"][category] = page["blocked"].get(category, 0) + 1
+        page["saved"][category] = page["saved"].get(category, 0) + saved
+        self.session["saved"] += saved
+
+    def account(self, page_url, record):
+        """Replace the page's transferred bytes with the totals of a telemetry record"""
+        page = self.entry(page_url)
+        transferred, requests, unmeasured = {}, {}, {}
+        entries = [(page_url, "navigation", record.get("navigation") or {})]
+        entries += [(r.get("name") or "", r.get("type"), r) for r in record.get("resources") or []]
+        for url, initiator, timing in entries:
+            category = "document" if initiator == "navigation" else timing_category(url, initiator)
+            requests[category] = requests.get(category, 0) + 1
+            if initiator != "navigation" and is_unmeasured(timing):
+                unmeasured[category] = unmeasured.get(category, 0) + 1
+                continue
+            transferred[category] = transferred.get(category, 0) + int(timing.get("transferSize") or 0)
+            self.learn(url, int(timing.get("bodySize") or timing.get("encodedBodySize") or 0))
+        self.session["bytes"] += sum(transferred.values()) - sum(page["bytes"].values())
+        self.session["unmeasured"] += sum(unmeasured.values()) - sum(page["unmeasured"].values())
+        page["bytes"], page["requests"], page["unmeasured"] = transferred, requests, unmeasured
+        return page
+
+    def totals(self, page_url):
+        """(bytes transferred, estimated bytes saved, requests blocked) for page_url"""
+        page = self.pages.get(page_url)
+        if page is None:
+            return 0, 0, 0
+        return sum(page["bytes"].values()), sum(page["saved"].values()), sum(page["blocked"].values())
+
+    def unmeasured(self, page_url):
+        """Requests of page_url whose size Resource Timing did not reveal"""
+        page = self.pages.get(page_url)
+        return sum(page["unmeasured"].values()) if page else 0
+
+    def breakdown(self, page_url):
+        """One line per category: transferred bytes, requests, blocked requests and saved bytes"""
+        page = self.pages.get(page_url)
+        if page is None:
+            return []
+        lines = []
+        for category in sorted(set(page["bytes"]) | set(page["unmeasured"]) | set(page["blocked"]),
+                               key=lambda c: -page["bytes"].get(c, 0)):
+            line = f"{category}: {format_bytes(page['bytes'].get(category, 0))}"
+            if page["requests"].get(category):
+                line += f" in {page['requests'][category]}"
+            if page["unmeasured"].get(category):
+                line += f" ({page['unmeasured'][category]} unmeasured)"
+            if page["blocked"].get(category):
+                line += f", {page['blocked'][category]} blocked (~{format_bytes(page['saved'].get(category, 0))} saved)"
+            lines.append(line)
+        return lines
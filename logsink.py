@@ -0,0 +1,218 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import threading
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {name.lower(): level for level, name in LEVEL_NAMES.items()}
+
+# Lines the writer thread takes from the queue per file write
+BATCH_SIZE = 500
+# Rate-limit buckets kept at most; sources are JS hosts too, so the set is open-ended
+MAX_SOURCES = 1000
+
+def parse_level(value):
+    """"warning" / "WARNING" / 30 -> 30"""
+    if isinstance(value, int):
+        return value
+    return LEVELS.get(str(value).lower(), INFO)
+
+class RateLimiter:
+    """Token bucket per source; counts what it drops so the gap can be reported"""
+    def __init__(self, rate, burst, max_sources=MAX_SOURCES):
+        self.rate = rate
+        self.burst = burst
+        self.max_sources = max_sources
+        self.buckets = {}  # source -> [tokens, last refill, suppressed]
+
+    def allow(self, source, now):
+        """Return (allowed, number of messages suppressed since the last allowed one)"""
+        bucket = self.buckets.get(source)
+        if bucket is None:
+            if len(self.buckets) >= self.max_sources:
+                self.prune(now)
+            bucket = self.buckets[source] = [self.burst, now, 0]
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] < 1:
+            bucket[2] += 1
+            return False, 0
+        bucket[0] -= 1
+        suppressed, bucket[2] = bucket[2], 0
+        return True, suppressed
+
+    def prune(self, now):
+        """Forget sources whose bucket refilled (same as a new one), then the longest idle"""
+        for source, (tokens, last, suppressed) in list(self.buckets.items()):
+            if not suppressed and tokens + (now - last) * self.rate >= self.burst:
+                del self.buckets[source]
+        excess = len(self.buckets) - self.max_sources + 1
+        if excess > 0:
+            for source in sorted(self.buckets, key=lambda s: self.buckets[s][1])[:excess]:
+                del self.buckets[source]
+
+class LogSink:
+    """Leveled log with per-source rate limiting, a ring buffer and a background writer.
+
+    log() only formats a line and hands it over; the rotating file and the
+    terminal are written by a daemon thread in batches.
+    """
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backups=3, ring_size=5000,
+                 rate=20.0, burst=100, file_level=DEBUG, echo_level=INFO, queue_size=10000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file_level = file_level
+        self.echo_level = echo_level
+        self.ring = deque(maxlen=ring_size)
+        self.limiter = RateLimiter(rate, burst)
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.file = None
+        self.closed = False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.writer = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.writer.start()
+
+    def log(self, level, source, message):
+        """message may be a function returning the text, called only for lines that get logged"""
+        if level < min(self.file_level, self.echo_level):
+            return
+        if self.closed:
+            # The writer is gone, a queued line would never show up anywhere
+            if level >= self.echo_level:
+                print(render(message))
+            return
+        now = time.time()
+        with self.lock:
+            allowed, suppressed = self.limiter.allow(source, now)
+            if not allowed:
+                return
+            message = render(message)
+            stamp = time.strftime("%H:%M:%S", time.localtime(now)) + f".{int(now % 1 * 1000):03d}"
+            if suppressed:
+                self.enqueue(WARNING, stamp, source, f"! {suppressed} messages from {source} suppressed by rate limit")
+            self.enqueue(level, stamp, source, message)
+
+    def enqueue(self, level, stamp, source, message):
+        line = f"{stamp} {LEVEL_NAMES.get(level, level)} [{source}] {message}"
+        self.ring.append(line)
+        try:
+            # The terminal keeps getting the bare message, the file gets the full line
+            self.queue.put_nowait((level, line, message))
+        except queue.Full:
+            # Writer is stuck (slow disk or terminal); the ring buffer still has the line
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self.write_batch([item for item in batch if item is not None])
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def write_batch(self, batch):
+        file_lines = "".join(f"{line}\n" for level, line, _ in batch if level >= self.file_level)
+        echo_lines = "".join(f"{message}\n" for level, _, message in batch if level >= self.echo_level)
+        if file_lines:
+            try:
+                self.write_file(file_lines)
+            except OSError as e:
+                echo_lines += f"✗ Could not write log: {str(e)}\n"
+        if echo_lines:
+            try:
+                sys.stdout.write(echo_lines)
+                sys.stdout.flush()
+            except (OSError, ValueError):
+                pass
+
+    def write_file(self, text):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        if self.file.tell() + len(text) > self.max_bytes:
+            self.file.close()
+            self.rotate()
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write(text)
+        self.file.flush()
+
+    def rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if os.path.exists(self.path):
+            os.replace(self.path, f"{self.path}.1")
+
+    def dump(self, path=None):
+        """Write the ring buffer (most recent lines at every level) to path and return it"""
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(os.path.dirname(self.path), f"dump-{stamp}.log")
+        with self.lock:
+            lines = list(self.ring)
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{line}\n" for line in lines)
+        return path
+
+    def close(self):
+        """Flush what is queued and stop the writer; later log() calls fall back to print()"""
+        global sink
+        if sink is self:
+            sink = None
+        self.closed = True
+        if not self.writer.is_alive():
+            return
+        self.queue.put(None)
+        self.writer.join(timeout=5)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+def render(message):
+    return message() if callable(message) else message
+
+sink = None
+
+def start_logging(path, **options):
+    """Install the process-wide sink; until then log() falls back to print()"""
+    global sink
+    sink = LogSink(path, **options)
+    atexit.register(sink.close)
+    return sink
+
+def log(level, source, message):
+    if sink is None:
+        if level >= INFO:
+            print(render(message))
+        return
+    sink.log(level, source, message)
+
+def debug(source, message):
+    log(DEBUG, source, message)
+
+def info(source, message):
+    log(INFO, source, message)
+
+def warning(source, message):
+    log(WARNING, source, message)
+
+def error(source, message):
+    log(ERROR, source, message)
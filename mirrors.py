@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import logsink
+
+PROBE_TIMEOUT = 5.0  # seconds per mirror
+PROBE_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+
+def read_mirror_file(path):
+    """Read mirror URLs from zerkalo.txt: one per line, blank lines and # comments ignored"""
+    urls = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and line not in urls:
+                urls.append(line)
+    return urls
+
+def probe_mirror(url, timeout=PROBE_TIMEOUT):
+    """Return time to first byte in seconds, or None if the mirror is unreachable"""
+    request = urllib.request.Request(url, headers={"User-Agent": PROBE_USER_AGENT})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read(1)
+    except urllib.error.HTTPError as e:
+        # The server answered, only 5xx means the mirror itself is broken
+        if e.code >= 500:
+            return None
+    except Exception:
+        return None
+    return time.perf_counter() - start
+
+def mirror_origin(url):
+    parts = urllib.parse.urlsplit(url)
+    return (parts.scheme, parts.hostname, parts.port)
+
+class MirrorList:
+    """Mirrors from zerkalo.txt ranked by time to first byte, with failover"""
+    def __init__(self, urls, ranking_path=None):
+        self.urls = list(urls)
+        self.ranking_path = ranking_path
+        self.ranking = self.load_ranking()  # url -> ttfb seconds, None when unreachable
+        self.tried = set()
+        self.current = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, ranking_path=None):
+        return cls(read_mirror_file(path), ranking_path)
+
+    def load_ranking(self):
+        if not self.ranking_path:
+            return {}
+        try:
+            with open(self.ranking_path, "r", encoding="utf-8") as f:
+                ranking = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {url: ttfb for url, ttfb in ranking.items() if url in self.urls}
+
+    def save_ranking(self):
+        if not self.ranking_path:
+            return
+        with self.lock:
+            ranking = dict(self.ranking)
+        tmp_path = self.ranking_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(ranking, f, indent=2)
+            os.replace(tmp_path, self.ranking_path)
+        except OSError as e:
+            logsink.error("mirrors", f"✗ Could not save mirror ranking: {str(e)}")
+
+    def ranked(self):
+        """Mirrors fastest first; unmeasured ones keep file order, dead ones go last"""
+        def sort_key(item):
+            position, url = item
+            ttfb = self.ranking.get(url, -1)
+            if ttfb is None:
+                return (2, position)
+            if ttfb < 0:
+                return (1, position)
+            return (0, ttfb)
+        with self.lock:
+            return [url for _, url in sorted(enumerate(self.urls), key=sort_key)]
+
+    def probe(self, timeout=PROBE_TIMEOUT):
+        """Probe all mirrors concurrently and return the first one to answer.
+
+        Slower probes keep running in the background and the complete ranking
+        is written to disk once every mirror has answered or timed out.
+        """
+        if not self.urls:
+            return None
+
+        first = []
+        done = threading.Event()
+        remaining = [len(self.urls)]
+
+        def on_result(url, ttfb):
+            with self.lock:
+                self.ranking[url] = ttfb
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+                if ttfb is not None and not first:
+                    first.append(url)
+                    done.set()
+            if finished:
+                done.set()
+                self.save_ranking()
+                reachable = [(t, u) for u, t in self.ranking.items() if t is not None]
+                logsink.info("mirrors", f"✓ Probed {len(self.urls)} mirrors, {len(reachable)} reachable")
+
+        executor = ThreadPoolExecutor(max_workers=len(self.urls), thread_name_prefix="mirror-probe")
+        for url in self.urls:
+            future = executor.submit(probe_mirror, url, timeout)
+            future.add_done_callback(lambda f, url=url: on_result(url, f.result()))
+        executor.shutdown(wait=False)
+
+        done.wait(timeout + 1)
+        if first:
+            logsink.info("mirrors", f"✓ Fastest mirror: {first[0]} ({self.ranking[first[0]] * 1000:.0f} ms)")
+            return first[0]
+        logsink.warning("mirrors", "✗ No mirror answered the probe")
+        return None
+
+    def probe_async(self, callback, timeout=PROBE_TIMEOUT):
+        """Run probe() on a worker thread and pass its result to callback.
+
+        The callback runs on that worker thread, so UI code has to post it to
+        its main thread (a queued Qt signal, Kivy's @mainthread).
+        """
+        thread = threading.Thread(
+            target=lambda: callback(self.probe(timeout)), name="mirror-probe", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def choose(self, url=None):
+        """Mark url (or the best ranked mirror) as the one in use"""
+        if url is None:
+            untried = [u for u in self.ranked() if u not in self.tried]
+            url = untried[0] if untried else None
+        if url is not None:
+            self.tried.add(url)
+        self.current = url
+        return url
+
+    def next_mirror(self):
+        """Switch to the best mirror not tried yet in this session, or None"""
+        if self.current is not None:
+            with self.lock:
+                self.ranking[self.current] = None
+            self.save_ranking()
+        return self.choose()
+
+    def owns(self, url):
+        """True if url is served by the mirror currently in use"""
+        return self.current is not None and mirror_origin(url) == mirror_origin(self.current)
+
+    def mirror_for(self, url):
+        """Configured mirror that serves url (by origin), None for other sites"""
+        origin = mirror_origin(url)
+        for mirror in self.urls:
+            if mirror_origin(mirror) == origin:
+                return mirror
+        return None
+
+    def rebase(self, url, mirror):
+        """Move url onto another mirror, keeping its path and query"""
+        parts = urllib.parse.urlsplit(url)
+        base = urllib.parse.urlsplit(mirror)
+        return urllib.parse.urlunsplit((base.scheme, base.netloc, parts.path, parts.query, parts.fragment))
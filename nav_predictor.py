@@ -0,0 +1,206 @@
+import os
+import re
+import json
+import time
+import urllib.parse
+from collections import deque
+
+import logsink
+
+# Path segments that are ids, not structure: /question/123 and /question/456 are one pattern
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-f]{12,}|[0-9a-f-]{36})$", re.IGNORECASE)
+ID_IN_NAME = re.compile(r"\d+")
+
+# How long a prefetched URL still counts as a hit (Chromium keeps prefetches about 5 minutes)
+PREFETCH_TTL = 300
+
+# Gathers candidate links of the loaded page (evaluated in the application world)
+LINKS_SCRIPT = """
+(function () {
+    var seen = {}, links = [];
+    var anchors = document.querySelectorAll("a[href]");
+    for (var i = 0; i < anchors.length && links.length < 300; i++) {
+        var href = anchors[i].href.split("#")[0];
+        if (/^https?:/.test(href) && !seen[href] && href !== location.href.split("#")[0]) {
+            seen[href] = true;
+            links.push(href);
+        }
+    }
+    return links;
+})()
+"""
+
+# %s is the JSON list of {rel, href} hints
+HINTS_SCRIPT = """
+(function (hints) {
+    hints.forEach(function (hint) {
+        var link = document.createElement("link");
+        link.rel = hint.rel;
+        link.href = hint.href;
+        if (hint.rel === "preconnect") link.crossOrigin = "anonymous";
+        document.head.appendChild(link);
+    });
+})(%s)
+"""
+
+def url_pattern(url):
+    """Host-independent shape of a URL: ids become :id, query values are dropped"""
+    parts = urllib.parse.urlsplit(url)
+    segments = []
+    for segment in parts.path.split("/"):
+        if ID_SEGMENT.match(segment):
+            segments.append(":id")
+        else:
+            segments.append(ID_IN_NAME.sub(":n", segment))
+    pattern = "/".join(segments) or "/"
+    keys = sorted({key for key, _ in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)})
+    if keys:
+        pattern += "?" + "&".join(keys)
+    return pattern
+
+class NavPredictor:
+    """Learns how often pages of one URL pattern lead to pages of another and turns the
+    links of a loaded page into prefetch/preconnect hints.
+
+    Transition counts are kept per pattern, capped at max_targets targets per
+    source and halved once a source has seen more than max_count navigations,
+    so the JSON file stays small and old habits fade. Prefetches are limited
+    to max_per_page per load and budget_bytes per minute.
+    """
+    def __init__(self, path, max_per_page=2, budget_bytes=1024 * 1024, prefetch_probability=0.3,
+                 preconnect_probability=0.1, max_patterns=500, max_targets=8, max_count=1000,
+                 size_estimate=None):
+        self.path = path
+        self.max_per_page = max_per_page
+        self.budget_bytes = budget_bytes
+        self.prefetch_probability = prefetch_probability
+        self.preconnect_probability = preconnect_probability
+        self.max_patterns = max_patterns
+        self.max_targets = max_targets
+        self.max_count = max_count
+        self.size_estimate = size_estimate  # url -> expected bytes or None
+        self.transitions = self.load()  # pattern -> {next pattern: count}
+        self.dirty = 0
+        self.spent = deque()  # (time, bytes) of prefetches in the last minute
+        self.prefetched = {}  # url -> time it was prefetched
+        self.load_ms = {}  # pattern -> [average load ms without prefetch, samples]
+        self.prefetches = 0
+        self.preconnects = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("transitions", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"transitions": self.transitions}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self.dirty = 0
+        except OSError as e:
+            logsink.error("predictor", f"✗ Could not save navigation history: {str(e)}")
+
+    def observe(self, from_url, to_url):
+        """Count one navigation from from_url to to_url"""
+        source, target = url_pattern(from_url), url_pattern(to_url)
+        targets = self.transitions.pop(source, {})
+        self.transitions[source] = targets  # Most recently used source last
+        targets[target] = targets.get(target, 0) + 1
+        if sum(targets.values()) > self.max_count:
+            for key in list(targets):
+                targets[key] //= 2
+                if not targets[key]:
+                    del targets[key]
+        if len(targets) > self.max_targets:
+            del targets[min(targets, key=targets.get)]
+        while len(self.transitions) > self.max_patterns:
+            del self.transitions[next(iter(self.transitions))]
+        self.dirty += 1
+        if self.dirty >= 20:
+            self.save()
+
+    def probabilities(self, url):
+        """{next pattern: probability} after a page of url's pattern"""
+        targets = self.transitions.get(url_pattern(url), {})
+        total = sum(targets.values())
+        return {pattern: count / total for pattern, count in targets.items()} if total else {}
+
+    def budget_left(self, now):
+        while self.spent and now - self.spent[0][0] > 60:
+            self.spent.popleft()
+        return self.budget_bytes - sum(size for _, size in self.spent)
+
+    def plan(self, page_url, links, allow_prefetch=True):
+        """Hints for the most likely next links: [{"rel": "prefetch"|"preconnect", "href": ...}]"""
+        probabilities = self.probabilities(page_url)
+        if not probabilities:
+            return []
+        now = time.time()
+        page_origin = urllib.parse.urlsplit(page_url)[:2]
+        scored = [(probabilities.get(url_pattern(link), 0.0), link) for link in links]
+        scored = sorted((entry for entry in scored if entry[0] >= self.preconnect_probability),
+                        key=lambda entry: -entry[0])
+
+        hints, origins, prefetches = [], set(), 0
+        for probability, link in scored:
+            if now - self.prefetched.get(link, 0) < PREFETCH_TTL:
+                continue  # Still in Chromium's prefetch cache
+            if allow_prefetch and probability >= self.prefetch_probability and prefetches < self.max_per_page:
+                size = (self.size_estimate(link) if self.size_estimate else None) or 100 * 1024
+                if size <= self.budget_left(now):
+                    self.spent.append((now, size))
+                    self.prefetched[link] = now
+                    self.prefetches += 1
+                    prefetches += 1
+                    hints.append({"rel": "prefetch", "href": link})
+                    continue
+            # The page's own origin is connected already
+            origin = urllib.parse.urlsplit(link)[:2]
+            if origin != page_origin and origin not in origins:
+                origins.add(origin)
+                self.preconnects += 1
+                hints.append({"rel": "preconnect", "href": f"{origin[0]}://{origin[1]}"})
+        for link in [url for url, at in self.prefetched.items() if now - at >= PREFETCH_TTL]:
+            del self.prefetched[link]
+        return hints
+
+    def record_load(self, url, ms):
+        """Account a finished navigation; returns whether it was served by a prefetch"""
+        pattern = url_pattern(url)
+        prefetched_at = self.prefetched.pop(url.split("#")[0], None)
+        average = self.load_ms.get(pattern)
+        if prefetched_at is not None and time.time() - prefetched_at < PREFETCH_TTL:
+            self.hits += 1
+            if average is not None:
+                self.saved_ms += max(0.0, average[0] - ms)
+            return True
+        self.misses += 1
+        if average is None:
+            self.load_ms[pattern] = [ms, 1]
+        else:
+            # Running average over the last ~20 loads without a prefetch
+            average[1] = min(average[1] + 1, 20)
+            average[0] += (ms - average[0]) / average[1]
+        return False
+
+    def stats(self):
+        loads = self.hits + self.misses
+        return {
+            "patterns": len(self.transitions),
+            "prefetches": self.prefetches,
+            "preconnects": self.preconnects,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / loads if loads else 0.0,
+            "prefetch_accuracy": self.hits / self.prefetches if self.prefetches else 0.0,
+            "saved_ms": self.saved_ms,
+        }
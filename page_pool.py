@@ -0,0 +1,81 @@
+import time
+
+import logsink
+
+class SparePagePool:
+    """Keeps a few pre-built pages (with their renderer started) ready for new tabs.
+
+    factory() builds one spare and returns it; take() hands out a spare or
+    None so the caller builds the page itself. Refilling is left to the owner,
+    which calls refill_one() when the app is idle.
+    """
+    def __init__(self, factory, size=1, dispose=None):
+        self.factory = factory
+        self.dispose = dispose
+        self.size = size
+        self.spares = []
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.create_ms = 0.0  # Total time spent building spares
+        self.warmed = 0
+        self.warm_ms = 0.0  # Total time from building a spare until its renderer was ready
+
+    def take(self):
+        if self.spares:
+            self.hits += 1
+            return self.spares.pop(0)
+        self.misses += 1
+        return None
+
+    def needs_refill(self):
+        return len(self.spares) < self.size
+
+    def refill_one(self):
+        """Build one spare; returns False when the pool is already full"""
+        if not self.needs_refill():
+            return False
+        start = time.perf_counter()
+        try:
+            spare = self.factory()
+        except Exception as e:
+            logsink.error("pool", f"✗ Could not build a spare page: {str(e)}")
+            return False
+        self.create_ms += (time.perf_counter() - start) * 1000
+        self.created += 1
+        self.spares.append(spare)
+        return True
+
+    def record_warm(self, ms):
+        """Called by the owner once a spare's renderer finished its first (blank) load"""
+        self.warmed += 1
+        self.warm_ms += ms
+
+    def average_create_ms(self):
+        return self.create_ms / self.created if self.created else None
+
+    def average_warm_ms(self):
+        return self.warm_ms / self.warmed if self.warmed else None
+
+    def stats(self):
+        takes = self.hits + self.misses
+        create = self.average_create_ms()
+        warm = self.average_warm_ms()
+        # A hit skips building the page and view and waiting for its renderer
+        average = None if create is None else create + (warm or 0.0)
+        return {
+            "size": self.size,
+            "ready": len(self.spares),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / takes if takes else 0.0,
+            "average_create_ms": create,
+            "average_warm_ms": warm,
+            "saved_ms": self.hits * average if average is not None else 0.0,
+        }
+
+    def clear(self):
+        spares, self.spares = self.spares, []
+        if self.dispose is not None:
+            for spare in spares:
+                self.dispose(spare)
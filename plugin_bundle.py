@@ -0,0 +1,416 @@
+import os
+import re
+import glob
+import json
+import hashlib
+import urllib.parse
+
+import logsink
+
+# Bump when the wrapper format changes so stale bundles are rebuilt
+BUNDLE_FORMAT = 4
+
+DEFAULT_RUN_AT = "document-end"
+# Plugins see the page's own JavaScript objects unless they declare another world;
+# the ones that call zerkalo declare the bridge's world (// @world user by default)
+DEFAULT_WORLD = "main"
+
+def parse_plugin_header(source):
+    """Read userscript-style metadata from the // ==UserScript== block of a plugin"""
+    meta = {}
+    in_header = False
+    for line in source.splitlines():
+        line = line.strip()
+        if line.startswith("// ==UserScript=="):
+            in_header = True
+        elif line.startswith("// ==/UserScript=="):
+            break
+        elif in_header and line.startswith("// @"):
+            key, _, value = line[4:].partition(" ")
+            meta.setdefault(key, []).append(value.strip())
+    return meta
+
+def strip_plugin_header(source):
+    """Drop the metadata block so QtWebEngine does not apply it to the whole bundle"""
+    start = source.find("// ==UserScript==")
+    end = source.find("// ==/UserScript==")
+    if start == -1 or end == -1:
+        return source
+    end = source.find("\n", end)
+    return source[:start] + ("" if end == -1 else source[end + 1:])
+
+class Plugin:
+    """A single plugins/*.js file with its parsed header"""
+    def __init__(self, name, source, digest=None):
+        self.name = name
+        self.source = source
+        self.hash = digest or hashlib.sha256(source.encode("utf-8")).hexdigest()
+        self.meta = parse_plugin_header(source)
+
+    @property
+    def run_at(self):
+        return self.meta.get("run-at", [DEFAULT_RUN_AT])[-1]
+
+    @property
+    def world(self):
+        return self.meta.get("world", [DEFAULT_WORLD])[-1]
+
+    @property
+    def runs_on_subframes(self):
+        return "noframes" not in self.meta
+
+    @property
+    def matches(self):
+        """@match patterns and @include globs; no patterns at all means every page"""
+        return tuple(self.meta.get("match", [])), tuple(self.meta.get("include", []))
+
+    @property
+    def excludes(self):
+        return tuple(self.meta.get("exclude", []))
+
+    def group_key(self):
+        """Plugins sharing injection point, world, frame policy and URL scope can share one bundle"""
+        return (self.run_at, self.world, self.runs_on_subframes, self.matches, self.excludes)
+
+def wrap_plugin(plugin):
+    """Isolate a plugin so an exception in it does not stop the rest of the bundle,
+    and time its synchronous run with performance.mark/measure.
+
+    The plugin runs in a plain block, not a function, so its top-level `var` and
+    `function` declarations still become globals as they did when every plugin
+    was its own script. Top-level `let`/`const`/`class` stay local to the plugin
+    (they would clash between plugins of one bundle otherwise) and a leading
+    "use strict" no longer applies to the plugin.
+    """
+    label = json.dumps(f"✗ Plugin {plugin.name} failed:")
+    start_mark = json.dumps(f"zerkalo-plugin-start:{plugin.name}")
+    measure = json.dumps(f"zerkalo-plugin:{plugin.name}")
+    return (
+        f"// ---- {plugin.name} ----\n"
+        f"performance.mark({start_mark});\n"
+        f"try {{\n"
+        f"{strip_plugin_header(plugin.source)}\n"
+        f"}} catch (e) {{\n"
+        f"    console.error({label}, e);\n"
+        f"}}\n"
+        f"try {{\n"
+        f"    performance.measure({measure}, {start_mark});\n"
+        f"    performance.clearMarks({start_mark});\n"
+        f"}} catch (e) {{}}\n"
+    )
+
+def build_bundles(plugins):
+    """Merge plugins into one bundle per injection group, keeping file order"""
+    groups = {}
+    for plugin in plugins:
+        groups.setdefault(plugin.group_key(), []).append(plugin)
+
+    bundles = []
+    for (run_at, world, subframes, (match, include), exclude), members in groups.items():
+        bundles.append({
+            "run_at": run_at,
+            "world": world,
+            "subframes": subframes,
+            "match": list(match),
+            "include": list(include),
+            "exclude": list(exclude),
+            "plugins": [plugin.name for plugin in members],
+            "source": "".join(wrap_plugin(plugin) for plugin in members),
+        })
+    return bundles
+
+def bundle_header(bundle):
+    """Metadata block QtWebEngine uses to run the bundle only on matching URLs"""
+    lines = [f"// @match {pattern}" for pattern in bundle.get("match", [])]
+    lines += [f"// @include {pattern}" for pattern in bundle.get("include", [])]
+    lines += [f"// @exclude {pattern}" for pattern in bundle.get("exclude", [])]
+    if not lines:
+        return ""
+    return "// ==UserScript==\n" + "\n".join(lines) + "\n// ==/UserScript==\n"
+
+def glob_to_regex(pattern):
+    """Greasemonkey @include/@exclude glob as Chromium matches it: * is any run of characters, ? any one"""
+    body = "".join(".*" if char == "*" else "." if char == "?" else re.escape(char) for char in pattern)
+    return re.compile(f"^{body}$", re.DOTALL)
+
+def match_to_regex(pattern):
+    """Chrome-style @match pattern (scheme://host/path) -> (host key, regex); None if invalid.
+
+    The host key is ("exact", host), ("suffix", domain) or ("any", None) and
+    decides which bucket of the PluginIndex the pattern lands in. As in Chromium
+    scheme and host match case-insensitively, the path case-sensitively, and a
+    pattern without a port matches any port.
+    """
+    if pattern == "<all_urls>":
+        return ("any", None), re.compile(r"^(?i:https?|file|ftp)://")
+    found = re.match(r"^(\*|https?|file|ftp)://([^/:]*)(?::([0-9]+|\*))?(/.*)$", pattern)
+    if not found:
+        return None
+    scheme, host, port, path = found.groups()
+    scheme_re = "https?" if scheme == "*" else re.escape(scheme)
+    path_re = ".*".join(re.escape(part) for part in path.split("*"))
+    if port is None or port == "*":
+        port_re = "(:[0-9]+)?"
+    elif port == {"http": "80", "https": "443"}.get(scheme):
+        port_re = f"(:{port})?"  # URLs leave the default port out
+    else:
+        port_re = f":{port}"
+    if host == "*":
+        key, host_re = ("any", None), "[^/]*"
+    elif host.startswith("*."):
+        domain = host[2:].lower()
+        key, host_re = ("suffix", domain), f"([^/]*\\.)?{re.escape(domain)}"
+    else:
+        key, host_re = ("exact", host.lower()), re.escape(host.lower())
+    return key, re.compile(f"^(?i:{scheme_re}://{host_re}){port_re}{path_re}$")
+
+class PluginIndex:
+    """URL -> bundles whose @match/@include/@exclude patterns accept it.
+
+    Same rules as QtWebEngine's user scripts (Chromium's UserScript::MatchesURL):
+    when a bundle has @match patterns one of them has to match, when it has
+    @include globs one of those has to match as well, and no @exclude glob may
+    match. Patterns are compiled once; @match patterns are bucketed by host so
+    a lookup only tests the patterns that can apply to the URL's host.
+    """
+    def __init__(self, bundles):
+        self.bundles = bundles
+        self.unmatched = []  # bundle indexes without a (valid) @match pattern
+        self.by_host = {}  # host -> [(bundle index, regex)]
+        self.by_suffix = {}  # domain -> [(bundle index, regex)]
+        self.generic = []  # [(bundle index, regex)] for host wildcards
+        self.includes = {}  # bundle index -> [regex]
+        self.excludes = {}  # bundle index -> [regex]
+        self.cache = {}
+        for index, bundle in enumerate(bundles):
+            valid = 0
+            for pattern in bundle.get("match", []):
+                compiled = match_to_regex(pattern)
+                if compiled is None:
+                    # Qt drops it as well; a bundle left without @match runs wherever its globs allow
+                    logsink.warning("plugins", f"✗ Invalid @match pattern in {', '.join(bundle['plugins'])}: {pattern}")
+                    continue
+                valid += 1
+                (kind, host), regex = compiled
+                if kind == "exact":
+                    self.by_host.setdefault(host, []).append((index, regex))
+                elif kind == "suffix":
+                    self.by_suffix.setdefault(host, []).append((index, regex))
+                else:
+                    self.generic.append((index, regex))
+            if not valid:
+                self.unmatched.append(index)
+            if bundle.get("include"):
+                self.includes[index] = [glob_to_regex(pattern) for pattern in bundle["include"]]
+            if bundle.get("exclude"):
+                self.excludes[index] = [glob_to_regex(pattern) for pattern in bundle["exclude"]]
+
+    def match(self, url):
+        """Indexes of the bundles that run on url, in bundle order"""
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+        host = (urllib.parse.urlsplit(url).hostname or "").lower()
+        # Chromium matches @match patterns against the URL without its #fragment
+        # (the @include/@exclude globs see the whole URL)
+        match_url = urllib.parse.urldefrag(url).url
+        candidates = list(self.generic) + self.by_host.get(host, [])
+        labels = host.split(".")
+        for start in range(len(labels)):
+            candidates += self.by_suffix.get(".".join(labels[start:]), [])
+
+        found = set(self.unmatched)
+        for index, regex in candidates:
+            if index not in found and regex.match(match_url):
+                found.add(index)
+        result = [
+            index for index in sorted(found)
+            if (index not in self.includes or any(regex.match(url) for regex in self.includes[index]))
+            and not any(regex.match(url) for regex in self.excludes.get(index, []))
+        ]
+        if len(self.cache) >= 512:
+            self.cache.clear()
+        self.cache[url] = result
+        return result
+
+    def split(self, url):
+        """(plugins that run on url, plugins skipped on url)"""
+        matched = set(self.match(url))
+        run, skipped = [], []
+        for index, bundle in enumerate(self.bundles):
+            (run if index in matched else skipped).extend(bundle["plugins"])
+        return run, skipped
+
+# Engines without user scripts (Android WebView) get all plugins as one script that
+# schedules each injection group itself; %s are filled with the group sources
+SINGLE_BUNDLE_TEMPLATE = """// Evaluated from onPageStarted and again from onPageFinished, plugins run once per document
+if (!window.__zerkaloPlugins) {
+    window.__zerkaloPlugins = true;
+    // document-start plugins run at the top level, their var/function declarations stay global
+%s
+    (function () {
+        function documentEnd() {
+%s
+        }
+        function documentIdle() {
+%s
+        }
+        if (document.readyState === "loading") {
+            document.addEventListener("DOMContentLoaded", documentEnd, {once: true});
+        } else {
+            documentEnd();
+        }
+        if (document.readyState === "complete") {
+            setTimeout(documentIdle, 0);
+        } else {
+            window.addEventListener("load", function () { setTimeout(documentIdle, 0); }, {once: true});
+        }
+    })();
+}
+location.href;"""
+
+def build_single_bundle(bundles):
+    """Fold the bundles into one self-scheduling script (@world and @noframes do not apply).
+
+    document-end and document-idle plugins have to wait in a function, so unlike on
+    the desktop their top-level var/function declarations are not globals here.
+    """
+    groups = {"document-start": [], "document-end": [], "document-idle": []}
+    for bundle in bundles:
+        groups.get(bundle["run_at"], groups[DEFAULT_RUN_AT]).append(bundle["source"])
+    return SINGLE_BUNDLE_TEMPLATE % tuple("".join(groups[run_at]) for run_at in groups)
+
+class PluginBundler:
+    """Builds plugin bundles and keeps them on disk keyed by the plugins' content hash"""
+    def __init__(self, plugin_dir, cache_dir):
+        self.plugin_dir = plugin_dir
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.plugins = {}  # name -> Plugin, only filled for plugins that were read
+        self.hashes = {}  # name -> content hash of every plugin seen by the last build
+        self.bundle_key = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_index(self, index):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+
+    def scan(self):
+        """Return {name: (mtime_ns, size, path)} for every plugin file"""
+        files = {}
+        for file_path in sorted(glob.glob(os.path.join(self.plugin_dir, "*.js"))):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            files[os.path.basename(file_path)] = (stat.st_mtime_ns, stat.st_size, file_path)
+        return files
+
+    def read_plugin(self, name, path):
+        with open(path, "r", encoding="utf-8") as f:
+            plugin = Plugin(name, f.read())
+        self.plugins[name] = plugin
+        return plugin
+
+    def bundle_path(self, enabled):
+        """Set bundle_key for the enabled plugins and return where their bundle is cached"""
+        key_source = json.dumps([BUNDLE_FORMAT, [(name, self.hashes[name]) for name in enabled]])
+        self.bundle_key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"bundle-{self.bundle_key[:16]}.json")
+
+    def build(self, disabled=()):
+        """Return bundles for all enabled plugins, reusing the stored bundle when unchanged"""
+        index = self.load_index()
+        known = index.get("files", {})
+        files = self.scan()
+
+        # Only re-hash files whose size or mtime moved since the last run
+        hashes = {}
+        for name, (mtime_ns, size, path) in files.items():
+            entry = known.get(name)
+            if entry and entry["mtime_ns"] == mtime_ns and entry["size"] == size:
+                hashes[name] = entry["hash"]
+                continue
+            try:
+                hashes[name] = self.read_plugin(name, path).hash
+            except Exception as e:
+                logsink.error("plugins", f"✗ Error loading plugin {name}: {str(e)}")
+
+        # Forget plugins whose files were removed
+        for name in list(self.plugins):
+            if name not in hashes:
+                del self.plugins[name]
+        self.hashes = hashes
+
+        enabled = [name for name in hashes if name not in disabled]
+        bundle_path = self.bundle_path(enabled)
+
+        bundles = None
+        if os.path.exists(bundle_path):
+            try:
+                with open(bundle_path, "r", encoding="utf-8") as f:
+                    bundles = json.load(f)
+                logsink.info("plugins", f"✓ Reusing cached plugin bundle {self.bundle_key[:12]}")
+            except (OSError, ValueError):
+                bundles = None
+
+        if bundles is None:
+            plugins = []
+            for name in list(enabled):
+                plugin = self.plugins.get(name)
+                if plugin is None or plugin.hash != hashes[name]:
+                    try:
+                        plugin = self.read_plugin(name, files[name][2])
+                    except Exception as e:
+                        # Deleted or rewritten since the scan: leave it out of this bundle and the index
+                        logsink.error("plugins", f"✗ Error loading plugin {name}: {str(e)}")
+                        enabled.remove(name)
+                        del hashes[name]
+                        self.plugins.pop(name, None)
+                        continue
+                plugins.append(plugin)
+            bundle_path = self.bundle_path(enabled)
+            bundles = build_bundles(plugins)
+            with open(bundle_path, "w", encoding="utf-8") as f:
+                json.dump(bundles, f)
+            logsink.info("plugins", f"✓ Built plugin bundle {self.bundle_key[:12]} from {len(plugins)} plugins")
+            self.prune(keep=bundle_path)
+
+        self.save_index({"files": {
+            name: {"mtime_ns": files[name][0], "size": files[name][1], "hash": hashes[name]}
+            for name in hashes
+        }})
+        return bundles
+
+    def get_plugin(self, name):
+        """Return the current Plugin for name, reading it only if its hash moved"""
+        plugin = self.plugins.get(name)
+        if plugin is None or plugin.hash != self.hashes.get(name):
+            plugin = self.read_plugin(name, os.path.join(self.plugin_dir, name))
+        return plugin
+
+    def rebuild(self, disabled=()):
+        """Rebuild after files changed; returns (bundles, changed names, removed names)"""
+        previous = dict(self.hashes)
+        bundles = self.build(disabled)
+        changed = [name for name, digest in self.hashes.items() if previous.get(name) != digest]
+        removed = [name for name in previous if name not in self.hashes]
+        return bundles, changed, removed
+
+    def prune(self, keep):
+        """Remove bundles built for older plugin contents"""
+        for path in glob.glob(os.path.join(self.cache_dir, "bundle-*.json")):
+            if path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import argparse
+from collections import deque
+
+import logsink
+from telemetry import read_records, percentile, format_ms
+
+# performance.measure() names written by the plugin wrapper (see plugin_bundle.wrap_plugin)
+MEASURE_PREFIX = "zerkalo-plugin:"
+
+def plugin_costs(record):
+    """{plugin: {"ms": run time, "long_task_ms": overlap with long tasks}} for one navigation"""
+    costs = {}
+    long_tasks = record.get("longTasks") or []
+    for timing in record.get("pluginTimings") or []:
+        name = timing["name"][len(MEASURE_PREFIX):]
+        start = timing["start"]
+        end = start + timing["duration"]
+        # Long tasks carry no script attribution, charge each plugin for the time it ran inside one
+        overlap = sum(
+            max(0.0, min(end, task["start"] + task["duration"]) - max(start, task["start"]))
+            for task in long_tasks
+        )
+        cost = costs.setdefault(name, {"ms": 0.0, "long_task_ms": 0.0})
+        cost["ms"] += timing["duration"]
+        cost["long_task_ms"] += overlap
+    return costs
+
+class PluginBudget:
+    """Tracks per-navigation plugin cost and disables plugins that keep going over budget.
+
+    A plugin is disabled when it exceeded budget_ms in `strikes` of its last
+    `window` navigations; the disabled set is kept in a JSON file.
+    """
+    def __init__(self, path, budget_ms=50, strikes=5, window=10):
+        self.path = path
+        self.budget_ms = budget_ms
+        self.strikes = strikes
+        self.window = window
+        self.history = {}  # plugin -> deque of over-budget flags
+        self.disabled = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return set(json.load(f).get("disabled", []))
+        except (OSError, ValueError):
+            return set()
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"disabled": sorted(self.disabled)}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def observe(self, record):
+        """Account one navigation; returns the plugins that have just been disabled"""
+        newly_disabled = []
+        for name, cost in plugin_costs(record).items():
+            if name in self.disabled:
+                continue
+            history = self.history.setdefault(name, deque(maxlen=self.window))
+            over = cost["ms"] > self.budget_ms
+            history.append(over)
+            if over:
+                logsink.debug("plugins", f"! Plugin {name} took {cost['ms']:.0f} ms "
+                                         f"({cost['long_task_ms']:.0f} ms in long tasks) on {record.get('url')}")
+            if sum(history) >= self.strikes:
+                self.disabled.add(name)
+                newly_disabled.append(name)
+                logsink.warning("plugins", f"✗ Disabled plugin {name}: over the {self.budget_ms} ms budget "
+                                           f"on {sum(history)} of the last {len(history)} pages")
+        if newly_disabled:
+            self.save()
+        return newly_disabled
+
+def summarize(records):
+    """[(plugin, navigations, total ms, p50 ms, p95 ms, long-task ms)] ranked by total cost"""
+    samples = {}
+    for record in records:
+        for name, cost in plugin_costs(record).items():
+            entry = samples.setdefault(name, {"ms": [], "long_task_ms": 0.0})
+            entry["ms"].append(cost["ms"])
+            entry["long_task_ms"] += cost["long_task_ms"]
+    rows = [
+        (name, len(entry["ms"]), sum(entry["ms"]), percentile(entry["ms"], 0.5),
+         percentile(entry["ms"], 0.95), entry["long_task_ms"])
+        for name, entry in samples.items()
+    ]
+    return sorted(rows, key=lambda row: -row[2])
+
+def activation(records):
+    """(pages, average plugins run, average plugins skipped) by @match/@exclude scope"""
+    counts = [(len(record.get("plugins") or []), len(record["pluginsSkipped"]))
+              for record in records if "pluginsSkipped" in record]
+    if not counts:
+        return 0, None, None
+    return (len(counts), sum(run for run, _ in counts) / len(counts),
+            sum(skipped for _, skipped in counts) / len(counts))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank plugins by the main-thread time they cost per page")
+    parser.add_argument("--file", default=os.path.join("browser_data", "telemetry", "navigations.jsonl"),
+                        help="telemetry JSONL file (rotated backups are read too)")
+    parser.add_argument("--by", choices=("total", "p95"), default="total", help="ranking order")
+    parser.add_argument("--disabled", default=os.path.join("browser_data", "plugins_disabled.json"),
+                        help="file with the plugins disabled for going over budget")
+    args = parser.parse_args(argv)
+
+    records = list(read_records(args.file))
+    rows = summarize(records)
+    if not rows:
+        print(f"! No plugin timings in {args.file}")
+        return 1
+    if args.by == "p95":
+        rows.sort(key=lambda row: -(row[4] or 0))
+    disabled = PluginBudget(args.disabled).disabled if os.path.exists(args.disabled) else set()
+
+    print(f"{'Plugin':<32} {'Pages':>6} {'Total':>10} {'p50':>9} {'p95':>9} {'Long tasks':>11}")
+    for name, count, total, p50, p95, long_task_ms in rows:
+        flag = "  (disabled)" if name in disabled else ""
+        print(f"{name:<32} {count:>6} {format_ms(total):>10} {format_ms(p50):>9} {format_ms(p95):>9} "
+              f"{format_ms(long_task_ms):>11}{flag}")
+    pages, run, skipped = activation(records)
+    if pages:
+        print(f"\nPlugins per page: {run:.1f} run, {skipped:.1f} skipped by URL scope ({pages} pages)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import os
+import html
+import urllib.parse
+from collections import Counter
+
+from telemetry import read_recent_records
+
+# Resource Timing initiator types that end up as static assets
+ASSET_INITIATORS = {"script", "link", "css", "img", "font"}
+
+def read_manifest(path):
+    """Critical asset URLs, one per line; blank lines and # comments ignored"""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def upstream_url(url, origins=None):
+    """Assets served from the store show up as zerkalo-asset:// URLs in Resource Timing.
+
+    origins maps "host:port" to the mirror's scheme (AssetSchemeHandler.origins);
+    unknown origins are https on port 443 and http otherwise.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != "zerkalo-asset":
+        return url
+    port = parts.port or 80
+    scheme = (origins or {}).get(f"{parts.hostname}:{port}") or ("https" if port == 443 else "http")
+    netloc = parts.hostname if port == {"http": 80, "https": 443}.get(scheme) else f"{parts.hostname}:{port}"
+    return urllib.parse.urlunsplit((scheme, netloc, parts.path, parts.query, ""))
+
+def learn_manifest(telemetry_path, navigations=20, limit=50, origins=None):
+    """Static assets most often fetched by the last navigations recorded in telemetry"""
+    counts = Counter()
+    for record in read_recent_records(telemetry_path, navigations):
+        seen = {upstream_url(r["name"], origins) for r in record.get("resources") or []
+                if r.get("type") in ASSET_INITIATORS}
+        counts.update(seen)
+    return [url for url, _ in counts.most_common(limit)]
+
+# <link rel="preload"> destination by file extension; anything else is preloaded as a fetch
+PRELOAD_DESTINATIONS = {
+    ".js": "script", ".mjs": "script", ".css": "style",
+    ".woff": "font", ".woff2": "font", ".ttf": "font", ".otf": "font",
+    ".png": "image", ".jpg": "image", ".jpeg": "image", ".gif": "image",
+    ".webp": "image", ".avif": "image", ".svg": "image", ".ico": "image",
+}
+
+# Evaluated in the pre-warm page once it has loaded: [url, transferSize] of every preload
+PREWARM_RESULT_SCRIPT = (
+    "JSON.stringify(performance.getEntriesByType('resource').map(function (e) { return [e.name, e.transferSize]; }))"
+)
+
+def preload_destination(url):
+    """as= value for preloading url"""
+    path = urllib.parse.urlsplit(url).path.lower()
+    return PRELOAD_DESTINATIONS.get(os.path.splitext(path)[1], "fetch")
+
+def prewarm_html(urls):
+    """Document whose preload links make Chromium fetch urls.
+
+    Loaded in a hidden page on the browser's profile, so the requests carry its
+    cookies and the responses land in its HTTP cache (and in the asset store,
+    when that serves the mirror). Fonts and fetches are requested in CORS mode,
+    as pages request them.
+    """
+    links = []
+    for url in dict.fromkeys(urls):
+        destination = preload_destination(url)
+        crossorigin = " crossorigin" if destination in ("font", "fetch") else ""
+        links.append(f'<link rel="preload" as="{destination}" href="{html.escape(url)}"{crossorigin}>')
+    return f"<!DOCTYPE html><html><head>{''.join(links)}</head><body></body></html>"
+
+def prewarm_summary(entries):
+    """Requested and fetched counts and bytes of the pre-warm page's resource entries.
+
+    A transferSize of 0 means the HTTP cache answered, or a cross-origin server
+    did not let the page read the size.
+    """
+    fetched = [size for _, size in entries if size]
+    return {"requested": len(entries), "fetched": len(fetched), "bytes": sum(fetched)}
@@ -0,0 +1,32 @@
+import os
+
+def rss_kb(pid):
+    """Resident set size of a process from /proc, in KB (None if unavailable)"""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+def total_rss_kb(pids):
+    """Summed RSS of distinct processes (tabs of one site can share a renderer)"""
+    return sum(rss_kb(pid) or 0 for pid in set(pids) if pid)
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process from /proc, in seconds (None if unavailable)"""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # The command name may contain spaces, fields are counted after its closing parenthesis
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, ValueError, IndexError):
+        return None
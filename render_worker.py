@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QUrl, Qt, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QApplication
+
+import logsink
+from bridge import builtin_bridge_handlers
+from settings import load_settings
+from plugin_bundle import PluginBundler
+from plugin_profile import PluginBudget
+
+# Longest a render slot waits for the loadFinished(False) of a load stopped on timeout
+RENDER_STOP_GRACE_MS = 2000
+
+def render_file_name(index, url):
+    """0007-host-path-slug, safe as a file name"""
+    parts = QUrl(url)
+    slug = "".join(c if c.isalnum() else "-" for c in f"{parts.host()}{parts.path()}").strip("-")
+    return f"{index:04d}-{slug[:80] or 'page'}"
+
+class RenderSlot:
+    """One page (and the offscreen view needed for screenshots) of the render pool"""
+    def __init__(self, page, view):
+        self.page = page
+        self.view = view
+        self.job = None
+        self.timer = None
+        self.generation = 0  # Counts jobs, so a stale grace timer can tell it is late
+        self.draining = False  # Waiting for the stopped load of a timed-out job to report
+
+class RenderWorker(QObject):
+    """Renders a list of URLs headlessly with a bounded pool of pages on the app's profile.
+    
+    For every URL it writes the HTML, a PDF or PNG capture and the timings; the
+    summary with pages per second goes to render.json in the output directory.
+    """
+    finished = pyqtSignal()
+    
+    def __init__(self, urls, output_dir, pool_size=4, capture="pdf", timeout=30):
+        super().__init__()
+        self.queue = list(enumerate(urls))
+        self.total = len(urls)
+        self.output_dir = output_dir
+        self.pool_size = max(1, min(pool_size, len(urls)))
+        self.capture = capture
+        self.timeout = timeout
+        self.results = []
+        self.cache_dir = os.path.join(os.getcwd(), "browser_data")
+        os.makedirs(output_dir, exist_ok=True)
+    
+    def start(self):
+        from webpage import (
+            WebEnginePage, create_profile, create_view, install_bundle_scripts, create_bridge_script, attach_bridge
+        )
+        settings = load_settings()
+        # Same profile as the browser: cookies, cache and plugins carry over
+        self.profile = create_profile(self.cache_dir, self)
+        # Plugins the browser disabled for going over budget stay off here too
+        disabled = set()
+        if settings["plugin_budget_enabled"]:
+            disabled = PluginBudget(
+                os.path.join(self.cache_dir, "plugins_disabled.json"),
+                settings["plugin_budget_ms"],
+                settings["plugin_budget_strikes"],
+                settings["plugin_budget_window"],
+            ).disabled
+        bundler = PluginBundler(os.path.join(os.getcwd(), "plugins"), os.path.join(self.cache_dir, "plugin_cache"))
+        install_bundle_scripts(self.profile, bundler.build(disabled))
+        # Plugins calling zerkalo get the same bridge as in the browser
+        self.bridge_handlers = builtin_bridge_handlers()
+        self.bridge_executor = ThreadPoolExecutor(max_workers=settings["bridge_workers"], thread_name_prefix="bridge")
+        self.profile.scripts().insert(create_bridge_script(settings["bridge_world"]))
+        
+        self.slots = []
+        for _ in range(self.pool_size):
+            page = WebEnginePage(self.profile, self)
+            attach_bridge(page, self.bridge_handlers, self.bridge_executor, settings["bridge_world"])
+            view = create_view(page)
+            view.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen)
+            view.resize(1280, 720)
+            view.show()
+            slot = RenderSlot(page, view)
+            page.loadFinished.connect(lambda ok, slot=slot: self.on_loaded(slot, ok))
+            page.pdfPrintingFinished.connect(lambda path, ok, slot=slot: self.on_pdf_printed(slot, ok))
+            slot.timer = QTimer(self)
+            slot.timer.setSingleShot(True)
+            slot.timer.timeout.connect(lambda slot=slot: self.finish(slot, False, "timeout"))
+            self.slots.append(slot)
+        
+        logsink.info("render", f"→ Rendering {self.total} pages with {self.pool_size} pages in parallel")
+        self.started = time.perf_counter()
+        for slot in self.slots:
+            self.next_job(slot)
+    
+    def next_job(self, slot):
+        if not self.queue:
+            slot.job = None
+            if all(s.job is None and not s.draining for s in self.slots):
+                self.write_summary()
+                self.finished.emit()
+            return
+        index, url = self.queue.pop(0)
+        slot.generation += 1
+        slot.job = {
+            "index": index,
+            "url": url,
+            "name": render_file_name(index, url),
+            "started": time.perf_counter(),
+        }
+        slot.timer.start(self.timeout * 1000)
+        slot.page.load(QUrl(url))
+    
+    def elapsed_ms(self, slot):
+        return (time.perf_counter() - slot.job["started"]) * 1000
+    
+    def on_loaded(self, slot, ok):
+        if slot.draining:
+            # The stopped load of the timed-out job, the slot is free now
+            slot.draining = False
+            QTimer.singleShot(0, lambda: self.next_job(slot))
+            return
+        if slot.job is None or "load_ms" in slot.job:
+            return  # Late signal of a finished or timed-out job
+        slot.job["load_ms"] = self.elapsed_ms(slot)
+        if not ok:
+            self.finish(slot, False, "load failed")
+            return
+        job = slot.job
+        slot.page.toHtml(lambda html: self.on_html(slot, job, html))
+    
+    def on_html(self, slot, job, html):
+        if slot.job is not job:
+            return
+        path = os.path.join(self.output_dir, f"{job['name']}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        job["html_ms"] = self.elapsed_ms(slot)
+        job["html_bytes"] = len(html.encode("utf-8"))
+        
+        if self.capture == "pdf":
+            job["printing"] = True
+            slot.page.printToPdf(os.path.join(self.output_dir, f"{job['name']}.pdf"))
+        elif self.capture == "png":
+            slot.view.grab().save(os.path.join(self.output_dir, f"{job['name']}.png"))
+            self.finish(slot, True)
+        else:
+            self.finish(slot, True)
+    
+    def on_pdf_printed(self, slot, ok):
+        if slot.job is not None and slot.job.get("printing"):
+            self.finish(slot, ok, None if ok else "pdf failed")
+    
+    def finish(self, slot, ok, error=None):
+        job = slot.job
+        if job is None:
+            return
+        slot.timer.stop()
+        result = {
+            "url": job["url"],
+            "name": job["name"],
+            "ok": ok,
+            "error": error,
+            "load_ms": job.get("load_ms"),
+            "html_ms": job.get("html_ms"),
+            "total_ms": self.elapsed_ms(slot),
+            "html_bytes": job.get("html_bytes"),
+        }
+        self.results.append(result)
+        mark = "✓" if ok else "✗"
+        logsink.info("render", f"{mark} [{len(self.results)}/{self.total}] {job['url']} "
+                               f"({result['total_ms']:.0f} ms{', ' + error if error else ''})")
+        slot.job = None
+        if error == "timeout" and "load_ms" not in job:
+            # Stopping still ends in loadFinished(False), which must not complete the next job
+            slot.draining = True
+            slot.page.triggerAction(slot.page.WebAction.Stop)
+            generation = slot.generation
+            QTimer.singleShot(RENDER_STOP_GRACE_MS, lambda: self.end_draining(slot, generation))
+            return
+        # Next job on the next event-loop turn, so late signals of this one are dropped
+        QTimer.singleShot(0, lambda: self.next_job(slot))
+    
+    def end_draining(self, slot, generation):
+        """Reuse the slot even if its stopped load never reported back"""
+        if slot.draining and slot.generation == generation:
+            slot.draining = False
+            self.next_job(slot)
+    
+    def write_summary(self):
+        elapsed = time.perf_counter() - self.started
+        done = [result for result in self.results if result["ok"]]
+        summary = {
+            "pages": self.total,
+            "ok": len(done),
+            "failed": self.total - len(done),
+            "pool_size": self.pool_size,
+            "capture": self.capture,
+            "elapsed_s": elapsed,
+            "pages_per_s": len(done) / elapsed if elapsed else 0.0,
+            "results": sorted(self.results, key=lambda result: result["name"]),
+        }
+        with open(os.path.join(self.output_dir, "render.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        self.bridge_executor.shutdown(wait=False, cancel_futures=True)
+        logsink.info("render", f"✓ Rendered {len(done)}/{self.total} pages in {elapsed:.1f} s "
+                               f"({summary['pages_per_s']:.2f} pages/s, pool of {self.pool_size})")
+
+def read_url_list(path):
+    """URLs one per line, blank lines and # comments ignored"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def run_render_worker(args, qt_args):
+    """Headless batch rendering: no window, exits when every URL is done"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    urls = list(args.render or [])
+    if args.render_list:
+        urls += read_url_list(args.render_list)
+    if not urls:
+        print("✗ No URLs to render")
+        return 1
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication([sys.argv[0]] + qt_args)
+    worker = RenderWorker(urls, args.render_output, args.render_pool, args.render_capture, args.render_timeout)
+    worker.finished.connect(app.quit)
+    QTimer.singleShot(0, worker.start)
+    app.exec()
+    return 0 if all(result["ok"] for result in worker.results) else 2
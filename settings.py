@@ -0,0 +1,101 @@
+import os
+import json
+
+import logsink
+
+# Defaults for every tunable; settings.json next to zerkalo.txt overrides any of them
+DEFAULTS = {
+    # Offline asset store for the mirror's static files. Copies follow the mirror's
+    # Cache-Control/Expires and are revalidated with ETag/Last-Modified; responses without
+    # explicit freshness stay fresh for a tenth of their age, at most asset_store_max_age_hours.
+    # Opt-in: Chromium's HTTP cache already keeps these files by the same rules (and pre-warm fills it),
+    # while the store fetches its misses outside Chromium's network stack and moves assets to zerkalo-asset://
+    "asset_store_enabled": False,
+    "asset_store_budget_mb": 200,
+    "asset_store_max_age_hours": 24,
+    # Background pre-warming of the mirror's critical assets (prewarm.txt or learned from telemetry)
+    # through a hidden page on the profile: fills Chromium's HTTP cache, and the asset store when it is on
+    "prewarm_enabled": True,
+    "prewarm_learn_navigations": 20,
+    "prewarm_max_urls": 50,
+    # Tab lifecycle: background tabs are frozen, then discarded (restored on activation)
+    "tab_freeze_after_s": 60,
+    "tab_discard_after_s": 900,
+    "tab_memory_budget_mb": 1536,
+    "tab_policy_interval_s": 10,
+    # Snapshots of recently visited pages, shown (marked stale) while the live page loads
+    "snapshot_enabled": True,
+    "snapshot_max_entries": 50,
+    "snapshot_max_mb": 50,
+    # Spare pages kept ready for new tabs (0 disables), refilled after this much idle time
+    "page_pool_size": 1,
+    "page_pool_refill_delay_ms": 2000,
+    # Renderer watchdog: background pages are frozen/discarded, the current one reloaded/recreated
+    "watchdog_enabled": True,
+    "watchdog_interval_s": 5,
+    "watchdog_freeze_mb": 800,
+    "watchdog_reload_mb": 1200,
+    "watchdog_recreate_mb": 1600,
+    "watchdog_cpu_percent": 90,
+    "watchdog_cpu_samples": 6,
+    "watchdog_cooldown_s": 60,
+    # Predictive prefetching: the likely next pages (learned from navigation history) are prefetched
+    # above prefetch_min_probability, their hosts preconnected above preconnect_min_probability
+    "prefetch_enabled": True,
+    "prefetch_max_per_page": 2,
+    "prefetch_budget_kb_per_min": 1024,
+    "prefetch_min_probability": 0.3,
+    "preconnect_min_probability": 0.1,
+    # Lite data mode (toggled with Ctrl+Shift+D): request categories kept off the network
+    # (image, media, font, third-party-script, prefetch) and resources seen to be larger than this
+    "lite_mode_enabled": False,
+    "lite_block": ["image", "media", "font", "third-party-script", "prefetch"],
+    "lite_max_resource_kb": 200,
+    # Plugin time budget: a plugin over plugin_budget_ms on `strikes` of its last `window` pages is disabled
+    # (listed in browser_data/plugins_disabled.json, remove it there to enable it again)
+    "plugin_budget_enabled": True,
+    "plugin_budget_ms": 50,
+    "plugin_budget_strikes": 5,
+    "plugin_budget_window": 10,
+    # Plugin bridge (zerkalo.call): JavaScript world it is exposed in, threads for heavy handlers.
+    # Only plugins that declare that world (// @world user) can call it, the rest run in "main";
+    # "main" here would hand it to the page's own scripts
+    "bridge_world": "user",
+    "bridge_workers": 2,
+    # DNS: resolver for QtWebEngine ("" = system resolver). At startup a hidden page has Chromium
+    # resolve (and with dns_warmup_connect preconnect to) the mirrors and frequently used hosts.
+    # dns_pin_hosts resolves them with the OS resolver instead and pins the addresses through
+    # --host-resolver-rules, bypassing dns_server for them; only lookups done before WebEngine starts count
+    "dns_server": "8.8.8.8",
+    "dns_warmup_enabled": True,
+    "dns_warmup_hosts": 10,
+    "dns_warmup_connect": True,
+    "dns_pin_hosts": False,
+    # Log sink: levels are debug/info/warning/error, rate limits apply per source
+    "log_file_level": "debug",
+    "log_echo_level": "info",
+    "log_rate_per_s": 20,
+    "log_burst": 100,
+    "log_ring_size": 5000,
+    "log_max_mb": 5,
+    "log_backups": 3,
+}
+
+def load_settings(path="settings.json"):
+    """Return DEFAULTS updated with the values from path (if it exists)"""
+    settings = dict(DEFAULTS)
+    if not os.path.exists(path):
+        return settings
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+    except (OSError, ValueError) as e:
+        logsink.error("settings", f"✗ Error reading {path}: {str(e)}")
+        return settings
+
+    for key, value in overrides.items():
+        if key not in DEFAULTS:
+            logsink.warning("settings", f"! Unknown setting in {path}: {key}")
+            continue
+        settings[key] = value
+    return settings
@@ -0,0 +1,83 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+
+from launch_protocol import ACK, encode_launch, decode_launch, is_ack
+
+CONNECT_TIMEOUT_MS = 300
+
+def forward_launch(name, message, timeout_ms=CONNECT_TIMEOUT_MS):
+    """Hand this launch to the running instance; False when there is none.
+
+    Uses the blocking QLocalSocket calls so it works before (and without) a
+    QApplication, which keeps a forwarded launch short.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(timeout_ms):
+        return False
+    socket.write(encode_launch(message))
+    socket.flush()
+    # Wait for the acknowledgement so a server that is shutting down does not swallow the URL
+    acknowledged = socket.waitForReadyRead(timeout_ms) and is_ack(bytes(socket.readAll()))
+    socket.disconnectFromServer()
+    return acknowledged
+
+def instance_running(name, timeout_ms=CONNECT_TIMEOUT_MS):
+    """True when an instance accepts connections on name"""
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(timeout_ms):
+        return False
+    socket.disconnectFromServer()
+    return True
+
+class InstanceServer(QObject):
+    """Accepts launches forwarded by later app.py processes and emits them as dicts"""
+    launch_received = pyqtSignal(dict)
+
+    def __init__(self, name, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.received = 0
+        self.taken = False  # Another instance answered on the name, so it was left alone
+
+    def listen(self):
+        """Call after forward_launch() failed, i.e. no live instance answers on the name"""
+        if self.server.listen(self.name):
+            return True
+        # Another instance may have started since forward_launch(); only a dead one's name is taken over
+        if instance_running(self.name):
+            self.taken = True
+            return False
+        # A crashed instance leaves its socket file behind (Unix), take the name over
+        QLocalServer.removeServer(self.name)
+        return self.server.listen(self.name)
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            buffer = bytearray()
+
+            def on_ready_read(socket=socket, buffer=buffer):
+                buffer.extend(bytes(socket.readAll()))
+                try:
+                    message = decode_launch(buffer)
+                except ValueError:
+                    socket.abort()
+                    return
+                if message is None:
+                    return
+                socket.write(ACK)
+                socket.flush()
+                socket.disconnectFromServer()
+                self.received += 1
+                self.launch_received.emit(message)
+
+            socket.readyRead.connect(on_ready_read)
+            socket.disconnected.connect(socket.deleteLater)
+
+    def close(self):
+        self.server.close()
@@ -0,0 +1,146 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+
+# setHtml() goes through a percent-encoded data: URL, Chromium refuses URLs longer than this
+MAX_DATA_URL_CHARS = 2 * 1024 * 1024
+DATA_URL_PREFIX = b"data:text/html;charset=UTF-8,"
+# Bytes QByteArray::toPercentEncoding() leaves alone, every other byte becomes %XX
+UNENCODED_BYTES = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+
+# Fragment of the snapshot page's URL; plugin bundles do not run on documents carrying it
+SNAPSHOT_FRAGMENT = "zerkalo-snapshot"
+
+SCRIPT_PATTERN = re.compile(r"<script\b[^>]*>.*?</script\s*>", re.IGNORECASE | re.DOTALL)
+REFRESH_PATTERN = re.compile(r"<meta\b[^>]*http-equiv\s*=\s*[\"']?refresh[^>]*>", re.IGNORECASE)
+
+def make_inert(html):
+    """Serialized DOM without scripts or refreshes, so showing it costs only layout and paint"""
+    return REFRESH_PATTERN.sub("", SCRIPT_PATTERN.sub("", html))
+
+def data_url_size(body):
+    """Length of the data: URL setHtml() builds for body (UTF-8 bytes)"""
+    encoded = len(body.translate(None, UNENCODED_BYTES))
+    return len(DATA_URL_PREFIX) + len(body) + 2 * encoded
+
+def stale_banner(captured_at, text="Сохранённая копия, обновляется"):
+    """Fixed badge that marks a snapshot as stale while the live page loads"""
+    minutes = max(0, int((time.time() - captured_at) / 60))
+    age = f"{minutes} мин" if minutes < 120 else f"{minutes // 60} ч"
+    return (
+        '<div style="position:fixed;top:8px;right:8px;z-index:2147483647;padding:4px 10px;'
+        'background:rgba(32,33,36,.85);color:#fff;font:12px sans-serif;border-radius:12px;'
+        f'pointer-events:none">⟳ {text} ({age})</div>'
+    )
+
+class SnapshotCache:
+    """zlib-compressed DOM snapshots of recently visited URLs in SQLite, bounded by LRU"""
+    def __init__(self, path, max_entries=50, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS snapshots (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                scroll_x INTEGER NOT NULL DEFAULT 0,
+                scroll_y INTEGER NOT NULL DEFAULT 0,
+                captured REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS snapshots_accessed ON snapshots (accessed)")
+        self.db.commit()
+        # In-memory index of the stored URLs, so a miss costs no query on the GUI thread
+        self.urls = {row[0] for row in self.db.execute("SELECT url FROM snapshots")}
+
+    def put(self, url, html):
+        """Store the inert, compressed DOM of url (safe to call from a worker thread)"""
+        inert = make_inert(html).encode("utf-8")
+        # The banner is appended when the snapshot is shown
+        if data_url_size(inert + stale_banner(time.time()).encode("utf-8")) > MAX_DATA_URL_CHARS:
+            return False
+        body = zlib.compress(inert, 6)
+        now = time.time()
+        with self.lock:
+            # A fresh capture keeps the scroll position remembered for the URL
+            self.db.execute("""
+                INSERT INTO snapshots (url, body, size, captured, accessed) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET body = excluded.body, size = excluded.size,
+                    captured = excluded.captured, accessed = excluded.accessed
+            """, (url, body, len(body), now, now))
+            self.urls.add(url)
+            self.evict()
+            self.db.commit()
+        return True
+
+    def cached(self, url):
+        """Whether url has a snapshot (index lookup only, counts a miss when it has none)"""
+        with self.lock:
+            if url in self.urls:
+                return True
+            self.misses += 1
+            return False
+
+    def get(self, url):
+        """Return (html, (scroll_x, scroll_y), captured) or None"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body, scroll_x, scroll_y, captured FROM snapshots WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE snapshots SET accessed = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+            self.hits += 1
+        try:
+            html = zlib.decompress(row[0]).decode("utf-8")
+        except (zlib.error, UnicodeDecodeError):
+            return None
+        return html, (row[1], row[2]), row[3]
+
+    def set_scroll(self, url, scroll_x, scroll_y):
+        with self.lock:
+            self.db.execute("UPDATE snapshots SET scroll_x = ?, scroll_y = ? WHERE url = ?",
+                            (int(scroll_x), int(scroll_y), url))
+            self.db.commit()
+
+    def evict(self):
+        """Drop least recently used snapshots over the entry count or size budget"""
+        count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM snapshots").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            row = self.db.execute("SELECT url, size FROM snapshots ORDER BY accessed LIMIT 1").fetchone()
+            if row is None:
+                break
+            self.db.execute("DELETE FROM snapshots WHERE url = ?", (row[0],))
+            self.urls.discard(row[0])
+            count -= 1
+            total -= row[1]
+
+    def stats(self):
+        with self.lock:
+            count, total = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM snapshots").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+    def close(self):
+        with self.lock:
+            self.db.close()
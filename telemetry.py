@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import time
+import glob
+import math
+import argparse
+
+import logsink
+
+# Installed at document creation so long tasks and LCP are observed from the start
+OBSERVER_SCRIPT = """
+(function () {
+    if (window.__zerkaloPerf) return;
+    var perf = window.__zerkaloPerf = {longTasks: [], lcp: 0};
+    try {
+        new PerformanceObserver(function (list) {
+            list.getEntries().forEach(function (entry) {
+                perf.longTasks.push({start: entry.startTime, duration: entry.duration, name: entry.name});
+            });
+        }).observe({type: "longtask", buffered: true});
+        new PerformanceObserver(function (list) {
+            var entries = list.getEntries();
+            perf.lcp = entries[entries.length - 1].startTime;
+        }).observe({type: "largest-contentful-paint", buffered: true});
+    } catch (e) {}
+})();
+"""
+
+# Evaluated after loadFinished, returns the record as a JSON string
+COLLECT_SCRIPT = """
+(function () {
+    var perf = window.__zerkaloPerf || {longTasks: [], lcp: 0};
+    var nav = performance.getEntriesByType("navigation")[0];
+    return JSON.stringify({
+        navigation: nav ? nav.toJSON() : null,
+        paint: performance.getEntriesByType("paint").map(function (e) {
+            return {name: e.name, start: e.startTime};
+        }),
+        lcp: perf.lcp,
+        longTasks: perf.longTasks,
+        pluginTimings: performance.getEntriesByType("measure").filter(function (e) {
+            return e.name.indexOf("zerkalo-plugin:") === 0;
+        }).map(function (e) {
+            return {name: e.name, start: e.startTime, duration: e.duration};
+        }),
+        resources: performance.getEntriesByType("resource").map(function (e) {
+            return {
+                name: e.name,
+                type: e.initiatorType,
+                start: e.startTime,
+                duration: e.duration,
+                ttfb: e.responseStart > 0 ? e.responseStart - e.startTime : null,
+                dns: e.domainLookupEnd - e.domainLookupStart,
+                dnsStart: e.domainLookupStart,
+                connect: e.connectEnd - e.connectStart,
+                transferSize: e.transferSize,
+                bodySize: e.encodedBodySize
+            };
+        })
+    });
+})();
+"""
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+
+class TelemetryWriter:
+    """Appends navigation records to a size-rotated JSONL file"""
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, backups=DEFAULT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                self.rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            logsink.error("telemetry", f"✗ Could not write telemetry: {str(e)}")
+
+def make_record(url, mirror, plugins, collected):
+    """Tag the collected timings with the page, mirror and active plugins"""
+    record = {"ts": time.time(), "url": url, "mirror": mirror, "plugins": sorted(plugins)}
+    record.update(json.loads(collected))
+    return record
+
+def backup_paths(path):
+    """Rotated backups of the JSONL file, newest first"""
+    backups = []
+    for file_path in glob.glob(glob.escape(path) + ".*"):
+        suffix = file_path.rsplit(".", 1)[1]
+        if suffix.isdigit():
+            backups.append((int(suffix), file_path))
+    return [p for _, p in sorted(backups)]
+
+def read_records(path):
+    """Yield records from the JSONL file and its rotated backups, oldest first"""
+    for file_path in backup_paths(path)[::-1] + [path]:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def tail_lines(file_path, count, block=64 * 1024):
+    """Last count lines of a file, read backwards from its end in blocks"""
+    with open(file_path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        data = b""
+        while end > 0 and data.count(b"\n") <= count:
+            start = max(0, end - block)
+            f.seek(start)
+            data = f.read(end - start) + data
+            end = start
+    lines = data.splitlines()
+    if end > 0:
+        lines = lines[1:]  # Starts inside a line
+    return lines[-count:] if count > 0 else []
+
+def read_recent_records(path, count):
+    """The last count records, oldest first; only the end of the newest file(s) is read and parsed"""
+    records = []
+    for file_path in [path] + backup_paths(path):
+        if len(records) >= count:
+            break
+        if not os.path.exists(file_path):
+            continue
+        older = []
+        for line in tail_lines(file_path, count - len(records)):
+            try:
+                older.append(json.loads(line))
+            except ValueError:
+                continue
+        records = older + records
+    return records
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+def navigation_metrics(record):
+    """DNS, connect, TTFB, DOMContentLoaded and load in ms (the last three relative to navigation start)"""
+    nav = record.get("navigation") or {}
+    metrics = {}
+    if nav.get("domainLookupEnd"):
+        metrics["dns"] = nav["domainLookupEnd"] - nav["domainLookupStart"]
+    if nav.get("connectEnd"):
+        metrics["connect"] = nav["connectEnd"] - nav["connectStart"]
+    if nav.get("responseStart"):
+        metrics["ttfb"] = nav["responseStart"]
+    if nav.get("domContentLoadedEventEnd"):
+        metrics["dcl"] = nav["domContentLoadedEventEnd"]
+    if nav.get("loadEventEnd"):
+        metrics["load"] = nav["loadEventEnd"]
+    return metrics
+
+def lookup_ms(record, until):
+    """Time before `until` during which at least one DNS lookup of the page was running.
+
+    Lookups run in parallel, so their intervals are merged instead of added up;
+    records from before dnsStart was collected only count the document's lookup.
+    """
+    nav = record.get("navigation") or {}
+    intervals = []
+    if nav.get("domainLookupEnd"):
+        intervals.append((nav["domainLookupStart"], nav["domainLookupEnd"]))
+    for resource in record.get("resources") or []:
+        if resource.get("dnsStart") is not None and resource.get("dns"):
+            intervals.append((resource["dnsStart"], resource["dnsStart"] + resource["dns"]))
+    total = 0.0
+    covered = 0.0  # End of the merged intervals so far
+    for start, end in sorted(intervals):
+        start, end = max(start, covered), min(end, until)
+        if end > start:
+            total += end - start
+            covered = end
+    return total
+
+def summarize(records, group_by=None, top=10):
+    """Return {group: {"count", metric: (p50, p95)}, "_resources": [...]} for the records"""
+    groups = {}
+    resources = {}
+    for record in records:
+        if group_by == "mirror":
+            key = record.get("mirror") or "-"
+        elif group_by == "plugins":
+            key = ",".join(record.get("plugins") or []) or "(none)"
+        else:
+            key = "all"
+        group = groups.setdefault(key, {"count": 0, "dns": [], "connect": [], "ttfb": [], "dcl": [], "load": [],
+                                        "dns_share": []})
+        group["count"] += 1
+        metrics = navigation_metrics(record)
+        for name, value in metrics.items():
+            group[name].append(value)
+        if metrics.get("load"):
+            # Share of the time to load spent waiting on at least one lookup
+            group["dns_share"].append(lookup_ms(record, metrics["load"]) / metrics["load"] * 100)
+        for resource in record.get("resources") or []:
+            entry = resources.setdefault(resource["name"], [])
+            entry.append(resource.get("transferSize") or resource.get("bodySize") or 0)
+
+    summary = {}
+    for key, group in groups.items():
+        summary[key] = {"count": group["count"]}
+        for name in ("dns", "connect", "ttfb", "dcl", "load", "dns_share"):
+            summary[key][name] = (percentile(group[name], 0.5), percentile(group[name], 0.95))
+    largest = sorted(
+        ((name, percentile(sizes, 0.5), percentile(sizes, 0.95)) for name, sizes in resources.items()),
+        key=lambda item: -(item[2] or 0)
+    )
+    summary["_resources"] = largest[:top]
+    return summary
+
+def format_ms(value):
+    return "-" if value is None else f"{value:.0f} ms"
+
+def format_bytes(value):
+    if value is None:
+        return "-"
+    if value >= 1024 * 1024:
+        return f"{value / 1024 / 1024:.1f} MB"
+    return f"{value / 1024:.1f} KB"
+
+def print_summary(summary):
+    for key, group in summary.items():
+        if key.startswith("_"):
+            continue
+        print(f"{key} ({group['count']} pages)")
+        for name, label in (("dns", "DNS"), ("connect", "Connect"), ("ttfb", "TTFB"),
+                            ("dcl", "DOMContentLoaded"), ("load", "Load")):
+            p50, p95 = group[name]
+            print(f"  {label:<18} p50 {format_ms(p50):>9}   p95 {format_ms(p95):>9}")
+        p50, p95 = group["dns_share"]
+        if p50 is not None:
+            print(f"  {'DNS share of load':<18} p50 {p50:>7.1f} %   p95 {p95:>7.1f} %")
+    if summary["_resources"]:
+        print("Largest resources (p50 / p95 transfer size)")
+        for name, p50, p95 in summary["_resources"]:
+            print(f"  {format_bytes(p50):>9} / {format_bytes(p95):>9}  {name}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarise per-navigation performance telemetry")
+    parser.add_argument("--file", default=os.path.join("browser_data", "telemetry", "navigations.jsonl"),
+                        help="telemetry JSONL file (rotated backups are read too)")
+    parser.add_argument("--by", choices=("mirror", "plugins"), help="group results by mirror or plugin set")
+    parser.add_argument("--top", type=int, default=10, help="number of largest resources to list")
+    args = parser.parse_args(argv)
+
+    records = list(read_records(args.file))
+    if not records:
+        print(f"! No telemetry in {args.file}")
+        return 1
+    print_summary(summarize(records, args.by, args.top))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import os
+import sys
+import time
+
+import pytest
+
+# The app is a set of flat top-level modules next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def fixture_server(tmp_path):
+    """Local HTTP server for the files in tmp_path (the benchmark's fixture server)"""
+    from benchmark import FixtureServer
+    server = FixtureServer(str(tmp_path)).start()
+    yield server
+    server.stop()
+
+@pytest.fixture(scope="session")
+def qapp():
+    """QApplication for tests that need Qt (skipped when PyQt6 is not installed)"""
+    pytest.importorskip("PyQt6.QtWidgets")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    if sys.platform.startswith("linux"):
+        os.environ["QTWEBENGINE_DISABLE_SANDBOX"] = "1"
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance()
+    if app is None:
+        QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+        app = QApplication([sys.argv[0]])
+    return app
+
+@pytest.fixture
+def wait(qapp):
+    """wait(predicate, timeout_s) spins the Qt event loop until predicate() is true"""
+    def wait_until(predicate, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                return False
+            qapp.processEvents()
+            time.sleep(0.005)
+        return True
+    return wait_until
@@ -0,0 +1,132 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from android_plugins import PluginInjector, ScopedBundle, load_android_bundle
+from plugin_bundle import Plugin, build_bundles
+
+def plugin(name, match=None, run_at="document-start", body=None):
+    header = ["// ==UserScript==", f"// @run-at {run_at}"]
+    if match:
+        header.append(f"// @match {match}")
+    header.append("// ==/UserScript==")
+    body = body or f"window.__ran = (window.__ran || []).concat([{json.dumps(name)}]);"
+    return Plugin(name, "\n".join(header) + "\n" + body + "\n")
+
+@pytest.fixture
+def bundle():
+    return ScopedBundle(build_bundles([
+        plugin("everywhere.js"),
+        plugin("questions.js", match="https://otvet.test/question/*"),
+        plugin("profile.js", match="https://otvet.test/profile/*", run_at="document-end"),
+    ]))
+
+class FakeWebView:
+    """evaluateJavascript stand-in: records sources, answers callbacks when told to"""
+    def __init__(self):
+        self.calls = []
+
+    def evaluate(self, source, callback):
+        self.calls.append((source, callback))
+
+    def answer(self, href):
+        source, callback = self.calls[-1]
+        callback(json.dumps(href))
+
+def test_scoped_bundle_selects_and_caches_per_selection(bundle):
+    question = bundle.source_for("https://otvet.test/question/1")
+    assert "everywhere.js" in question and "questions.js" in question and "profile.js" not in question
+    assert bundle.source_for("https://otvet.test/question/2") is question
+    profile = bundle.source_for("https://otvet.test/profile/7")
+    assert "profile.js" in profile and "questions.js" not in profile
+    assert len(bundle.sources) == 2
+
+def test_scoped_bundle_without_matching_plugins():
+    bundle = ScopedBundle(build_bundles([plugin("questions.js", match="https://otvet.test/question/*")]))
+    assert bundle.source_for("https://other.test/") is None
+
+def test_injector_skips_page_finished_once_the_early_injection_landed(bundle):
+    view = FakeWebView()
+    injector = PluginInjector(bundle, view.evaluate)
+    url = "https://otvet.test/question/1"
+    injector.page_started(url)
+    view.answer(url)
+    injector.page_finished(url)
+    assert injector.injections == 1
+
+def test_injector_retries_when_the_early_injection_hit_the_old_document(bundle):
+    view = FakeWebView()
+    injector = PluginInjector(bundle, view.evaluate)
+    injector.page_started("https://otvet.test/question/1")
+    view.answer("https://otvet.test/question/0")  # Previous document still live
+    injector.page_finished("https://otvet.test/question/1")
+    assert injector.injections == 2
+
+def test_injector_reselects_after_a_redirect(bundle):
+    view = FakeWebView()
+    injector = PluginInjector(bundle, view.evaluate)
+    injector.page_started("https://otvet.test/question/1")
+    view.answer("https://otvet.test/question/1")
+    injector.page_finished("https://otvet.test/profile/7")
+    assert injector.injections == 2
+    assert "profile.js" in view.calls[-1][0]
+
+def test_injector_ignores_late_results_of_an_older_navigation(bundle):
+    view = FakeWebView()
+    injector = PluginInjector(bundle, view.evaluate)
+    injector.page_started("https://otvet.test/question/1")
+    first = view.calls[-1][1]
+    injector.page_started("https://otvet.test/question/2")
+    first(json.dumps("https://otvet.test/question/1"))
+    assert not injector.landed
+
+def test_injector_sends_nothing_without_matching_plugins():
+    view = FakeWebView()
+    bundle = ScopedBundle(build_bundles([plugin("questions.js", match="https://otvet.test/question/*")]))
+    injector = PluginInjector(bundle, view.evaluate)
+    injector.page_started("https://other.test/")
+    injector.page_finished("https://other.test/")
+    assert view.calls == [] and injector.injections == 0
+
+def test_load_android_bundle(tmp_path):
+    plugin_dir = tmp_path / "plugins"
+    plugin_dir.mkdir()
+    assert load_android_bundle(str(plugin_dir), str(tmp_path / "cache")) is None
+    (plugin_dir / "a.js").write_text(plugin("a.js").source)
+    bundle = load_android_bundle(str(plugin_dir), str(tmp_path / "cache"))
+    assert "a.js" in bundle.source_for("https://otvet.test/")
+
+# Runs the single script twice in one document, the way onPageStarted and onPageFinished do
+NODE_HARNESS = """
+const vm = require("vm");
+const context = {
+    location: {href: "https://otvet.test/question/1"},
+    document: {readyState: "complete", addEventListener() {}},
+    performance: {mark() {}, measure() {}, clearMarks() {}},
+    console: console,
+    setTimeout: (fn) => fn(),
+};
+context.window = context;
+context.addEventListener = () => {};
+vm.createContext(context);
+const source = require("fs").readFileSync(0, "utf8");
+const results = [vm.runInContext(source, context), vm.runInContext(source, context)];
+console.log(JSON.stringify({results: results, ran: context.__ran, global: typeof context.helper}));
+"""
+
+def test_single_script_runs_plugins_once_and_reports_its_url():
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    bundle = ScopedBundle(build_bundles([
+        plugin("first.js", body="function helper() {}\nwindow.__ran = ['first.js'];"),
+        plugin("second.js", run_at="document-end", body="window.__ran.push('second.js');"),
+    ]))
+    source = bundle.source_for("https://otvet.test/question/1")
+    output = subprocess.run([node, "-e", NODE_HARNESS], input=source, capture_output=True, text=True, check=True)
+    report = json.loads(output.stdout)
+    assert report["results"] == ["https://otvet.test/question/1"] * 2
+    assert report["ran"] == ["first.js", "second.js"]
+    assert report["global"] == "function"
@@ -0,0 +1,86 @@
+import json
+from email.utils import formatdate
+
+import pytest
+
+from asset_store import AssetStore, freshness
+from prewarm import PREWARM_RESULT_SCRIPT, prewarm_html, prewarm_summary
+
+NOW = 1_700_000_000.0
+DAY = 24 * 3600
+
+def test_freshness_follows_cache_headers():
+    assert freshness({"cache-control": "public, max-age=600"}, NOW, DAY) == NOW + 600
+    assert freshness({"cache-control": "max-age=600", "age": "100"}, NOW, DAY) == NOW + 500
+    assert freshness({"cache-control": "no-store"}, NOW, DAY) is None
+    assert freshness({"cache-control": "no-cache, max-age=600"}, NOW, DAY) == NOW
+    assert freshness({"expires": formatdate(NOW + 60, usegmt=True), "date": formatdate(NOW, usegmt=True)},
+                     NOW, DAY) == pytest.approx(NOW + 60)
+    assert freshness({"expires": "0"}, NOW, DAY) == NOW
+    # A tenth of the age since Last-Modified, capped at max_age
+    assert freshness({"last-modified": formatdate(NOW - 1000, usegmt=True)}, NOW, DAY) == pytest.approx(NOW + 100)
+    assert freshness({"last-modified": formatdate(NOW - 100 * DAY, usegmt=True)}, NOW, DAY) == NOW + DAY
+    # No explicit freshness and no validator: revalidate every time
+    assert freshness({}, NOW, DAY) == NOW
+
+@pytest.fixture
+def store(tmp_path):
+    store = AssetStore(str(tmp_path / "assets"), 1024 * 1024)
+    yield store
+    store.close()
+
+def test_store_response_keeps_validators(store):
+    assert store.store_response("http://m/app.js", b"js", "text/javascript",
+                                {"cache-control": "max-age=600", "etag": '"v1"'})
+    assert store.get("http://m/app.js")[2]
+    assert store.validators("http://m/app.js") == {"If-None-Match": '"v1"'}
+    assert not store.store_response("http://m/private.js", b"js", "text/javascript", {"cache-control": "no-store"})
+    assert store.get("http://m/private.js", allow_stale=True) is None
+
+def test_refresh_after_not_modified(store):
+    store.store_response("http://m/app.css", b"css", "text/css",
+                         {"cache-control": "no-cache", "last-modified": "Tue, 01 Aug 2023 00:00:00 GMT"})
+    body, mime, fresh = store.get("http://m/app.css", allow_stale=True)
+    assert (body, fresh) == (b"css", False)
+    store.refresh("http://m/app.css", {"cache-control": "max-age=60"})
+    assert store.get("http://m/app.css")[2]
+    assert store.stats()["revalidated"] == 1
+
+def test_prewarm_html_preloads_each_url_once():
+    document = prewarm_html(["http://m/app.js", "http://m/font.woff2?v=1", "http://m/app.js", "http://m/api?a=1&b=2"])
+    assert document.count("<link") == 3
+    assert '<link rel="preload" as="script" href="http://m/app.js">' in document
+    assert '<link rel="preload" as="font" href="http://m/font.woff2?v=1" crossorigin>' in document
+    assert '<link rel="preload" as="fetch" href="http://m/api?a=1&amp;b=2" crossorigin>' in document
+
+def test_prewarm_summary_counts_cache_hits_as_not_fetched():
+    entries = [["http://m/app.js", 2048], ["http://m/app.css", 0], ["http://m/logo.png", 512]]
+    assert prewarm_summary(entries) == {"requested": 3, "fetched": 2, "bytes": 2560}
+    assert prewarm_summary([]) == {"requested": 0, "fetched": 0, "bytes": 0}
+
+def test_prewarm_page_requests_every_asset(qapp, wait, tmp_path, fixture_server):
+    pytest.importorskip("PyQt6.QtWebEngineCore")
+    from PyQt6.QtCore import QUrl
+    from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+    (tmp_path / "app.js").write_text("var loaded = true;")
+    (tmp_path / "app.css").write_text("body { color: red }")
+    urls = [fixture_server.url + "app.js", fixture_server.url + "app.css"]
+    profile = QWebEngineProfile()
+    page = QWebEnginePage(profile)
+    loads = []
+    page.loadFinished.connect(loads.append)
+    page.setHtml(prewarm_html(urls), QUrl(fixture_server.url))
+    assert wait(lambda: loads)
+    result = []
+    page.runJavaScript(PREWARM_RESULT_SCRIPT, 0, result.append)
+    assert wait(lambda: result)
+    assert {name for name, _ in json.loads(result[0])} == set(urls)
+    page.deleteLater()
+    profile.deleteLater()
+
+def test_upstream_url_keeps_the_mirror_scheme():
+    from prewarm import upstream_url
+    assert upstream_url("zerkalo-asset://m.test:80/app.js?v=2") == "http://m.test/app.js?v=2"
+    assert upstream_url("zerkalo-asset://m.test:443/app.js") == "https://m.test/app.js"
+    assert upstream_url("zerkalo-asset://m.test:8443/app.js", {"m.test:8443": "https"}) == "https://m.test:8443/app.js"
+    assert upstream_url("https://other.test/app.js") == "https://other.test/app.js"
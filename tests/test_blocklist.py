@@ -0,0 +1,49 @@
+from blocklist import Blocklist, load_blocklist
+
+def build(*lines):
+    blocklist = Blocklist()
+    for line in lines:
+        blocklist.add_line(line)
+    blocklist.compile()
+    return blocklist
+
+def test_domain_and_pattern_rules():
+    blocklist = build("||ads.example.com^", "/banner/*.gif", "0.0.0.0 tracker.test")
+    assert blocklist.blocks("ads.example.com", "https://ads.example.com/x.js")
+    assert blocklist.blocks("cdn.ads.example.com", "https://cdn.ads.example.com/x.js")
+    assert blocklist.blocks("site.test", "https://site.test/banner/top.gif")
+    assert blocklist.blocks("tracker.test", "http://tracker.test/")
+    assert not blocklist.blocks("example.com", "https://example.com/app.js")
+
+def test_block_rules_with_unevaluated_options_are_skipped():
+    blocklist = build(
+        "||popup.test^$popup",
+        "||cdn.test^$third-party",
+        "/widget.js$domain=other.test",
+        "||page.test^$document",
+        "||csp.test^$csp=script-src 'none'",
+        "||redirect.test/ad.js$script,redirect=noopjs",
+        "||important.test^$important",
+    )
+    assert blocklist.rule_count == 1
+    assert blocklist.skipped_count == 6
+    assert not blocklist.blocks("popup.test", "https://popup.test/")
+    assert not blocklist.blocks("cdn.test", "https://cdn.test/lib.js")
+    assert not blocklist.blocks("site.test", "https://site.test/widget.js")
+    assert blocklist.blocks("important.test", "https://important.test/x.js")
+
+def test_exceptions_keep_applying_without_their_options():
+    blocklist = build("||ads.test^", "@@||ads.test/needed.js$script,domain=site.test", "@@||ads.test^$elemhide")
+    assert not blocklist.blocks("ads.test", "https://ads.test/needed.js")
+    assert blocklist.blocks("ads.test", "https://ads.test/banner.js")
+    assert blocklist.skipped_count == 1
+
+def test_compiled_index_is_cached(tmp_path):
+    list_dir = tmp_path / "lists"
+    list_dir.mkdir()
+    (list_dir / "easylist.txt").write_text("! comment\n||ads.test^\n||cdn.test^$third-party\n")
+    cache_dir = str(tmp_path / "cache")
+    first = load_blocklist(str(list_dir), cache_dir)
+    second = load_blocklist(str(list_dir), cache_dir)
+    assert first.rule_count == second.rule_count == 1
+    assert second.blocks("ads.test", "https://ads.test/")
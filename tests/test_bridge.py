@@ -0,0 +1,55 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("PyQt6.QtCore")
+
+from bridge import PluginBridge
+
+@pytest.fixture
+def bridge(qapp):
+    executor = ThreadPoolExecutor(max_workers=2)
+    handlers = {
+        "add": (lambda a, b: a + b, False),
+        "square": (lambda value: value * value, True),
+    }
+    bridge = PluginBridge(handlers, executor)
+    bridge.replies = []
+    bridge.results.connect(lambda payload: bridge.replies.extend(json.loads(payload)))
+    yield bridge
+    executor.shutdown()
+
+def replies_by_id(bridge):
+    return {reply["id"]: reply for reply in bridge.replies}
+
+def test_calls_are_answered_in_one_batch(bridge, wait):
+    bridge.dispatch(json.dumps([
+        {"id": 1, "method": "add", "args": [2, 3]},
+        {"id": 2, "method": "square", "args": [4]},
+        {"id": 0, "method": "add", "args": [1, 1]},
+    ]))
+    assert wait(lambda: len(bridge.replies) == 2)
+    replies = replies_by_id(bridge)
+    assert replies[1]["result"] == 5 and replies[2]["result"] == 16
+    assert bridge.calls == 3 and bridge.batches == 1
+
+@pytest.mark.parametrize("payload", ["not json", "{}", "42", '"text"', "null"])
+def test_payload_that_is_not_a_list_is_dropped(bridge, payload):
+    bridge.dispatch(payload)
+    assert bridge.batches == 0
+
+def test_malformed_calls_get_errors_instead_of_raising(bridge, wait):
+    bridge.dispatch(json.dumps([
+        "not a call",
+        {"id": 1, "method": "add", "args": 5},
+        {"id": 2, "method": "square", "args": {"value": 3}},
+        {"id": 3, "method": ["add"], "args": []},
+        {"id": 4, "method": "add", "args": [1]},
+        {"id": 5, "method": "square", "args": [1, 2]},
+        {"id": 6, "method": "add", "args": [1, 2]},
+    ]))
+    assert wait(lambda: len(bridge.replies) == 6)
+    replies = replies_by_id(bridge)
+    assert all("error" in replies[call_id] for call_id in range(1, 6))
+    assert replies[6]["result"] == 3
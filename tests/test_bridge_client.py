@@ -0,0 +1,63 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from bridge_client import BRIDGE_CLIENT_SCRIPT
+
+# Evaluates the client in a page stand-in; with "channel" the page has a web channel transport
+NODE_HARNESS = r"""
+const source = require("fs").readFileSync(0, "utf8");
+globalThis.window = globalThis;
+globalThis.document = {visibilityState: "visible"};
+globalThis.requestAnimationFrame = (callback) => setTimeout(callback, 0);
+const batches = [];
+let deliver = null;
+if (process.argv[1] === "channel") {
+    globalThis.qt = {webChannelTransport: {}};
+    globalThis.QWebChannel = function (transport, ready) {
+        ready({objects: {zerkalo: {
+            dispatch: (payload) => batches.push(JSON.parse(payload)),
+            results: {connect: (callback) => { deliver = callback; }},
+        }}});
+    };
+}
+eval(source);
+const settled = {};
+const track = (name, promise) => promise.then(
+    (value) => { settled[name] = {result: value}; },
+    (error) => { settled[name] = {error: error.message}; });
+track("add", zerkalo.call("add", [2, 3]));
+track("fail", zerkalo.call("fail"));
+zerkalo.send("log", ["hi"]);
+setTimeout(() => {
+    if (deliver) deliver(JSON.stringify([{id: 1, result: 5}, {id: 2, error: "boom"}]));
+    setTimeout(() => console.log(JSON.stringify({batches: batches, settled: settled})), 10);
+}, 20);
+"""
+
+def run_client(*argv):
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    output = subprocess.run([node, "-e", NODE_HARNESS, *argv], input=BRIDGE_CLIENT_SCRIPT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(output.stdout)
+
+def test_calls_of_one_frame_go_out_in_one_batch():
+    report = run_client("channel")
+    assert report["batches"] == [[
+        {"id": 1, "method": "add", "args": [2, 3]},
+        {"id": 2, "method": "fail", "args": []},
+        {"id": 0, "method": "log", "args": ["hi"]},
+    ]]
+    assert report["settled"] == {"add": {"result": 5}, "fail": {"error": "boom"}}
+
+def test_calls_fail_right_away_on_pages_without_a_channel():
+    report = run_client()
+    assert report["batches"] == []
+    assert report["settled"] == {
+        "add": {"error": "zerkalo is not available on this page"},
+        "fail": {"error": "zerkalo is not available on this page"},
+    }
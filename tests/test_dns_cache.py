@@ -0,0 +1,108 @@
+import os
+import re
+import shlex
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from dns_cache import frequent_origins, host_resolver_flag, resolver_rules, resolve_hosts, url_origin, warmup_html
+from telemetry import TelemetryWriter, read_records
+
+def navigation(url, *resources):
+    return {"url": url, "resources": [{"name": name} for name in resources]}
+
+def test_frequent_origins_counts_each_navigation_once(tmp_path):
+    path = str(tmp_path / "telemetry" / "navigations.jsonl")
+    writer = TelemetryWriter(path)
+    writer.write(navigation("https://old.test/", "https://old.test/a.js"))
+    for _ in range(3):
+        writer.write(navigation("https://otvet.test/q", "https://cdn.test/a.js", "https://cdn.test/b.js",
+                                "data:image/png;base64,AA==", "http://stats.test:8080/pixel"))
+    writer.write(navigation("https://otvet.test/p"))
+    origins = frequent_origins(path, navigations=4, limit=3)
+    assert origins[0] == "https://otvet.test"
+    assert set(origins[1:]) == {"https://cdn.test", "http://stats.test:8080"}
+    assert "https://old.test" not in frequent_origins(path, navigations=4, limit=10)
+
+def test_url_origin():
+    assert url_origin("https://otvet.test:443/q?x=1#a") == "https://otvet.test"
+    assert url_origin("http://[2001:db8::1]:8080/") == "http://[2001:db8::1]:8080"
+    assert url_origin("zerkalo-asset://otvet.test:80/app.js") is None
+    assert url_origin("http://bad:port/") is None
+
+def test_warmup_html_hints_every_origin_once():
+    document = warmup_html(["https://otvet.test", "https://cdn.test", "https://otvet.test"])
+    assert document.count('<link rel="dns-prefetch"') == 2 and document.count('<link rel="preconnect"') == 2
+    assert '<link rel="preconnect" href="https://cdn.test">' in document
+    assert "preconnect" not in warmup_html(["https://otvet.test"], preconnect=False)
+
+def test_resolve_hosts_uses_the_os_resolver_and_records(tmp_path):
+    timings = str(tmp_path / "telemetry" / "dns.jsonl")
+    results = resolve_hosts([("localhost", 80), ("127.0.0.1", 80), ("127.0.0.1", 80), ("host.invalid", 443)],
+                            timings_path=timings)
+    by_target = {(r["host"], r["port"]): r for r in results}
+    assert len(results) == 3
+    assert by_target[("127.0.0.1", 80)]["addresses"] == ["127.0.0.1"]
+    assert by_target[("localhost", 80)]["os_dns_ms"] is not None
+    assert by_target[("host.invalid", 443)]["error"]
+    record, = read_records(timings)
+    assert record["resolver"] == "os" and record["hosts"] == results
+
+def test_resolver_rules_pin_first_address_of_each_resolved_host():
+    results = [
+        {"host": "otvet.test", "port": 443, "addresses": ["10.0.0.1", "10.0.0.2"], "error": None},
+        {"host": "otvet.test", "port": 80, "addresses": ["10.0.0.3"], "error": None},
+        {"host": "v6.test", "port": 443, "addresses": ["2001:db8::1"], "error": None},
+        {"host": "down.test", "port": 443, "addresses": ["10.0.0.4"], "error": "Connection refused"},
+        {"host": "gone.test", "port": 443, "addresses": [], "error": "Name or service not known"},
+    ]
+    assert resolver_rules(results) == "MAP otvet.test 10.0.0.1, MAP v6.test [2001:db8::1]"
+    assert resolver_rules([]) == ""
+
+RULE = re.compile(r"MAP [^\s,\"]+ (\d+\.\d+\.\d+\.\d+|\[[0-9a-f:]+\])")
+
+def test_host_resolver_flag_stays_one_switch():
+    rules = resolver_rules([
+        {"host": "otvet.test", "addresses": ["10.0.0.1"], "error": None},
+        {"host": "cdn.test", "addresses": ["2001:db8::1", "10.0.0.2"], "error": None},
+        {"host": "stats.test", "addresses": ["10.0.0.3"], "error": None},
+    ])
+    entries = rules.split(", ")
+    assert len(entries) == 3 and all(RULE.fullmatch(entry) for entry in entries)
+    # QtWebEngine splits QTWEBENGINE_CHROMIUM_FLAGS on spaces outside double quotes and drops the quotes
+    flags = f"--disable-gpu {host_resolver_flag(rules)} --lang=ru"
+    assert shlex.split(flags) == ["--disable-gpu", f"--host-resolver-rules={rules}", "--lang=ru"]
+
+# Loads a host that only the pinned rules know, with the flag set the way pin_resolved_hosts sets it
+ENGINE_SCRIPT = textwrap.dedent("""
+    import os, sys
+    from PyQt6.QtCore import QTimer, QUrl
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtWebEngineCore import QWebEnginePage
+    from dns_cache import host_resolver_flag
+    os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = host_resolver_flag(sys.argv[1])
+    app = QApplication([sys.argv[0]])
+    page = QWebEnginePage()
+    page.loadFinished.connect(lambda ok: (print("ok" if ok else "failed"), app.quit()))
+    QTimer.singleShot(20000, app.quit)
+    page.load(QUrl(sys.argv[2]))
+    app.exec()
+""")
+
+def test_pinned_hosts_take_effect_in_the_engine(fixture_server, tmp_path):
+    pytest.importorskip("PyQt6.QtWebEngineCore")
+    (tmp_path / "index.html").write_text("<h1>pinned</h1>")
+    port = fixture_server.server.server_port
+    rules = resolver_rules([
+        {"host": "first.zerkalo.invalid", "addresses": ["127.0.0.1"], "error": None},
+        {"host": "second.zerkalo.invalid", "addresses": ["127.0.0.1"], "error": None},
+    ])
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", QTWEBENGINE_DISABLE_SANDBOX="1",
+               PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # The second rule only applies if the quoted value reached Chromium as one switch
+    output = subprocess.run([sys.executable, "-c", ENGINE_SCRIPT, rules,
+                             f"http://second.zerkalo.invalid:{port}/index.html"],
+                            env=env, capture_output=True, text=True, timeout=60)
+    assert output.stdout.strip().splitlines()[-1:] == ["ok"]
@@ -0,0 +1,40 @@
+import os
+import re
+
+import pytest
+
+from launch_protocol import ACK, MAX_MESSAGE_BYTES, decode_launch, encode_launch, is_ack, server_name
+
+def test_server_name_is_per_profile(tmp_path, monkeypatch):
+    first = server_name(str(tmp_path / "a"))
+    assert server_name(str(tmp_path / "a")) == first
+    assert server_name(str(tmp_path / "b")) != first
+    monkeypatch.chdir(tmp_path)
+    assert server_name(os.path.join("a", "")) == server_name("a") == first
+    # Short and plain enough for a Unix socket path and a Windows pipe name
+    assert re.fullmatch(r"zerkalo-[0-9a-f]{12}", first)
+
+def test_launch_round_trip_in_pieces():
+    message = {"url": "https://otvet.test/question/1", "cwd": "/tmp", "argv": ["--open", "Ответ"]}
+    wire = encode_launch(message)
+    assert wire.endswith(b"\n") and wire.count(b"\n") == 1
+    buffer = bytearray()
+    for chunk in (wire[:5], wire[5:-1]):
+        buffer.extend(chunk)
+        assert decode_launch(buffer) is None
+    buffer.extend(wire[-1:] + b"trailing")
+    assert decode_launch(buffer) == message
+
+def test_decode_launch_rejects_bad_lines():
+    assert decode_launch(b"[1, 2]\n") == {}
+    with pytest.raises(ValueError):
+        decode_launch(b"{not json\n")
+    with pytest.raises(ValueError):
+        decode_launch(b"\xff\n")
+    assert decode_launch(b"x" * MAX_MESSAGE_BYTES) is None
+    with pytest.raises(ValueError):
+        decode_launch(b"x" * (MAX_MESSAGE_BYTES + 1))
+
+def test_ack():
+    assert is_ack(ACK) and is_ack(b"ok")
+    assert not is_ack(b"") and not is_ack(b"no\n")
@@ -0,0 +1,41 @@
+from lite_mode import ByteLedger, LitePolicy
+
+PAGE = "https://otvet.test/question/1"
+
+def test_size_rule_spares_what_the_page_needs():
+    policy = LitePolicy(rules=(), max_bytes=100, enabled=True)
+    assert policy.decide("document", PAGE, PAGE, known_size=10_000) is None
+    assert policy.decide("stylesheet", "https://otvet.test/app.css", PAGE, known_size=10_000) is None
+    assert policy.decide("script", "https://cdn.otvet.test/app.js", PAGE, known_size=10_000) is None
+    assert policy.decide("script", "https://ads.test/tag.js", PAGE, known_size=10_000) == "size"
+    assert policy.decide("image", "https://otvet.test/photo.png", PAGE, known_size=10_000) == "size"
+    assert policy.decide("image", "https://otvet.test/icon.png", PAGE, known_size=50) is None
+
+def test_category_rules():
+    policy = LitePolicy(enabled=True)
+    assert policy.decide("image", "https://otvet.test/photo.png", PAGE) == "image"
+    assert policy.decide("script", "https://ads.test/tag.js", PAGE) == "third-party-script"
+    assert LitePolicy(enabled=False).decide("image", "https://otvet.test/photo.png", PAGE) is None
+
+def test_ledger_counts_cross_origin_entries_without_sizes_as_unmeasured():
+    ledger = ByteLedger()
+    record = {
+        "navigation": {"transferSize": 5000, "bodySize": 4700},
+        "resources": [
+            {"name": "https://otvet.test/app.js", "type": "script", "transferSize": 2300, "bodySize": 2000, "ttfb": 12.0},
+            # HTTP cache hit: nothing transferred, body size still known
+            {"name": "https://otvet.test/logo.png", "type": "img", "transferSize": 0, "bodySize": 800, "ttfb": 1.0},
+            # Cross-origin without Timing-Allow-Origin: every size and response timing reads 0
+            {"name": "https://ads.test/banner.png", "type": "img", "transferSize": 0, "bodySize": 0, "ttfb": None},
+        ],
+    }
+    page = ledger.account(PAGE, record)
+    assert page["bytes"] == {"document": 5000, "script": 2300, "image": 0}
+    assert page["unmeasured"] == {"image": 1}
+    assert ledger.unmeasured(PAGE) == 1
+    assert ledger.known_size("https://otvet.test/logo.png") == 800
+    assert ledger.known_size("https://ads.test/banner.png") is None
+    assert "image: 0 B in 2 (1 unmeasured)" in ledger.breakdown(PAGE)
+    # Accounting the page again replaces its numbers instead of adding up
+    ledger.account(PAGE, record)
+    assert ledger.session == {"bytes": 7300, "saved": 0, "unmeasured": 1}
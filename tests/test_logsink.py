@@ -0,0 +1,77 @@
+import os
+
+import pytest
+
+import logsink
+from logsink import LogSink, RateLimiter
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "logs" / "zerkalo.log")
+
+def test_rate_limiter_suppresses_bursts_and_reports_the_gap():
+    limiter = RateLimiter(rate=1.0, burst=2)
+    assert limiter.allow("page", 0.0) == (True, 0)
+    assert limiter.allow("page", 0.0) == (True, 0)
+    assert limiter.allow("page", 0.0) == (False, 0)
+    assert limiter.allow("page", 0.5) == (False, 0)
+    # Other sources have their own bucket
+    assert limiter.allow("app", 0.5) == (True, 0)
+    assert limiter.allow("page", 1.5) == (True, 2)
+
+def test_rate_limiter_keeps_a_bounded_number_of_sources():
+    limiter = RateLimiter(rate=1.0, burst=1, max_sources=3)
+    for index in range(10):
+        limiter.allow(f"host{index}.test", float(index))
+    assert len(limiter.buckets) <= 3
+    # A source that still owes a suppressed count is kept over refilled ones
+    limiter = RateLimiter(rate=1.0, burst=1, max_sources=2)
+    limiter.allow("noisy", 0.0)
+    limiter.allow("noisy", 0.0)
+    limiter.allow("quiet", 0.0)
+    limiter.allow("new", 5.0)
+    assert "noisy" in limiter.buckets and "quiet" not in limiter.buckets
+
+def test_log_file_rotates(log_path):
+    sink = LogSink(log_path, max_bytes=200, backups=2, rate=1000, burst=1000, echo_level=logsink.ERROR + 1)
+    for index in range(30):
+        sink.log(logsink.INFO, "app", f"line {index}")
+        sink.queue.join()  # One batch per line, so the size check runs between lines
+    sink.close()
+    assert os.path.exists(log_path + ".1") and os.path.exists(log_path + ".2")
+    assert not os.path.exists(log_path + ".3")
+    with open(log_path, encoding="utf-8") as f:
+        assert f.read().rstrip().endswith("line 29")
+
+def test_dump_has_lines_below_the_echo_level(log_path, tmp_path):
+    sink = LogSink(log_path, ring_size=3, echo_level=logsink.ERROR + 1)
+    sink.log(logsink.DEBUG, "app", "first")
+    for index in range(4):
+        sink.log(logsink.DEBUG, "app", f"debug {index}")
+    path = sink.dump(str(tmp_path / "dump.log"))
+    sink.close()
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert [line.split("] ", 1)[1] for line in lines] == ["debug 1", "debug 2", "debug 3"]
+    assert "DEBUG [app]" in lines[0]
+
+def test_logging_after_close_falls_back_to_print(log_path, capsys):
+    sink = logsink.start_logging(log_path)
+    sink.close()
+    assert logsink.sink is None
+    logsink.info("app", "after close")
+    sink.log(logsink.INFO, "app", "through the closed sink")
+    assert capsys.readouterr().out.splitlines()[-2:] == ["after close", "through the closed sink"]
+
+def test_lazy_messages_are_only_formatted_when_logged(log_path):
+    sink = LogSink(log_path, rate=1.0, burst=1, echo_level=logsink.ERROR + 1)
+    formatted = []
+    def message(text):
+        return lambda: formatted.append(text) or text
+    sink.log(logsink.INFO, "js:chatty.test", message("first"))
+    sink.log(logsink.INFO, "js:chatty.test", message("dropped by the rate limit"))
+    sink.log(logsink.DEBUG - 1, "js:chatty.test", message("below every level"))
+    sink.close()
+    assert formatted == ["first"]
+    with open(log_path, encoding="utf-8") as f:
+        assert f.read().rstrip().endswith("[js:chatty.test] first")
@@ -0,0 +1,119 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from mirrors import MirrorList, probe_mirror
+
+class MirrorHandler(BaseHTTPRequestHandler):
+    """Answers with the server's status after its delay"""
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        body = b"<html>mirror</html>"
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_mirror(status=200, delay=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MirrorHandler)
+    server.daemon_threads = True
+    server.status = status
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+def dead_url():
+    """URL of a port nothing listens on"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/"
+
+@pytest.fixture
+def mirrors():
+    """fast, slow, broken (HTTP 500) and dead mirror URLs"""
+    servers = {}
+    servers["fast"] = start_mirror()
+    servers["slow"] = start_mirror(delay=0.3)
+    servers["broken"] = start_mirror(status=500)
+    urls = {name: url for name, (_, url) in servers.items()}
+    urls["dead"] = dead_url()
+    yield urls
+    for server, _ in servers.values():
+        server.shutdown()
+        server.server_close()
+
+def wait_for_ranking(path, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                ranking = json.load(f)
+            if len(ranking) == count:
+                return ranking
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.02)
+    raise AssertionError(f"{path} never listed {count} mirrors")
+
+def test_probe_mirror(mirrors):
+    assert probe_mirror(mirrors["fast"], timeout=2) is not None
+    assert probe_mirror(mirrors["broken"], timeout=2) is None
+    assert probe_mirror(mirrors["dead"], timeout=2) is None
+
+def test_probe_returns_first_answer_and_saves_ranking(mirrors, tmp_path):
+    path = str(tmp_path / "mirrors.json")
+    urls = [mirrors["dead"], mirrors["broken"], mirrors["slow"], mirrors["fast"]]
+    mirror_list = MirrorList(urls, path)
+    assert mirror_list.probe(timeout=2) == mirrors["fast"]
+
+    ranking = wait_for_ranking(path, len(urls))
+    assert ranking[mirrors["dead"]] is None
+    assert ranking[mirrors["broken"]] is None
+    assert ranking[mirrors["fast"]] < ranking[mirrors["slow"]]
+    assert MirrorList(urls, path).ranked() == [mirrors["fast"], mirrors["slow"], mirrors["dead"], mirrors["broken"]]
+
+def test_probe_async_delivers_result(mirrors, tmp_path):
+    mirror_list = MirrorList([mirrors["slow"], mirrors["fast"]], str(tmp_path / "mirrors.json"))
+    results = []
+    mirror_list.probe_async(results.append, timeout=2).join(5)
+    assert results == [mirrors["fast"]]
+
+def test_choose_uses_saved_ranking_before_probe(mirrors, tmp_path):
+    path = tmp_path / "mirrors.json"
+    path.write_text(json.dumps({mirrors["slow"]: 0.3, mirrors["fast"]: 0.01, mirrors["dead"]: None}))
+    mirror_list = MirrorList([mirrors["dead"], mirrors["slow"], mirrors["fast"]], str(path))
+    assert mirror_list.choose() == mirrors["fast"]
+
+def test_next_mirror_skips_tried_and_marks_current_dead(mirrors, tmp_path):
+    path = str(tmp_path / "mirrors.json")
+    mirror_list = MirrorList([mirrors["fast"], mirrors["slow"]], path)
+    assert mirror_list.choose() == mirrors["fast"]
+    assert mirror_list.next_mirror() == mirrors["slow"]
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f) == {mirrors["fast"]: None}
+    assert mirror_list.next_mirror() is None
+
+def test_owns_and_rebase(mirrors):
+    mirror_list = MirrorList([mirrors["fast"], mirrors["slow"]])
+    mirror_list.choose(mirrors["fast"])
+    page = mirrors["fast"] + "question/1?page=2#answer"
+    assert mirror_list.owns(page)
+    assert not mirror_list.owns(mirrors["slow"] + "question/1")
+    assert mirror_list.rebase(page, mirrors["slow"]) == mirrors["slow"] + "question/1?page=2#answer"
+
+def test_mirror_for_matches_the_origin_not_the_current_mirror(mirrors):
+    mirror_list = MirrorList([mirrors["fast"], mirrors["slow"]])
+    mirror_list.choose(mirrors["fast"])
+    # A page of the other mirror that finishes loading after a failover keeps its own mirror
+    assert mirror_list.mirror_for(mirrors["slow"] + "question/1#answer") == mirrors["slow"]
+    assert mirror_list.mirror_for(mirrors["fast"]) == mirrors["fast"]
+    assert mirror_list.mirror_for("https://example.com/") is None
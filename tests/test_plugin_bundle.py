@@ -0,0 +1,40 @@
+import glob
+import os
+
+from plugin_bundle import PluginBundler
+
+def write_plugin(path, body):
+    path.write_text("// ==UserScript==\n// @run-at document-end\n// ==/UserScript==\n" + body + "\n", encoding="utf-8")
+
+def bundled_names(bundles):
+    return [name for bundle in bundles for name in bundle["plugins"]]
+
+def test_plugin_that_became_unreadable_after_the_scan_is_left_out(tmp_path):
+    plugin_dir = tmp_path / "plugins"
+    plugin_dir.mkdir()
+    write_plugin(plugin_dir / "good.js", "window.good = 1;")
+    write_plugin(plugin_dir / "bad.js", "window.bad = 1;")
+    cache_dir = str(tmp_path / "cache")
+    assert sorted(bundled_names(PluginBundler(str(plugin_dir), cache_dir).build())) == ["bad.js", "good.js"]
+
+    # Same size and mtime, so the index hash is trusted and the file is only read while bundling
+    bad = plugin_dir / "bad.js"
+    stat = os.stat(bad)
+    bad.write_bytes(b"\xff" * stat.st_size)
+    os.utime(bad, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    for path in glob.glob(os.path.join(cache_dir, "bundle-*.json")):
+        os.remove(path)
+
+    bundler = PluginBundler(str(plugin_dir), cache_dir)
+    assert bundled_names(bundler.build()) == ["good.js"]
+    assert "bad.js" not in bundler.hashes
+
+def test_plugins_run_in_the_main_world_unless_they_declare_one(tmp_path):
+    plugin_dir = tmp_path / "plugins"
+    plugin_dir.mkdir()
+    write_plugin(plugin_dir / "page.js", "window.siteApp.patch();")
+    (plugin_dir / "bridge.js").write_text(
+        "// ==UserScript==\n// @world user\n// ==/UserScript==\nzerkalo.send('log', ['hi']);\n", encoding="utf-8"
+    )
+    bundles = PluginBundler(str(plugin_dir), str(tmp_path / "cache")).build()
+    assert {bundle["world"]: bundle["plugins"] for bundle in bundles} == {"main": ["page.js"], "user": ["bridge.js"]}
@@ -0,0 +1,57 @@
+from plugin_bundle import PluginIndex, glob_to_regex
+
+def bundle(name, match=(), include=(), exclude=()):
+    return {"plugins": [name], "match": list(match), "include": list(include), "exclude": list(exclude)}
+
+def names(index, url):
+    return [index.bundles[i]["plugins"][0] for i in index.match(url)]
+
+def test_match_and_include_both_have_to_accept_the_url():
+    index = PluginIndex([
+        bundle("both.js", match=["https://*.otvet.test/*"], include=["*/question/*"]),
+        bundle("match.js", match=["https://otvet.test/*"]),
+        bundle("include.js", include=["https://otvet.test/profile/*"]),
+        bundle("everywhere.js"),
+    ])
+    assert names(index, "https://otvet.test/question/1") == ["both.js", "match.js", "everywhere.js"]
+    assert names(index, "https://otvet.test/profile/2") == ["match.js", "include.js", "everywhere.js"]
+    assert names(index, "https://other.test/question/1") == ["everywhere.js"]
+
+def test_exclude_wins():
+    index = PluginIndex([bundle("a.js", match=["*://otvet.test/*"], exclude=["*/settings*"])])
+    assert names(index, "http://otvet.test/question/1") == ["a.js"]
+    assert names(index, "http://otvet.test/settings") == []
+
+def test_invalid_match_is_dropped_like_qt_does():
+    index = PluginIndex([bundle("a.js", match=["otvet.test"], include=["*/question/*"])])
+    assert names(index, "https://any.test/question/1") == ["a.js"]
+    assert names(index, "https://any.test/") == []
+
+def test_glob_wildcards():
+    assert glob_to_regex("https://otvet.test/q?/*").match("https://otvet.test/q1/answer")
+    assert not glob_to_regex("https://otvet.test/q?/*").match("https://otvet.test/q12/answer")
+    assert glob_to_regex("*.test/a+b").match("https://otvet.test/a+b")
+
+def test_match_host_is_case_insensitive_path_is_not():
+    index = PluginIndex([bundle("a.js", match=["https://Otvet.test/Question/*"])])
+    assert names(index, "HTTPS://OTVET.TEST/Question/1") == ["a.js"]
+    assert names(index, "https://otvet.test/question/1") == []
+
+def test_match_with_port():
+    index = PluginIndex([
+        bundle("port.js", match=["http://localhost:8080/*"]),
+        bundle("default.js", match=["https://otvet.test:443/*"]),
+        bundle("any.js", match=["http://127.0.0.1/*"]),
+    ])
+    assert names(index, "http://localhost:8080/question/1") == ["port.js"]
+    assert names(index, "http://localhost:8081/question/1") == []
+    assert names(index, "https://otvet.test/") == ["default.js"]
+    assert names(index, "http://127.0.0.1:8000/") == ["any.js"]
+
+def test_match_ignores_the_fragment():
+    index = PluginIndex([
+        bundle("exact.js", match=["https://otvet.test/question/1"]),
+        bundle("anchor.js", include=["*#answer*"]),
+    ])
+    assert names(index, "https://otvet.test/question/1#answer-5") == ["exact.js", "anchor.js"]
+    assert names(index, "https://otvet.test/question/1") == ["exact.js"]
@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("PyQt6.QtWebEngineCore")
+
+from plugin_bundle import Plugin, build_bundles
+
+# Counts its runs on the DOM, which every JavaScript world can read back
+COUNTER_PLUGIN = """// ==UserScript==
+// @run-at document-end
+// @noframes
+// ==/UserScript==
+var runs = Number(document.documentElement.getAttribute("data-runs") || 0) + 1;
+document.documentElement.setAttribute("data-runs", String(runs));
+"""
+
+PAGE = "<!doctype html><html><body><h1>{title}</h1><a id='next' href='/{next}.html'>next</a></body></html>"
+
+@pytest.fixture
+def page(qapp, wait, tmp_path, fixture_server):
+    from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+    from webpage import install_bundle_scripts
+
+    for name, next_name in (("one", "two"), ("two", "one")):
+        (tmp_path / f"{name}.html").write_text(PAGE.format(title=name, next=next_name))
+    profile = QWebEngineProfile()
+    install_bundle_scripts(profile, build_bundles([Plugin("counter.js", COUNTER_PLUGIN)]))
+    page = QWebEnginePage(profile)
+    page.loads = []
+    page.loadFinished.connect(page.loads.append)
+    yield page
+    page.deleteLater()
+    profile.deleteLater()
+
+def run_js(page, wait, source):
+    result = []
+    page.runJavaScript(source, 0, result.append)
+    assert wait(lambda: result)
+    return result[0]
+
+def navigate(page, wait, action):
+    expected = len(page.loads) + 1
+    action()
+    assert wait(lambda: len(page.loads) >= expected)
+    assert page.loads[-1]
+
+def test_plugins_run_once_per_navigation(page, wait, fixture_server):
+    from PyQt6.QtCore import QUrl
+    from PyQt6.QtWebEngineCore import QWebEnginePage
+    read_runs = "document.documentElement.getAttribute('data-runs')"
+
+    navigate(page, wait, lambda: page.load(QUrl(fixture_server.url + "one.html")))
+    assert run_js(page, wait, read_runs) == "1"
+
+    # Link click, reload and history navigation each get a fresh document and one run
+    navigate(page, wait, lambda: page.runJavaScript("document.getElementById('next').click()"))
+    assert page.url().path() == "/two.html"
+    assert run_js(page, wait, read_runs) == "1"
+
+    navigate(page, wait, lambda: page.triggerAction(QWebEnginePage.WebAction.Reload))
+    assert run_js(page, wait, read_runs) == "1"
+
+    navigate(page, wait, lambda: page.triggerAction(QWebEnginePage.WebAction.Back))
+    assert page.url().path() == "/one.html"
+    assert run_js(page, wait, read_runs) == "1"
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import procstats
+from procstats import cpu_seconds, rss_kb
+
+needs_proc = pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="no /proc")
+
+@needs_proc
+def test_rss_kb_of_this_process():
+    assert rss_kb(os.getpid()) > 0
+
+def test_rss_kb_without_a_process():
+    assert rss_kb(None) is None
+    assert rss_kb(0) is None
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    assert rss_kb(exited.pid) is None
+
+def test_total_rss_kb_counts_shared_renderers_once(monkeypatch):
+    monkeypatch.setattr(procstats, "rss_kb", {101: 300, 102: 200}.get)
+    assert procstats.total_rss_kb([101, 102, 101, None, 0, 103]) == 500
+
+@needs_proc
+def test_cpu_seconds_of_this_process():
+    before = cpu_seconds(os.getpid())
+    sum(range(2_000_000))
+    assert cpu_seconds(os.getpid()) >= before >= 0
+    assert cpu_seconds(None) is None
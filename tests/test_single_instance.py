@@ -0,0 +1,103 @@
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6.QtNetwork")
+
+from launch_protocol import server_name
+from single_instance import InstanceServer, forward_launch
+
+@pytest.fixture
+def instance(qapp, tmp_path):
+    server = InstanceServer(server_name(str(tmp_path / "browser_data")))
+    yield server
+    server.close()
+
+def forward_in_thread(name, message):
+    """forward_launch() blocks until the ack, so the server side needs the test's event loop"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(forward_launch(name, message, timeout_ms=2000)))
+    thread.start()
+    return thread, result
+
+def test_forward_launch_without_a_running_instance(qapp, tmp_path):
+    assert forward_launch(server_name(str(tmp_path / "nobody")), {"url": "x"}) is False
+
+def test_forwarded_launch_reaches_the_running_instance(instance, wait):
+    received = []
+    instance.launch_received.connect(received.append)
+    assert instance.listen()
+    message = {"url": "https://otvet.test/question/1", "cwd": "/tmp", "argv": []}
+    thread, result = forward_in_thread(instance.name, message)
+    assert wait(lambda: result)
+    thread.join()
+    assert result == [True]
+    assert received == [message]
+    assert instance.received == 1
+
+def test_listen_again_after_close(instance, wait):
+    assert instance.listen()
+    instance.close()
+    assert instance.listen()
+    thread, result = forward_in_thread(instance.name, {"url": None})
+    assert wait(lambda: result)
+    thread.join()
+    assert result == [True]
+
+def test_listen_leaves_a_live_instance_alone(instance, wait):
+    assert instance.listen()
+    late = InstanceServer(instance.name)
+    try:
+        assert not late.listen()
+        assert late.taken
+        received = []
+        instance.launch_received.connect(received.append)
+        thread, result = forward_in_thread(instance.name, {"url": "https://otvet.test/"})
+        assert wait(lambda: result)
+        thread.join()
+        assert result == [True] and received == [{"url": "https://otvet.test/"}]
+    finally:
+        late.close()
+
+# Interpreter start and PyQt imports dominate; the hand-over itself is the few ms app.py prints
+EXIT_BOUND_S = 5.0
+HAND_OVER_BOUND_MS = 100.0
+
+def test_second_launch_exits_quickly(qapp, wait, tmp_path):
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = InstanceServer(server_name(str(tmp_path / "browser_data")))
+    received = []
+    server.launch_received.connect(received.append)
+    assert server.listen()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(app_dir, "app.py"), "--open", "https://otvet.test/"],
+                               cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               env=dict(os.environ, QT_QPA_PLATFORM="offscreen"))
+    try:
+        # The server side of the hand-over runs on this event loop
+        assert wait(lambda: process.poll() is not None, timeout=30)
+        exit_s = time.perf_counter() - start
+        output = process.communicate()[0]
+    finally:
+        if process.poll() is None:
+            process.kill()
+        server.close()
+    assert process.returncode == 0, output
+    assert received and received[0]["url"] == "https://otvet.test/"
+    assert exit_s < EXIT_BOUND_S
+    hand_over = re.search(r"Opened in the running instance \(([0-9.]+) ms\)", output)
+    assert hand_over and float(hand_over.group(1)) < HAND_OVER_BOUND_MS
+
+def test_qt_arguments_are_left_for_qt():
+    pytest.importorskip("PyQt6.QtWebEngineWidgets")
+    from app import parse_arguments
+    args, qt_args = parse_arguments(["-platform", "offscreen", "--open", "https://otvet.test/"])
+    assert args.url == "https://otvet.test/"
+    assert qt_args == ["-platform", "offscreen"]
+    args, qt_args = parse_arguments(["-platform", "offscreen"])
+    assert args.url is None and qt_args == ["-platform", "offscreen"]
@@ -0,0 +1,50 @@
+import time
+from urllib.parse import quote
+
+from snapshot_cache import (
+    SnapshotCache, MAX_DATA_URL_CHARS, DATA_URL_PREFIX, data_url_size, make_inert, stale_banner,
+)
+
+def test_data_url_size_matches_percent_encoding():
+    for html in ("<p class=\"a\">Привет, мир</p>", "plain-text_with.dots~", "<" * 100):
+        body = html.encode("utf-8")
+        assert data_url_size(body) == len(DATA_URL_PREFIX) + len(quote(body, safe="-._~"))
+
+def test_make_inert_drops_scripts_and_refreshes():
+    html = '<meta http-equiv="refresh" content="0"><p>a</p><script>alert(1)</script><SCRIPT src=x></SCRIPT>'
+    assert make_inert(html) == "<p>a</p>"
+
+def test_put_checks_the_encoded_size(tmp_path):
+    cache = SnapshotCache(str(tmp_path / "snapshots.sqlite"))
+    try:
+        assert cache.put("https://m.test/small", "<p>small</p>")
+        # Under the limit as raw UTF-8, about three times over it once percent-encoded
+        markup = "<p>" * (MAX_DATA_URL_CHARS // 3)
+        assert len(markup.encode("utf-8")) < MAX_DATA_URL_CHARS
+        assert not cache.put("https://m.test/large", markup)
+        assert cache.get("https://m.test/large") is None
+        html, scroll, _ = cache.get("https://m.test/small")
+        assert html == "<p>small</p>" and scroll == (0, 0)
+    finally:
+        cache.close()
+
+def test_stale_banner_shows_age():
+    assert "(0 мин)" in stale_banner(time.time())
+
+def test_index_follows_puts_and_evictions(tmp_path):
+    path = str(tmp_path / "snapshots.sqlite")
+    cache = SnapshotCache(path, max_entries=2)
+    try:
+        for n in range(3):
+            cache.put(f"https://m.test/{n}", f"<p>{n}</p>")
+            time.sleep(0.01)
+        assert not cache.cached("https://m.test/0")
+        assert cache.cached("https://m.test/1") and cache.cached("https://m.test/2")
+        assert cache.stats()["misses"] == 1
+    finally:
+        cache.close()
+    reopened = SnapshotCache(path)
+    try:
+        assert reopened.urls == {"https://m.test/1", "https://m.test/2"}
+    finally:
+        reopened.close()
@@ -0,0 +1,43 @@
+from telemetry import TelemetryWriter, lookup_ms, read_records, read_recent_records, summarize, tail_lines
+
+def record(load, navigation_lookup, *resource_lookups):
+    start, end = navigation_lookup
+    return {
+        "navigation": {"domainLookupStart": start, "domainLookupEnd": end, "loadEventEnd": load},
+        "resources": [{"name": f"https://cdn{index}.test/a.js", "dnsStart": start, "dns": end - start}
+                      for index, (start, end) in enumerate(resource_lookups)],
+    }
+
+def test_parallel_lookups_are_counted_once():
+    # Three lookups running side by side from 100 to 200 ms, one overlapping, one after load
+    page = record(1000, (0, 50), (100, 200), (100, 200), (150, 250), (1200, 1300))
+    assert lookup_ms(page, 1000) == 50 + 150
+    assert summarize([page])["all"]["dns_share"] == (20.0, 20.0)
+
+def test_dns_share_never_exceeds_the_load_time():
+    page = record(100, (0, 80), *[(0, 100)] * 20)
+    assert summarize([page])["all"]["dns_share"] == (100.0, 100.0)
+
+def test_records_without_lookup_starts_count_the_document_lookup():
+    page = record(1000, (10, 60))
+    page["resources"] = [{"name": "https://cdn.test/a.js", "dns": 500}]
+    assert lookup_ms(page, 1000) == 50
+
+def test_tail_lines_reads_whole_lines_from_the_end(tmp_path):
+    path = tmp_path / "lines.txt"
+    path.write_bytes(b"".join(f"line {index}\n".encode() for index in range(10)))
+    assert tail_lines(str(path), 3, block=7) == [b"line 7", b"line 8", b"line 9"]
+    assert tail_lines(str(path), 20, block=7) == [f"line {index}".encode() for index in range(10)]
+    assert tail_lines(str(path), 0) == []
+
+def test_recent_records_come_from_the_newest_files(tmp_path):
+    path = str(tmp_path / "telemetry" / "navigations.jsonl")
+    writer = TelemetryWriter(path, max_bytes=100, backups=3)
+    for index in range(20):
+        writer.write({"index": index})
+    assert [record["index"] for record in read_recent_records(path, 3)] == [17, 18, 19]
+    # More than the current file holds: continues into the backups, still oldest first
+    assert read_recent_records(path, 15) == list(read_records(path))[-15:]
+    assert read_recent_records(path, 1000) == list(read_records(path))
+    assert read_recent_records(str(tmp_path / "missing.jsonl"), 5) == []
+
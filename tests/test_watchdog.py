@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import watchdog
+from telemetry import read_records
+from watchdog import RendererWatchdog
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watchdog.time, "monotonic", clock)
+    return clock
+
+def make_watchdog(**options):
+    settings = dict(freeze_mb=100, reload_mb=200, recreate_mb=300, cpu_percent=90, cpu_samples=3, cooldown=60)
+    settings.update(options)
+    return RendererWatchdog(**settings)
+
+def mb(value):
+    return value * 1024
+
+def test_memory_thresholds(clock):
+    dog = make_watchdog()
+    assert dog.decide("tab", mb(99), None, background=True) is None
+    assert dog.decide("tab", mb(150), None, background=False) is None
+    assert dog.decide("tab", mb(150), None, background=True)[0] == "freeze"
+    assert dog.decide("tab", mb(250), None, background=False)[0] == "reload"
+    assert dog.decide("tab", mb(350), None, background=False)[0] == "recreate"
+
+def test_cooldown_then_escalation_to_recreate(clock):
+    dog = make_watchdog()
+    action, reason = dog.decide("tab", mb(250), None, background=False)
+    dog.record("tab", action, reason, rss=mb(250))
+    clock.now += 30
+    assert dog.decide("tab", mb(260), None, background=False) is None
+    clock.now += 31
+    action, reason = dog.decide("tab", mb(260), None, background=False)
+    assert action == "recreate" and "after reload" in reason
+
+def test_cpu_needs_consecutive_busy_samples(clock):
+    dog = make_watchdog()
+    for cpu in (95, 95, 10, 95, 95):
+        assert dog.decide("tab", mb(50), cpu, background=False) is None
+    assert dog.decide("tab", mb(50), 95, background=False)[0] == "reload"
+    # The count starts over after an intervention
+    assert dog.decide("tab", mb(50), 95, background=True) is None
+
+def test_forget_after_recreate_starts_the_new_page_fresh(clock):
+    dog = make_watchdog()
+    dog.record("tab", "reload", "renderer at 250 MB", rss=mb(250))
+    dog.forget("tab")
+    # No cooldown and no escalation left over from the page that was replaced
+    assert dog.decide("tab", mb(250), None, background=False)[0] == "reload"
+    assert "tab" not in dog.last_cpu
+
+def test_timeline_is_written(clock, tmp_path):
+    path = str(tmp_path / "telemetry" / "watchdog.jsonl")
+    dog = make_watchdog(timeline_path=path)
+    clock.now += 12
+    dog.record("tab", "freeze", "renderer at 150 MB", title="Вопрос", url="https://otvet.test/", rss=mb(150), cpu=5)
+    records = list(read_records(path))
+    assert records == list(dog.timeline)
+    assert records[0]["action"] == "freeze" and records[0]["at"] == 12.0
+    assert records[0]["rss_mb"] == 150.0 and records[0]["title"] == "Вопрос"
+
+def test_timeline_keeps_only_recent_events(clock):
+    dog = make_watchdog()
+    for index in range(watchdog.TIMELINE_EVENTS + 5):
+        dog.record("tab", "freeze", f"event {index}")
+    assert len(dog.timeline) == watchdog.TIMELINE_EVENTS
+    assert dog.timeline[0]["reason"] == "event 5"
+
+# Grows by 20 MB per line read, the way benchmark's leak.html grows every second
+LEAK_SCRIPT = """
+import sys
+leak = []
+for line in sys.stdin:
+    leak.append(b"x" * (20 * 1024 * 1024))
+    print(len(leak), flush=True)
+"""
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs /proc")
+def test_leaking_process_is_reloaded_then_recreated(clock):
+    process = subprocess.Popen([sys.executable, "-c", LEAK_SCRIPT], stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, text=True)
+    try:
+        dog = make_watchdog(cooldown=0)
+        baseline, _ = dog.sample("tab", process.pid)
+        dog.freeze_kb, dog.reload_kb, dog.recreate_kb = baseline + mb(30), baseline + mb(50), baseline + mb(200)
+        actions = []
+        for _ in range(5):
+            process.stdin.write("\n")
+            process.stdin.flush()
+            process.stdout.readline()
+            clock.now += 1
+            rss, _ = dog.sample("tab", process.pid)
+            decision = dog.decide("tab", rss, None, background=False)
+            if decision:
+                dog.record("tab", *decision, rss=rss)
+                actions.append(decision[0])
+        assert actions[:2] == ["reload", "recreate"]
+    finally:
+        process.kill()
+        process.wait()
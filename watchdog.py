@@ -0,0 +1,95 @@
+import time
+from collections import deque
+
+import logsink
+from procstats import rss_kb, cpu_seconds
+from telemetry import TelemetryWriter
+
+# Recent interventions kept in memory; the full history is in the timeline file
+TIMELINE_EVENTS = 200
+
+class RendererWatchdog:
+    """Samples renderer RSS/CPU from /proc and decides when to freeze, reload or recreate a page.
+
+    The browser feeds one sample per page and timer tick and applies the
+    returned action; every intervention ends up in the log and the timeline.
+    """
+    def __init__(self, freeze_mb, reload_mb, recreate_mb, cpu_percent, cpu_samples,
+                 cooldown=60, timeline_path=None):
+        self.freeze_kb = freeze_mb * 1024
+        self.reload_kb = reload_mb * 1024
+        self.recreate_kb = recreate_mb * 1024
+        self.cpu_percent = cpu_percent
+        self.cpu_samples = cpu_samples
+        self.cooldown = cooldown
+        self.started = time.monotonic()
+        self.last_cpu = {}  # key -> (pid, cpu seconds, monotonic time)
+        self.busy = {}  # key -> consecutive samples above the CPU threshold
+        self.last_action = {}  # key -> (action, monotonic time)
+        self.timeline = deque(maxlen=TIMELINE_EVENTS)
+        self.writer = TelemetryWriter(timeline_path) if timeline_path else None
+
+    def sample(self, key, pid):
+        """Return (rss KB, CPU percent since the previous sample) of the page's renderer"""
+        now = time.monotonic()
+        rss = rss_kb(pid)
+        cpu = cpu_seconds(pid)
+        previous = self.last_cpu.get(key)
+        self.last_cpu[key] = (pid, cpu, now)
+        if rss is None or cpu is None or previous is None or previous[0] != pid or previous[1] is None:
+            return rss, None
+        elapsed = now - previous[2]
+        return rss, (cpu - previous[1]) / elapsed * 100 if elapsed > 0 else None
+
+    def decide(self, key, rss, cpu, background):
+        """Return (action, reason) for a sample, or None while the page is healthy"""
+        now = time.monotonic()
+        if cpu is not None and cpu >= self.cpu_percent:
+            self.busy[key] = self.busy.get(key, 0) + 1
+        else:
+            self.busy[key] = 0
+
+        last = self.last_action.get(key)
+        if last is not None and now - last[1] < self.cooldown:
+            return None  # Give the previous intervention time to work
+        if rss is None:
+            return None
+
+        mb = rss / 1024
+        if rss >= self.recreate_kb:
+            return "recreate", f"renderer at {mb:.0f} MB"
+        if rss >= self.reload_kb:
+            if last is not None and last[0] == "reload":
+                return "recreate", f"renderer still at {mb:.0f} MB after reload"
+            return "reload", f"renderer at {mb:.0f} MB"
+        if background and rss >= self.freeze_kb:
+            return "freeze", f"renderer at {mb:.0f} MB"
+        if self.busy[key] >= self.cpu_samples:
+            self.busy[key] = 0
+            return ("freeze" if background else "reload"), f"CPU at {cpu:.0f}% for {self.cpu_samples} samples"
+        return None
+
+    def record(self, key, action, reason, title="", url="", rss=None, cpu=None):
+        """Remember an intervention and add it to the log and the timeline"""
+        at = time.monotonic() - self.started
+        self.last_action[key] = (action, time.monotonic())
+        event = {
+            "at": round(at, 1),
+            "time": time.time(),
+            "action": action,
+            "reason": reason,
+            "title": title,
+            "url": url,
+            "rss_mb": round(rss / 1024, 1) if rss else None,
+            "cpu_percent": round(cpu, 1) if cpu is not None else None,
+        }
+        self.timeline.append(event)
+        logsink.warning("watchdog", f"! Watchdog +{at:.0f} s: {action} '{title}' ({reason})")
+        if self.writer is not None:
+            self.writer.write(event)
+        return event
+
+    def forget(self, key):
+        """Drop the history of a closed page"""
+        for history in (self.last_cpu, self.busy, self.last_action):
+            history.pop(key, None)
@@ -0,0 +1,415 @@
+import json
+
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtCore import QUrl, QBuffer, QByteArray, QIODevice, QFile, pyqtSignal
+from PyQt6.QtWebChannel import QWebChannel
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply, QNetworkCookieJar
+from PyQt6.QtWebEngineCore import (
+    QWebEngineProfile, QWebEngineSettings, QWebEnginePage, QWebEngineScript,
+    QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo,
+    QWebEngineUrlScheme, QWebEngineUrlSchemeHandler, QWebEngineUrlRequestJob, QWebEngineLoadingInfo
+)
+
+import logsink
+from bridge import PluginBridge
+from bridge_client import BRIDGE_CLIENT_SCRIPT
+from plugin_bundle import bundle_header
+from lite_mode import resource_category
+from telemetry import OBSERVER_SCRIPT
+from snapshot_cache import SNAPSHOT_FRAGMENT
+from dns_cache import WARMUP_FRAGMENT
+
+# Everything that needs QtWebEngine lives here so app.py can show its window
+# before the (large) WebEngine libraries are loaded.
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+
+# Plugin header values (// @run-at ...) mapped to Chromium injection points
+PLUGIN_INJECTION_POINTS = {
+    "document-start": QWebEngineScript.InjectionPoint.DocumentCreation,
+    "document-end": QWebEngineScript.InjectionPoint.DocumentReady,
+    "document-idle": QWebEngineScript.InjectionPoint.Deferred,
+}
+
+# Plugin header values (// @world ...) mapped to JavaScript world ids
+PLUGIN_WORLDS = {
+    "main": QWebEngineScript.ScriptWorldId.MainWorld.value,
+    "application": QWebEngineScript.ScriptWorldId.ApplicationWorld.value,
+    "user": QWebEngineScript.ScriptWorldId.UserWorld.value,
+}
+
+# Console levels mapped to log levels; console.log noise only goes to the log file
+CONSOLE_LOG_LEVELS = {
+    QWebEnginePage.JavaScriptConsoleMessageLevel.InfoMessageLevel: logsink.DEBUG,
+    QWebEnginePage.JavaScriptConsoleMessageLevel.WarningMessageLevel: logsink.WARNING,
+    QWebEnginePage.JavaScriptConsoleMessageLevel.ErrorMessageLevel: logsink.ERROR,
+}
+
+# Custom scheme the mirror's static assets are served through from the asset store
+ASSET_SCHEME = b"zerkalo-asset"
+
+# Request types worth keeping offline
+ASSET_RESOURCE_TYPES = {
+    QWebEngineUrlRequestInfo.ResourceType.ResourceTypeScript,
+    QWebEngineUrlRequestInfo.ResourceType.ResourceTypeStylesheet,
+    QWebEngineUrlRequestInfo.ResourceType.ResourceTypeFontResource,
+    QWebEngineUrlRequestInfo.ResourceType.ResourceTypeImage,
+}
+
+# Load errors that mean the mirror is unreachable or broken
+MIRROR_FAILURE_DOMAINS = {
+    QWebEngineLoadingInfo.ErrorDomain.ConnectionErrorDomain,
+    QWebEngineLoadingInfo.ErrorDomain.DnsErrorDomain,
+    QWebEngineLoadingInfo.ErrorDomain.CertificateErrorDomain,
+    QWebEngineLoadingInfo.ErrorDomain.HttpErrorDomain,
+}
+NET_ERR_TIMED_OUT = -7
+
+def is_mirror_failure(info):
+    """True when a QWebEngineLoadingInfo reports a network or server error.
+
+    Loads that were stopped or aborted (a click during the load, back/forward,
+    a reload) end with LoadStoppedStatus or ERR_ABORTED and do not count.
+    """
+    if info.status() != QWebEngineLoadingInfo.LoadStatus.LoadFailedStatus:
+        return False
+    domain = info.errorDomain()
+    if domain == QWebEngineLoadingInfo.ErrorDomain.HttpStatusCodeDomain:
+        return info.errorCode() >= 500
+    if domain == QWebEngineLoadingInfo.ErrorDomain.InternalErrorDomain:
+        return info.errorCode() == NET_ERR_TIMED_OUT
+    return domain in MIRROR_FAILURE_DOMAINS
+
+def world_id(world):
+    """Translate a @world header value (name or number) into a world id"""
+    return int(world) if world.isdigit() else PLUGIN_WORLDS.get(world, PLUGIN_WORLDS["main"])
+
+def create_bundle_script(index, bundle):
+    """Build a user script for one plugin bundle"""
+    script = QWebEngineScript()
+    script.setName(f"plugin-bundle:{index}")
+    # Chromium applies the @match/@include/@exclude block itself, per navigation. Snapshots
+    # already hold what the plugins added to the page and the DNS warm-up page is no page
+    # at all, so the bundle skips both (a block, not a function, keeps the plugins'
+    # top-level var/function declarations global)
+    skipped = json.dumps(["#" + SNAPSHOT_FRAGMENT, "#" + WARMUP_FRAGMENT])
+    script.setSourceCode(
+        bundle_header(bundle)
+        + f"if ({skipped}.indexOf(location.hash) === -1) {{\n{bundle['source']}}}\n"
+    )
+    script.setInjectionPoint(PLUGIN_INJECTION_POINTS.get(bundle["run_at"], QWebEngineScript.InjectionPoint.DocumentReady))
+    script.setWorldId(world_id(bundle["world"]))
+    script.setRunsOnSubFrames(bundle["subframes"])
+    return script
+
+def install_bundle_scripts(profile, bundles):
+    """Replace the profile's plugin user scripts with one script per bundle"""
+    scripts = profile.scripts()
+    for script in scripts.toList():
+        if script.name().startswith("plugin-bundle:"):
+            scripts.remove(script)
+    for index, bundle in enumerate(bundles):
+        scripts.insert(create_bundle_script(index, bundle))
+
+def create_telemetry_script():
+    """Observe long tasks and LCP from document creation in an isolated world"""
+    script = QWebEngineScript()
+    script.setName("telemetry-observer")
+    script.setSourceCode(OBSERVER_SCRIPT)
+    script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
+    script.setWorldId(PLUGIN_WORLDS["application"])
+    script.setRunsOnSubFrames(False)
+    return script
+
+def create_bridge_script(world):
+    """qwebchannel.js plus the batching zerkalo.call() client, in the plugins' world"""
+    resource = QFile(":/qtwebchannel/qwebchannel.js")
+    resource.open(QIODevice.OpenModeFlag.ReadOnly)
+    source = bytes(resource.readAll()).decode("utf-8")
+    resource.close()
+
+    script = QWebEngineScript()
+    script.setName("plugin-bridge")
+    script.setSourceCode(source + BRIDGE_CLIENT_SCRIPT)
+    script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentCreation)
+    script.setWorldId(world_id(world))
+    script.setRunsOnSubFrames(False)
+    return script
+
+def attach_bridge(page, handlers, executor, world):
+    """Expose a PluginBridge as `zerkalo` to the page's web channel"""
+    page.bridge = PluginBridge(handlers, executor, page)
+    channel = QWebChannel(page)
+    channel.registerObject("zerkalo", page.bridge)
+    page.setWebChannel(channel, world_id(world))
+    return page.bridge
+
+def register_asset_scheme():
+    """Register zerkalo-asset:// with Chromium; must run before the first profile is created"""
+    scheme = QWebEngineUrlScheme(ASSET_SCHEME)
+    # host:port syntax keeps relative and root-relative URLs inside CSS/JS on the same scheme
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.HostAndPort)
+    scheme.setDefaultPort(80)
+    scheme.setFlags(
+        QWebEngineUrlScheme.Flag.SecureScheme
+        | QWebEngineUrlScheme.Flag.CorsEnabled
+        | QWebEngineUrlScheme.Flag.FetchApiAllowed
+        | QWebEngineUrlScheme.Flag.ContentSecurityPolicyIgnored
+    )
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+def create_profile(cache_dir, parent):
+    """Create the persistent profile shared by every page of the app"""
+    profile = QWebEngineProfile("ZerkaloPersistentProfile", parent)
+    profile.setPersistentStoragePath(cache_dir)
+    profile.setCachePath(cache_dir)
+    profile.setPersistentCookiesPolicy(QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies)
+    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+    profile.setHttpCacheMaximumSize(100 * 1024 * 1024)  # 100 MB cache
+
+    # Set modern user agent
+    profile.setHttpUserAgent(USER_AGENT)
+    return profile
+
+def apply_lite_settings(view, lite):
+    """Lite mode also drops engine features that fetch things on their own (view or page)"""
+    settings = view.settings()
+    settings.setAttribute(QWebEngineSettings.WebAttribute.PluginsEnabled, not lite)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.DnsPrefetchEnabled, not lite)
+
+def create_view(page, lite=False):
+    """Create a web view for page with the app's settings"""
+    view = QWebEngineView()
+    view.setPage(page)
+    view.setStyleSheet("background-color: white; border: none;")
+    configure_page(page, lite)
+    return view
+
+def configure_page(page, lite=False):
+    """Apply the app's settings to page; they belong to the page, so a replacement needs them again"""
+    settings = page.settings()
+    settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptEnabled, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.JavascriptCanAccessClipboard, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.LocalStorageEnabled, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessRemoteUrls, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.LocalContentCanAccessFileUrls, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.FullScreenSupportEnabled, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.ScrollAnimatorEnabled, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.PluginsEnabled, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.DnsPrefetchEnabled, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.AutoLoadImages, True)
+    settings.setAttribute(QWebEngineSettings.WebAttribute.Accelerated2dCanvasEnabled, True)
+    if lite:
+        apply_lite_settings(page, True)
+
+def console_source(source_id):
+    """Rate-limit key of a console message: js:<script host>, cut out without parsing the URL"""
+    _, separator, rest = source_id.partition("://")
+    host = rest.split("/", 1)[0].rpartition("@")[2] if separator else ""
+    return f"js:{host or 'inline'}"
+
+class WebEnginePage(QWebEnginePage):
+    """Custom WebEnginePage to handle JavaScript console messages"""
+    def __init__(self, profile, parent):
+        super().__init__(profile, parent)
+        # Called with the window type when the page opens a new window (set by the browser)
+        self.create_window_handler = None
+        # Called with (url, navigation type, is main frame) before a navigation starts;
+        # returns whether the page should go ahead with it
+        self.navigation_handler = None
+
+    def acceptNavigationRequest(self, url, navigation_type, is_main_frame):
+        if self.navigation_handler is not None:
+            return self.navigation_handler(url, navigation_type, is_main_frame)
+        return super().acceptNavigationRequest(url, navigation_type, is_main_frame)
+
+    def createWindow(self, window_type):
+        if self.create_window_handler is not None:
+            return self.create_window_handler(window_type)
+        return super().createWindow(window_type)
+
+    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
+        # Rate limited per script origin so one chatty script cannot flood the log;
+        # the line is only formatted once the limiter lets the message through
+        logsink.log(CONSOLE_LOG_LEVELS.get(level, logsink.INFO), console_source(source_id),
+                    lambda: f"JS [{level.name}]: {message} (Line: {line_number}, Source: {source_id})")
+
+class RequestInterceptor(QWebEngineUrlRequestInterceptor):
+    """Blocks ad/tracker requests (and, in lite mode, heavy resources) for the whole profile
+    and counts them per page"""
+    # Emitted with the first-party (page) URL whenever a request is blocked
+    request_blocked = pyqtSignal(str)
+
+    def __init__(self, blocklist, parent=None, asset_handler=None, lite_policy=None, ledger=None):
+        super().__init__(parent)
+        self.blocklist = blocklist
+        self.asset_handler = asset_handler
+        self.lite_policy = lite_policy
+        self.ledger = ledger
+        self.blocked = {}  # first-party URL -> blocked request count
+
+    def interceptRequest(self, info):
+        # Qt 6 calls this on the UI thread, so the counters need no locking
+        if info.resourceType() == QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame:
+            # A new navigation starts counting from zero, old pages are forgotten
+            page_url = info.requestUrl().toString()
+            self.blocked.pop(page_url, None)
+            self.blocked[page_url] = 0
+            while len(self.blocked) > 200:
+                del self.blocked[next(iter(self.blocked))]
+            if self.ledger is not None:
+                self.ledger.start_page(page_url)
+            return
+
+        url = info.requestUrl()
+        if self.blocklist is not None and self.blocklist.blocks(url.host(), url.toString()):
+            info.block(True)
+            first_party = info.firstPartyUrl().toString()
+            self.blocked[first_party] = self.blocked.get(first_party, 0) + 1
+            self.request_blocked.emit(first_party)
+            return
+
+        if self.lite_policy is not None and self.lite_policy.enabled:
+            category = resource_category(info.resourceType().name)
+            url_string = url.toString()
+            first_party = info.firstPartyUrl().toString()
+            known_size = self.ledger.known_size(url_string) if self.ledger is not None else None
+            if self.lite_policy.decide(category, url_string, first_party, known_size):
+                info.block(True)
+                if self.ledger is not None:
+                    self.ledger.record_blocked(first_party, category, url_string)
+                self.request_blocked.emit(first_party)
+                return
+
+        # Serve the mirror's static files from the offline asset store
+        if (self.asset_handler is not None
+                and info.resourceType() in ASSET_RESOURCE_TYPES
+                and bytes(info.requestMethod()) == b"GET"
+                and self.asset_handler.handles(url)):
+            info.redirect(self.asset_handler.asset_url(url, info.firstPartyUrl()))
+
+    def blocked_count(self, page_url):
+        return self.blocked.get(page_url, 0)
+
+class ProfileCookieJar(QNetworkCookieJar):
+    """Follows the profile's cookie store, so requests made outside Chromium carry the user's cookies"""
+    def __init__(self, cookie_store, parent=None):
+        super().__init__(parent)
+        self.cookie_store = cookie_store
+        cookie_store.cookieAdded.connect(self.insertCookie)
+        cookie_store.cookieRemoved.connect(self.deleteCookie)
+        cookie_store.loadAllCookies()
+
+    def setCookiesFromUrl(self, cookies, url):
+        # Cookies set on these responses belong to the profile as well
+        for cookie in cookies:
+            self.cookie_store.setCookie(cookie, url)
+        return super().setCookiesFromUrl(cookies, url)
+
+def referrer(first_party, url):
+    """Referer Chromium would send for url from first_party (strict-origin-when-cross-origin)"""
+    if not first_party.isValid() or first_party.scheme() not in ("http", "https"):
+        return None
+    if first_party.scheme() == "https" and url.scheme() != "https":
+        return None
+    strip = QUrl.UrlFormattingOption.RemoveFragment | QUrl.UrlFormattingOption.RemoveUserInfo
+    origin = strip | QUrl.UrlFormattingOption.RemovePath | QUrl.UrlFormattingOption.RemoveQuery
+    if first_party.adjusted(origin) == url.adjusted(origin):
+        return first_party.adjusted(strip).toString()
+    return first_party.adjusted(origin).toString() + "/"
+
+class AssetSchemeHandler(QWebEngineUrlSchemeHandler):
+    """Answers zerkalo-asset:// requests from the AssetStore, fetching misses upstream.
+
+    Upstream requests share the profile's cookies, carry the page as Referer
+    and revalidate stale copies with their ETag/Last-Modified.
+    """
+    def __init__(self, store, hosts, parent=None, cookie_store=None):
+        super().__init__(parent)
+        self.store = store
+        self.hosts = set(hosts)  # "host:port" of the mirrors whose assets are stored
+        self.origins = {}  # "host:port" -> upstream scheme (http/https)
+        self.referrers = {}  # asset URL -> page that requested it last
+        self.network = QNetworkAccessManager(self)
+        if cookie_store is not None:
+            self.network.setCookieJar(ProfileCookieJar(cookie_store, self.network))
+
+    def origin_key(self, url):
+        return f"{url.host()}:{url.port(443 if url.scheme() == 'https' else 80)}"
+
+    def handles(self, url):
+        return url.scheme() in ("http", "https") and self.origin_key(url) in self.hosts
+
+    def asset_url(self, url, first_party=None):
+        """http://mirror/static/app.js -> zerkalo-asset://mirror:80/static/app.js"""
+        key = self.origin_key(url)
+        self.origins[key] = url.scheme()
+        asset_url = QUrl(url)
+        asset_url.setScheme(ASSET_SCHEME.decode())
+        asset_url.setPort(int(key.rsplit(":", 1)[1]))
+        if first_party is not None:
+            self.referrers.pop(asset_url.toString(), None)
+            self.referrers[asset_url.toString()] = referrer(first_party, url)
+            while len(self.referrers) > 1000:
+                del self.referrers[next(iter(self.referrers))]
+        return asset_url
+
+    def upstream_url(self, asset_url):
+        port = asset_url.port(80)
+        url = QUrl(asset_url)
+        url.setScheme(self.origins.get(f"{asset_url.host()}:{port}") or ("https" if port == 443 else "http"))
+        if port == {"http": 80, "https": 443}.get(url.scheme()):
+            url.setPort(-1)
+        return url
+
+    def requestStarted(self, job):
+        upstream = self.upstream_url(job.requestUrl())
+        cached = self.store.get(upstream.toString(), allow_stale=True)
+        if cached and cached[2]:
+            self.respond(job, cached[0], cached[1])
+            return
+
+        request = QNetworkRequest(upstream)
+        request.setHeader(QNetworkRequest.KnownHeaders.UserAgentHeader, USER_AGENT)
+        request.setAttribute(QNetworkRequest.Attribute.RedirectPolicyAttribute,
+                             QNetworkRequest.RedirectPolicy.NoLessSafeRedirectPolicy)
+        referer = self.referrers.get(job.requestUrl().toString())
+        if referer:
+            request.setRawHeader(b"Referer", referer.encode())
+        if cached:
+            for name, value in self.store.validators(upstream.toString()).items():
+                request.setRawHeader(name.encode(), value.encode())
+        reply = self.network.get(request)
+        reply.finished.connect(lambda: self.on_fetched(reply, job, upstream.toString(), cached))
+
+    def on_fetched(self, reply, job, upstream, cached):
+        reply.deleteLater()
+        status = reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute) or 0
+        headers = {bytes(name).decode("latin-1").lower(): bytes(value).decode("latin-1")
+                   for name, value in reply.rawHeaderPairs()}
+        try:
+            if status == 304 and cached:
+                self.store.refresh(upstream, headers)
+                self.respond(job, cached[0], cached[1])
+            elif reply.error() == QNetworkReply.NetworkError.NoError and status < 400:
+                body = bytes(reply.readAll())
+                content_type = reply.header(QNetworkRequest.KnownHeaders.ContentTypeHeader) or "application/octet-stream"
+                mime = str(content_type).split(";", 1)[0].strip()
+                if status == 200:
+                    self.store.store_response(upstream, body, mime, headers)
+                self.respond(job, body, mime)
+            elif cached:
+                # Mirror is down, stale is better than nothing
+                self.respond(job, cached[0], cached[1])
+            else:
+                job.fail(QWebEngineUrlRequestJob.Error.RequestFailed)
+        except RuntimeError:
+            pass  # The page went away and Qt already deleted the job
+
+    def respond(self, job, body, mime):
+        if hasattr(job, "setAdditionalResponseHeaders"):  # Qt 6.6+, lets cross-origin fonts load
+            job.setAdditionalResponseHeaders({QByteArray(b"Access-Control-Allow-Origin"): QByteArray(b"*")})
+        buffer = QBuffer(job)
+        buffer.setData(body)
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        job.reply(mime.encode(), buffer)